@@ -0,0 +1,85 @@
+"""
+Micro-benchmark of the wire formats: encoded size and encode/decode time.
+
+Compares every installed JSON codec with MessagePack on RPC responses
+carrying numeric arrays and nested records.
+
+Usage:
+    python benchmarks/codec_formats.py [--items 1000] [--rounds 200]
+"""
+
+import argparse
+import functools
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "packages", "prpc", "src"))
+
+from prpc.transport import codec as codecs  # noqa: E402
+
+
+def installed_codecs() -> List[codecs.Codec]:
+    """Every codec whose implementation is installed."""
+    found: List[codecs.Codec] = [codecs.JsonCodec()]
+    if codecs.orjson is not None:
+        found.append(codecs.OrjsonCodec())
+    if codecs.msgspec is not None:
+        found.append(codecs.MsgspecJsonCodec())
+    if codecs.msgpack_available():
+        found.append(codecs.MsgpackCodec())
+    return found
+
+
+def payloads(items: int) -> Dict[str, Any]:
+    numbers = {
+        "id": 1,
+        "result": {
+            "ints": list(range(items)),
+            "floats": [i * 0.5 for i in range(items)],
+        },
+        "error": None,
+    }
+    records = {
+        "id": 2,
+        "result": [
+            {
+                "id": i,
+                "name": f"user-{i}",
+                "active": i % 2 == 0,
+                "scores": [i, i + 1, i + 2],
+                "address": {"city": "Paris", "zip": f"{75000 + i % 20}"},
+            }
+            for i in range(items)
+        ],
+        "error": None,
+    }
+    return {"numeric arrays": numbers, "nested records": records}
+
+
+def timed(fn: Callable[[], Any], rounds: int) -> float:
+    """Return the mean duration of ``fn`` in microseconds."""
+    start = time.perf_counter_ns()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter_ns() - start) / rounds / 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'payload':>15} {'codec':>14} {'bytes':>9} {'encode us':>10} {'decode us':>10}")
+    for label, payload in payloads(args.items).items():
+        for codec in installed_codecs():
+            data = codec.encode(payload)
+            encode = timed(functools.partial(codec.encode, payload), args.rounds)
+            decode = timed(functools.partial(codec.decode, data), args.rounds)
+            print(f"{label:>15} {codec.name:>14} {len(data):>9} {encode:>10.1f} {decode:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Micro-benchmark for ProcedureRegistry lookups under thread contention.
+
+Compares the lock-free copy-on-write read path with a registry that takes a
+lock on every lookup, as ProcedureRegistry did before.
+
+Usage:
+    python benchmarks/registry_lookup.py [--threads 1 4 16] [--lookups 200000]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "packages", "prpc", "src"))
+
+from prpc.core.registry import ProcedureRegistry  # noqa: E402
+
+
+class LockedRegistry:
+    """Reference implementation that locks on every read."""
+
+    def __init__(self) -> None:
+        self._procedures: Dict[str, Callable[..., Any]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, fn: Callable[..., Any]) -> None:
+        with self._lock:
+            self._procedures[name] = fn
+
+    def get(self, name: str) -> Optional[Callable[..., Any]]:
+        with self._lock:
+            return self._procedures.get(name)
+
+
+def run(registry: Any, names: List[str], threads: int, lookups: int) -> float:
+    """Return the mean cost of one lookup in nanoseconds."""
+    barrier = threading.Barrier(threads + 1)
+
+    def worker() -> None:
+        get = registry.get
+        barrier.wait()
+        for i in range(lookups):
+            get(names[i % len(names)])
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter_ns()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter_ns() - start
+    return elapsed / (threads * lookups)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--procedures", type=int, default=100)
+    args = parser.parse_args()
+
+    names = [f"proc_{i}" for i in range(args.procedures)]
+    registries = {"lock-free": ProcedureRegistry(), "locked": LockedRegistry()}
+    for registry in registries.values():
+        for name in names:
+            registry.register(name, lambda: None)
+
+    print(f"{'threads':>8} {'registry':>10} {'ns/lookup':>10}")
+    for threads in args.threads:
+        for label, registry in registries.items():
+            cost = run(registry, names, threads, args.lookups)
+            print(f"{threads:>8} {label:>10} {cost:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
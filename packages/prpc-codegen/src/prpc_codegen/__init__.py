@@ -1,4 +1,26 @@
-from .ts_codegen import generate_typescript_client, save_typescript_client
-from .main import app
+import importlib
+from typing import TYPE_CHECKING, Any
 
-__all__ = ["generate_typescript_client", "save_typescript_client", "app"]
+# Loaded on first access (PEP 562), so that the ``prpc`` command does not pay
+# for Jinja2 before it runs a command that needs it.
+_LAZY_ATTRIBUTES = {
+    "generate_typescript_client": ".ts_codegen",
+    "save_typescript_client": ".ts_codegen",
+    "TypeScriptGenerator": ".ts_codegen",
+    "app": ".main",
+}
+
+__all__ = ["generate_typescript_client", "save_typescript_client", "TypeScriptGenerator", "app"]
+
+if TYPE_CHECKING:
+    from .main import app
+    from .ts_codegen import TypeScriptGenerator, generate_typescript_client, save_typescript_client
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,370 @@
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import anyio
+import httpx
+from pydantic import BaseModel
+
+from prpc import PRPCAsgiApp, ProcedureRegistry
+from prpc.transport.asgi import NDJSON_CONTENT_TYPE, SSE_CONTENT_TYPE
+
+# Targets driven in-process, in the order they are run.
+TARGETS = ("asgi", "fastapi", "flask", "uvicorn")
+
+# Replaced in ``--params`` by a string of ``--payload-size`` characters.
+PAYLOAD_PLACEHOLDER = "$PAYLOAD"
+
+
+class BenchCall(BaseModel):
+    method: str
+    params: Any = None
+    weight: int = 1
+
+
+class BenchResult(BaseModel):
+    target: str
+    payload_size: int
+    concurrency: int
+    requests: int
+    errors: int
+    duration: float
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    rss_start: int
+    rss_end: int
+    rss_growth: int
+
+
+class TargetUnavailable(Exception):
+    """
+    Raised when the dependencies of a benchmark target are not installed.
+    """
+
+
+def rss_bytes() -> int:
+    """Return the resident set size of this process, in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # Peak RSS; in kilobytes on Linux and bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def parse_call(spec: str) -> Tuple[str, int]:
+    """Parse a ``method`` or ``method:weight`` option."""
+    method, _, weight = spec.partition(":")
+    return method, int(weight) if weight else 1
+
+
+def parse_params(spec: str) -> Tuple[str, Any]:
+    """Parse a ``method=JSON`` option."""
+    method, sep, params = spec.partition("=")
+    if not sep:
+        raise ValueError(f"Expected METHOD=JSON, got {spec!r}")
+    return method, json.loads(params)
+
+
+def default_calls(registry: ProcedureRegistry, params: Dict[str, Any]) -> List[BenchCall]:
+    """
+    Every non-streaming procedure that can be called: either its params were
+    given or it has no required parameter.
+    """
+    calls = []
+    for name in registry.list():
+        plan = registry.get_plan(name)
+        if plan is None or plan.is_streaming:
+            continue
+        if name in params:
+            calls.append(BenchCall(method=name, params=params[name]))
+            continue
+        signature = plan.signature
+        if signature is None or all(
+            p.default is not p.empty or p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD)
+            for p in signature.parameters.values()
+        ):
+            calls.append(BenchCall(method=name))
+    return calls
+
+
+def _fill_payload(params: Any, payload: str) -> Any:
+    if isinstance(params, str):
+        return params.replace(PAYLOAD_PLACEHOLDER, payload)
+    if isinstance(params, list):
+        return [_fill_payload(p, payload) for p in params]
+    if isinstance(params, dict):
+        return {k: _fill_payload(v, payload) for k, v in params.items()}
+    return params
+
+
+def build_requests(
+    calls: List[BenchCall], count: int, payload_size: int, seed: int = 0
+) -> List[Dict[str, Any]]:
+    """Build ``count`` request bodies following the weighted procedure mix."""
+    payload = "x" * payload_size
+    bodies = [
+        {"method": c.method, "params": _fill_payload(c.params, payload)} for c in calls
+    ]
+    rng = random.Random(seed)
+    chosen = rng.choices(bodies, weights=[c.weight for c in calls], k=count)
+    return [dict(body, id=i) for i, body in enumerate(chosen)]
+
+
+def _is_error(response: httpx.Response) -> bool:
+    if response.status_code != 200:
+        return True
+    content_type = response.headers.get("content-type", "").split(";")[0].strip()
+    lines = response.text.splitlines()
+    if content_type == NDJSON_CONTENT_TYPE:
+        entries = [json.loads(line) for line in lines if line.strip()]
+    elif content_type == SSE_CONTENT_TYPE:
+        entries = [
+            json.loads(line[len("data:"):])
+            for line in lines
+            if line.startswith("data:")
+        ]
+    else:
+        data = response.json()
+        entries = data if isinstance(data, list) else [data]
+    return any(isinstance(e, dict) and e.get("error") for e in entries)
+
+
+async def _drive_async(
+    client: httpx.AsyncClient, bodies: List[Dict[str, Any]], concurrency: int
+) -> Tuple[List[float], int]:
+    latencies: List[float] = []
+    errors = 0
+    queue = iter(bodies)
+
+    async def worker() -> None:
+        nonlocal errors
+        for body in queue:
+            start = time.perf_counter()
+            try:
+                failed = _is_error(await client.post("/rpc", json=body))
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    async with anyio.create_task_group() as tg:
+        for _ in range(concurrency):
+            tg.start_soon(worker)
+    return latencies, errors
+
+
+def _drive_threads(
+    client: httpx.Client, bodies: List[Dict[str, Any]], concurrency: int
+) -> Tuple[List[float], int]:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    queue = iter(bodies)
+
+    def worker() -> None:
+        while True:
+            with lock:
+                body = next(queue, None)
+            if body is None:
+                return
+            start = time.perf_counter()
+            try:
+                failed = _is_error(client.post("/rpc", json=body))
+            except httpx.HTTPError:
+                failed = True
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0]
+
+
+def _fastapi_app() -> Any:
+    try:
+        from fastapi import FastAPI
+        from prpc_fastapi import mount_fastapi
+    except ImportError as e:
+        raise TargetUnavailable(f"fastapi target requires prpc-fastapi: {e}") from None
+    app = FastAPI()
+    mount_fastapi(app)
+    return app
+
+
+def _flask_app() -> Any:
+    try:
+        from flask import Flask
+        from prpc_flask import mount_flask
+    except ImportError as e:
+        raise TargetUnavailable(f"flask target requires prpc-flask: {e}") from None
+    app = Flask("prpc_bench")
+    mount_flask(app)
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_uvicorn(app: Any) -> Tuple[Any, threading.Thread, str]:
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error", lifespan="off")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if not thread.is_alive() or time.monotonic() > deadline:
+            raise TargetUnavailable("uvicorn server failed to start")
+        time.sleep(0.01)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def run_target(
+    target: str,
+    bodies: List[Dict[str, Any]],
+    concurrency: int,
+    warmup_bodies: Optional[List[Dict[str, Any]]] = None,
+) -> Tuple[List[float], int, float]:
+    """
+    Send ``bodies`` to one target with ``concurrency`` concurrent clients,
+    after sending the unmeasured ``warmup_bodies``.
+
+    Returns:
+        The latency of each request in seconds, the number of failed
+        requests and the wall-clock duration of the run.
+
+    Raises:
+        TargetUnavailable: If the target's dependencies are not installed.
+    """
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    warmup_bodies = warmup_bodies or []
+
+    if target == "flask":
+        app = _flask_app()
+        with httpx.Client(
+            transport=httpx.WSGITransport(app=app), base_url="http://bench", limits=limits
+        ) as client:
+            _drive_threads(client, warmup_bodies, concurrency)
+            start = time.perf_counter()
+            latencies, errors = _drive_threads(client, bodies, concurrency)
+            return latencies, errors, time.perf_counter() - start
+
+    if target in ("asgi", "uvicorn"):
+        app = PRPCAsgiApp()
+    elif target == "fastapi":
+        app = _fastapi_app()
+    else:
+        raise ValueError(f"Unknown target {target!r}; choose from {', '.join(TARGETS)}")
+
+    server = None
+    if target == "uvicorn":
+        server, thread, base_url = _start_uvicorn(app)
+        client_options: Dict[str, Any] = {"base_url": base_url}
+    else:
+        client_options = {"transport": httpx.ASGITransport(app=app), "base_url": "http://bench"}
+
+    async def main() -> Tuple[List[float], int, float]:
+        async with httpx.AsyncClient(limits=limits, timeout=None, **client_options) as client:
+            await _drive_async(client, warmup_bodies, concurrency)
+            start = time.perf_counter()
+            latencies, errors = await _drive_async(client, bodies, concurrency)
+            return latencies, errors, time.perf_counter() - start
+
+    try:
+        return anyio.run(main)
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+
+def bench(
+    registry: ProcedureRegistry,
+    targets: List[str],
+    calls: List[BenchCall],
+    concurrency: int = 16,
+    requests: int = 2000,
+    payload_sizes: Optional[List[int]] = None,
+    warmup: int = 100,
+    on_skip: Optional[Callable[[str, str], None]] = None,
+) -> List[BenchResult]:
+    """
+    Benchmark ``calls`` against each target, once per payload size.
+
+    Args:
+        registry: Registry the procedures are served from (for validation).
+        targets: Names from ``TARGETS``.
+        calls: The weighted procedure mix.
+        concurrency: Number of concurrent clients.
+        requests: Number of measured requests per run.
+        payload_sizes: Sizes substituted for ``$PAYLOAD`` in the params.
+        warmup: Requests sent before measuring each run.
+        on_skip: Called with the target and the reason when a target is skipped.
+    """
+    for call in calls:
+        if registry.get_plan(call.method) is None:
+            raise ValueError(f"Procedure {call.method!r} is not registered")
+
+    results = []
+    for payload_size in payload_sizes or [0]:
+        bodies = build_requests(calls, warmup + requests, payload_size)
+        for target in targets:
+            rss_start = rss_bytes()
+            try:
+                latencies, errors, duration = run_target(
+                    target, bodies[warmup:], concurrency, bodies[:warmup]
+                )
+            except TargetUnavailable as e:
+                if on_skip is not None:
+                    on_skip(target, str(e))
+                continue
+            rss_end = rss_bytes()
+            latencies.sort()
+            results.append(
+                BenchResult(
+                    target=target,
+                    payload_size=payload_size,
+                    concurrency=concurrency,
+                    requests=len(latencies),
+                    errors=errors,
+                    duration=duration,
+                    rps=len(latencies) / duration if duration else 0.0,
+                    p50_ms=percentile(latencies, 0.50) * 1000,
+                    p95_ms=percentile(latencies, 0.95) * 1000,
+                    p99_ms=percentile(latencies, 0.99) * 1000,
+                    rss_start=rss_start,
+                    rss_end=rss_end,
+                    rss_growth=rss_end - rss_start,
+                )
+            )
+    return results
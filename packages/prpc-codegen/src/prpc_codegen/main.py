@@ -1,23 +1,26 @@
 import importlib
+import importlib.util
+import json
 import os
+import re
 import sys
-from typing import Optional
+import time
+from typing import Any, Dict, List, Optional
 
 import typer
-import uvicorn
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
 
 from .ts_codegen import save_typescript_client
-from prpc import default_registry, get_registry_schema
+
+# uvicorn, rich, httpx and pRPC itself are imported by the commands that use
+# them, so that the CLI starts fast, e.g. for `prpc version`.
 
 
 # Avoid importing from .. (the root __init__) to prevent circularity if possible
-# or just import specific things we need. 
-# __version__ can be hardcoded here or read from somewhere else if needed, 
-# but for CLI it's often fine to just have a local ref or import from a dedicated version file.
-__version__ = "0.1.0" 
+# or just import specific things we need.
+# __version__ can be hardcoded here or read from somewhere else if needed,
+# but for CLI it's often fine to just have a local ref or import from a
+# dedicated version file.
+__version__ = "0.1.0"
 
 
 app = typer.Typer(
@@ -25,7 +28,36 @@ app = typer.Typer(
     help="pRPC CLI - tRPC power for Python projects",
     add_completion=False,
 )
-console = Console()
+_console: Any = None
+
+# Choices of `prpc serve --loop` and `--http`, with the package they need.
+_LOOPS = {"auto": None, "asyncio": None, "uvloop": "uvloop"}
+_HTTP_PARSERS = {"auto": None, "h11": "h11", "httptools": "httptools"}
+
+# Repeatable options of `prpc bench`, whose list values rule out calls in
+# argument defaults.
+_BENCH_CALLS = typer.Option(
+    None, "--call", help="Procedure to call, as METHOD or METHOD:WEIGHT (repeatable)"
+)
+_BENCH_PARAMS = typer.Option(
+    None, "--params", help="Params of a procedure, as METHOD=JSON; '$PAYLOAD' is "
+    "replaced by a string of --payload-size characters (repeatable)"
+)
+_BENCH_PAYLOAD_SIZES = typer.Option(
+    None,
+    "--payload-size",
+    help="Payload size in characters; one run per size (repeatable)",
+)
+
+
+def console() -> Any:
+    """The rich console, created on first use."""
+    global _console
+    if _console is None:
+        from rich.console import Console
+
+        _console = Console()
+    return _console
 
 
 def _import_module(module_path: str):
@@ -34,68 +66,288 @@ def _import_module(module_path: str):
     try:
         return importlib.import_module(module_path)
     except ImportError as e:
-        console.print(f"[bold red]Error:[/bold red] Could not import module '{module_path}': {e}")
-        raise typer.Exit(code=1)
+        console().print(
+            f"[bold red]Error:[/bold red] Could not import module '{module_path}': {e}"
+        )
+        raise typer.Exit(code=1) from e
 
 
 @app.command()
 def version():
     """Show pRPC version."""
-    console.print(f"pRPC version: [bold cyan]{__version__}[/bold cyan]")
+    console().print(f"pRPC version: [bold cyan]{__version__}[/bold cyan]")
 
 
 @app.command()
 def serve(
-    module: str = typer.Argument(..., help="Module containing the pRPC application (e.g. 'app.main')"),
-    host: str = typer.Option("127.0.0.1", "--host", "-h", help="Bind socket to this host"),
+    module: str = typer.Argument(
+        ..., help="Module containing the pRPC application (e.g. 'app.main')"
+    ),
+    host: str = typer.Option(
+        "127.0.0.1", "--host", "-h", help="Bind socket to this host"
+    ),
     port: int = typer.Option(8000, "--port", "-p", help="Bind socket to this port"),
     reload: bool = typer.Option(False, "--reload", help="Enable auto-reload"),
+    metrics: bool = typer.Option(
+        False, "--metrics", help="Record metrics and serve them at /metrics"
+    ),
+    workers: int = typer.Option(
+        1, "--workers", "-w", min=1, help="Number of worker processes"
+    ),
+    loop: str = typer.Option(
+        "auto", "--loop", help="Event loop: 'auto', 'asyncio' or 'uvloop'"
+    ),
+    http: str = typer.Option(
+        "auto", "--http", help="HTTP parser: 'auto', 'h11' or 'httptools'"
+    ),
+    backlog: int = typer.Option(
+        2048, "--backlog", min=1, help="Maximum number of pending connections"
+    ),
+    timeout_keep_alive: int = typer.Option(
+        5, "--timeout-keep-alive", help="Seconds an idle connection is kept open"
+    ),
+    timeout_graceful_shutdown: Optional[int] = typer.Option(
+        None,
+        "--timeout-graceful-shutdown",
+        help="Seconds to wait for pending requests on shutdown",
+    ),
+    cpu_affinity: Optional[str] = typer.Option(
+        None,
+        "--cpu-affinity",
+        help="CPUs the server processes may run on, e.g. '0-3,6' (Linux)",
+    ),
 ):
     """Start the pRPC ASGI server."""
+    import uvicorn
+    from rich.panel import Panel
+
+    from .serve import (
+        APP_FACTORY,
+        CPU_AFFINITY_ENV,
+        SERVE_MODULE_ENV,
+        parse_cpus,
+        set_cpu_affinity,
+    )
+
+    if reload and workers > 1:
+        console().print(
+            "[bold red]Error:[/bold red] --reload cannot be combined with --workers."
+        )
+        raise typer.Exit(code=1)
+    for option, value, choices in (
+        ("--loop", loop, _LOOPS),
+        ("--http", http, _HTTP_PARSERS),
+    ):
+        if value not in choices:
+            console().print(
+                f"[bold red]Error:[/bold red] Invalid {option} '{value}'. "
+                f"Use one of: {', '.join(choices)}."
+            )
+            raise typer.Exit(code=1)
+        package = choices[value]
+        if package is not None and importlib.util.find_spec(package) is None:
+            console().print(
+                f"[bold red]Error:[/bold red] {option} {value} requires "
+                f"the '{package}' package."
+            )
+            raise typer.Exit(code=1)
+    if cpu_affinity is not None:
+        try:
+            # Checked here, so that a bad setting fails before any worker starts.
+            set_cpu_affinity(parse_cpus(cpu_affinity))
+        except (ValueError, OSError) as e:
+            console().print(
+                "[bold red]Error:[/bold red] "
+                f"Invalid --cpu-affinity '{cpu_affinity}': {e}"
+            )
+            raise typer.Exit(code=1) from e
+        os.environ[CPU_AFFINITY_ENV] = cpu_affinity
+
+    if metrics:
+        from prpc.core.metrics import default_metrics
+
+        # The environment variable covers worker and reloader processes.
+        os.environ["PRPC_METRICS"] = "1"
+        default_metrics.enabled = True
+    # Imported here too, so that errors in the module show before any worker
+    # starts. Every server process imports it again through the app factory.
     _import_module(module)
+    os.environ[SERVE_MODULE_ENV] = module
     
-    console.print(Panel(
+    console().print(Panel(
         f"Starting pRPC server for [bold cyan]{module}[/bold cyan]\n"
-        f"Endpoint: [bold green]http://{host}:{port}/rpc[/bold green]",
+        f"Endpoint: [bold green]http://{host}:{port}/rpc[/bold green]"
+        + (f"\nWorkers: [bold]{workers}[/bold]" if workers > 1 else ""),
         title="pRPC Serve",
         border_style="blue"
     ))
     
-    # We use the built-in asgi_app if found in the package, or just the module path for uvicorn
-    # If the user wants to serve their own app (like FastAPI), they'd use uvicorn directly.
-    # Here we assume they want to serve the default prpc asgi app.
-    uvicorn.run("prpc:asgi_app", host=host, port=port, reload=reload)
+    # We serve the built-in asgi_app, through a factory that registers the
+    # module's procedures in each process. If the user wants to serve their
+    # own app (like FastAPI), they'd use uvicorn directly.
+    uvicorn.run(
+        APP_FACTORY,
+        factory=True,
+        host=host,
+        port=port,
+        reload=reload,
+        workers=workers if workers > 1 else None,
+        loop=loop,
+        http=http,
+        backlog=backlog,
+        timeout_keep_alive=timeout_keep_alive,
+        timeout_graceful_shutdown=timeout_graceful_shutdown,
+    )
 
 
 @app.command()
 def codegen(
-    module: str = typer.Option(..., "--module", "-m", help="Python module to introspect"),
-    target: str = typer.Option("ts", "--target", "-t", help="Target language (only 'ts' supported)"),
+    module: str = typer.Option(
+        ..., "--module", "-m", help="Python module to introspect"
+    ),
+    target: str = typer.Option(
+        "ts", "--target", "-t", help="Target language (only 'ts' supported)"
+    ),
     output: str = typer.Option("client.ts", "--output", "-o", help="Output file path"),
+    watch: bool = typer.Option(
+        False,
+        "--watch",
+        "-w",
+        help="Regenerate the client when the project's modules change",
+    ),
+    interval: float = typer.Option(
+        0.5, "--interval", help="Seconds between checks for changes with --watch"
+    ),
 ):
     """Generate a client for a pRPC service."""
     if target != "ts":
-        console.print(f"[bold red]Error:[/bold red] Target '{target}' is not supported. Use 'ts'.")
+        console().print(
+            f"[bold red]Error:[/bold red] Target '{target}' is not supported. Use 'ts'."
+        )
         raise typer.Exit(code=1)
 
+    from prpc import default_registry
+
+    from .ts_codegen import TypeScriptGenerator
+
     _import_module(module)
-    
-    console.print(f"Generating [bold cyan]{target}[/bold cyan] client for [bold yellow]{module}[/bold yellow]...")
-    save_typescript_client(default_registry, output)
-    console.print(f"[bold green]Successfully generated {output}[/bold green]")
+
+    console().print(
+        f"Generating [bold cyan]{target}[/bold cyan] client "
+        f"for [bold yellow]{module}[/bold yellow]..."
+    )
+    generator = TypeScriptGenerator()
+    _save_client(default_registry, output, generator)
+    if not watch:
+        return
+
+    from .watch import ModuleWatcher
+
+    watcher = ModuleWatcher(os.getcwd(), default_registry)
+    console().print("Watching for changes, press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(interval)
+            changed = watcher.changed()
+            if not changed:
+                continue
+            try:
+                watcher.reload(changed)
+            except Exception as e:
+                console().print(
+                    "[bold red]Error:[/bold red] "
+                    f"Could not reload {', '.join(changed)}: {e}"
+                )
+                continue
+            _save_client(default_registry, output, generator)
+    except KeyboardInterrupt:
+        pass
+
+
+def _save_client(registry: Any, output: str, generator: Any) -> None:
+    if save_typescript_client(registry, output, generator=generator):
+        console().print(f"[bold green]Successfully generated {output}[/bold green]")
+    else:
+        console().print(f"{output} is up to date")
+
+
+_SAMPLE = re.compile(r'^(\w+)\{(.*)\}\s+(\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def _fetch_stats(url: str) -> Dict[str, Dict[str, Any]]:
+    """Fetch the /metrics of a running server and summarize them per procedure."""
+    import httpx
+
+    try:
+        response = httpx.get(url.rstrip("/") + "/metrics")
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        console().print(
+            f"[bold red]Error:[/bold red] Could not fetch metrics from '{url}': {e}"
+        )
+        raise typer.Exit(code=1) from e
+
+    stats: Dict[str, Dict[str, Any]] = {}
+    for line in response.text.splitlines():
+        match = _SAMPLE.match(line)
+        if match is None:
+            continue
+        name, value = match.group(1), float(match.group(3))
+        labels = dict(_LABEL.findall(match.group(2)))
+        entry = stats.setdefault(
+            labels.get("method", ""),
+            {"calls": 0, "errors": 0, "in_flight": 0, "sum": 0.0, "buckets": []},
+        )
+        if name == "prpc_calls_total":
+            entry["calls"] = int(value)
+        elif name == "prpc_errors_total":
+            entry["errors"] += int(value)
+        elif name == "prpc_in_flight":
+            entry["in_flight"] = int(value)
+        elif name == "prpc_call_duration_seconds_sum":
+            entry["sum"] = value
+        elif name == "prpc_call_duration_seconds_bucket":
+            entry["buckets"].append((float(labels["le"]), value))
+    return stats
+
+
+def _quantile(buckets: Any, count: int, q: float) -> Optional[float]:
+    """Upper bound of the histogram bucket containing the q-quantile."""
+    for bound, cumulative in buckets:
+        if cumulative >= q * count:
+            return bound
+    return None
+
+
+def _format_ms(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    if seconds == float("inf"):
+        return "> max"
+    return f"{seconds * 1000:.1f}"
 
 
 @app.command()
 def inspect(
-    module: str = typer.Argument(..., help="Module to inspect")
+    module: str = typer.Argument(..., help="Module to inspect"),
+    stats: Optional[str] = typer.Option(
+        None, "--stats", help="Base URL of a running server to show live metrics from"
+    ),
 ):
     """List all registered RPC procedures in a module."""
+    from prpc import default_registry, get_registry_schema
+    from rich.table import Table
+
     _import_module(module)
+    live = _fetch_stats(stats) if stats else None
     
     schemas = get_registry_schema(default_registry)
     
     if not schemas:
-        console.print("[yellow]No procedures found in registry for this module.[/yellow]")
+        console().print(
+            "[yellow]No procedures found in registry for this module.[/yellow]"
+        )
         return
 
     table = Table(title=f"pRPC Registry: {module}")
@@ -103,17 +355,157 @@ def inspect(
     table.add_column("Params", style="green")
     table.add_column("Returns", style="magenta")
     table.add_column("Doc", style="white", no_wrap=False)
+    if live is not None:
+        table.add_column("Calls", justify="right")
+        table.add_column("Errors", justify="right")
+        table.add_column("In flight", justify="right")
+        table.add_column("Mean ms", justify="right")
+        table.add_column("p99 ms", justify="right")
 
     for name, schema in schemas.items():
         params = ", ".join([f"{p.name}: {p.type}" for p in schema.parameters])
-        table.add_row(
-            name,
-            params or "None",
-            schema.return_type,
-            schema.doc or ""
+        row = [name, params or "None", schema.return_type, schema.doc or ""]
+        if live is not None:
+            entry = live.get(name)
+            if entry is None or not entry["calls"]:
+                row += ["0", "0", str(entry["in_flight"] if entry else 0), "-", "-"]
+            else:
+                row += [
+                    str(entry["calls"]),
+                    str(entry["errors"]),
+                    str(entry["in_flight"]),
+                    _format_ms(entry["sum"] / entry["calls"]),
+                    _format_ms(_quantile(entry["buckets"], entry["calls"], 0.99)),
+                ]
+        table.add_row(*row)
+
+    console().print(table)
+
+
+@app.command()
+def bench(
+    module: str = typer.Argument(..., help="Module whose procedures are benchmarked"),
+    targets: str = typer.Option(
+        "asgi,fastapi,flask", "--targets", "-t",
+        help="Comma-separated targets: asgi, fastapi, flask, uvicorn (real socket)",
+    ),
+    concurrency: int = typer.Option(
+        16, "--concurrency", "-c", help="Concurrent clients"
+    ),
+    requests: int = typer.Option(
+        2000, "--requests", "-n", help="Measured requests per run"
+    ),
+    warmup: int = typer.Option(
+        100, "--warmup", help="Unmeasured requests before each run"
+    ),
+    calls: Optional[List[str]] = _BENCH_CALLS,
+    params: Optional[List[str]] = _BENCH_PARAMS,
+    payload_sizes: Optional[List[int]] = _BENCH_PAYLOAD_SIZES,
+    json_output: Optional[str] = typer.Option(
+        None, "--json", help="Write the results as JSON to this file, or '-' for stdout"
+    ),
+):
+    """Measure throughput and latency of a module's procedures across transports."""
+    from prpc import default_registry
+    from rich.table import Table
+
+    from .bench import (
+        TARGETS,
+        BenchCall,
+        default_calls,
+        parse_call,
+        parse_params,
+    )
+    from .bench import (
+        bench as run_bench,
+    )
+
+    _import_module(module)
+
+    selected = [t.strip() for t in targets.split(",") if t.strip()]
+    unknown = [t for t in selected if t not in TARGETS]
+    if unknown:
+        console().print(
+            f"[bold red]Error:[/bold red] Unknown target(s): {', '.join(unknown)}"
+        )
+        raise typer.Exit(code=1)
+
+    try:
+        params_by_method = dict(parse_params(spec) for spec in params or [])
+        if calls:
+            mix = []
+            for spec in calls:
+                method, weight = parse_call(spec)
+                call_params = params_by_method.get(method)
+                mix.append(BenchCall(method=method, params=call_params, weight=weight))
+        else:
+            mix = default_calls(default_registry, params_by_method)
+    except ValueError as e:
+        console().print(f"[bold red]Error:[/bold red] {e}")
+        raise typer.Exit(code=1) from e
+    if not mix:
+        console().print(
+            "[bold red]Error:[/bold red] "
+            "No procedure to call; pass --call and --params."
+        )
+        raise typer.Exit(code=1)
+
+    quiet = json_output == "-"
+    if not quiet:
+        console().print(
+            f"Benchmarking [bold cyan]{', '.join(c.method for c in mix)}[/bold cyan] "
+            f"with concurrency {concurrency}..."
+        )
+
+    def on_skip(target: str, reason: str) -> None:
+        if not quiet:
+            console().print(f"[yellow]Skipping {target}:[/yellow] {reason}")
+
+    try:
+        results = run_bench(
+            default_registry,
+            selected,
+            mix,
+            concurrency=concurrency,
+            requests=requests,
+            payload_sizes=payload_sizes,
+            warmup=warmup,
+            on_skip=on_skip,
         )
+    except ValueError as e:
+        console().print(f"[bold red]Error:[/bold red] {e}")
+        raise typer.Exit(code=1) from e
+
+    if json_output is not None:
+        data = json.dumps([r.model_dump() for r in results], indent=2)
+        if quiet:
+            typer.echo(data)
+            return
+        with open(json_output, "w") as f:
+            f.write(data + "\n")
+        console().print(f"[bold green]Results written to {json_output}[/bold green]")
 
-    console.print(table)
+    table = Table(title=f"pRPC Bench: {module}")
+    table.add_column("Target", style="cyan")
+    table.add_column("Payload", justify="right")
+    table.add_column("Req/s", justify="right", style="green")
+    table.add_column("p50 ms", justify="right")
+    table.add_column("p95 ms", justify="right")
+    table.add_column("p99 ms", justify="right")
+    table.add_column("Errors", justify="right")
+    table.add_column("RSS +KiB", justify="right")
+    for r in results:
+        table.add_row(
+            r.target,
+            str(r.payload_size),
+            f"{r.rps:,.0f}",
+            f"{r.p50_ms:.2f}",
+            f"{r.p95_ms:.2f}",
+            f"{r.p99_ms:.2f}",
+            str(r.errors),
+            f"{r.rss_growth // 1024:,}",
+        )
+    console().print(table)
 
 
 if __name__ == "__main__":
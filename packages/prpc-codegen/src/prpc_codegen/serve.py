@@ -0,0 +1,68 @@
+import importlib
+import os
+import sys
+from typing import Any, Set
+
+# Read by every server process, including uvicorn's workers and reloader
+# children, which do not inherit the modules imported by the CLI.
+SERVE_MODULE_ENV = "PRPC_SERVE_MODULE"
+CPU_AFFINITY_ENV = "PRPC_CPU_AFFINITY"
+
+# The app factory given to uvicorn by ``prpc serve``.
+APP_FACTORY = "prpc_codegen.serve:create_app"
+
+
+def parse_cpus(spec: str) -> Set[int]:
+    """
+    Parse a CPU list such as ``"0-3,6"``.
+
+    Raises:
+        ValueError: If ``spec`` is not a valid CPU list.
+    """
+    cpus: Set[int] = set()
+    for part in spec.split(","):
+        part = part.strip()
+        first, sep, last = part.partition("-")
+        if sep:
+            start, end = int(first), int(last)
+            if start > end:
+                raise ValueError(f"Invalid CPU range {part!r}")
+            cpus.update(range(start, end + 1))
+        else:
+            cpus.add(int(part))
+    if any(cpu < 0 for cpu in cpus):
+        raise ValueError(f"Invalid CPU list {spec!r}")
+    return cpus
+
+
+def set_cpu_affinity(cpus: Set[int]) -> None:
+    """
+    Restrict the current process to ``cpus``.
+
+    Raises:
+        OSError: If the platform does not support it, or a CPU does not exist.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        raise OSError("CPU affinity is not supported on this platform")
+    os.sched_setaffinity(0, cpus)
+
+
+def create_app() -> Any:
+    """
+    Build the ASGI app of a server process.
+
+    Imports the module named by ``PRPC_SERVE_MODULE``, so that its procedures
+    are registered in every process, and applies ``PRPC_CPU_AFFINITY``.
+    """
+    module = os.environ.get(SERVE_MODULE_ENV)
+    if module:
+        if os.getcwd() not in sys.path:
+            sys.path.append(os.getcwd())
+        importlib.import_module(module)
+    cpus = os.environ.get(CPU_AFFINITY_ENV)
+    if cpus:
+        set_cpu_affinity(parse_cpus(cpus))
+
+    from prpc import asgi_app
+
+    return asgi_app
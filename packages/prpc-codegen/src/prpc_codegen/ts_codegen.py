@@ -1,32 +1,86 @@
+import functools
+import hashlib
 import os
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
-from jinja2 import Environment, FileSystemLoader
 
-from prpc import get_registry_schema
+@functools.lru_cache(maxsize=None)
+def _template() -> Any:
+    """The compiled ``client.ts.j2`` template, loaded once per process."""
+    # Imported here to keep Jinja2 out of the CLI's start-up time.
+    from jinja2 import Environment, FileSystemLoader
+
+    template_dir = Path(__file__).parent / "templates"
+    env = Environment(loader=FileSystemLoader(template_dir))
+    return env.get_template("client.ts.j2")
+
+
+class TypeScriptGenerator:
+    """
+    Generates TypeScript clients, rendering each procedure only when it changes.
+
+    The code of every procedure is kept along with the schema it was rendered
+    from. Schemas are cached by the registry until a procedure is registered
+    again, and even then an identical schema reuses the rendered code, so
+    regenerating a client after a small change only renders what changed.
+    """
+
+    def __init__(self) -> None:
+        self._methods: Dict[str, Tuple[Any, str]] = {}
+
+    def generate(self, registry: Any) -> str:
+        """
+        Generate a TypeScript client from a pRPC registry.
+        """
+        from prpc import get_registry_schema
+
+        template = _template()
+        schemas = get_registry_schema(registry)
+        methods: Dict[str, Tuple[Any, str]] = {}
+        for name, schema in schemas.items():
+            cached = self._methods.get(name)
+            if cached is None or (cached[0] is not schema and cached[0] != schema):
+                cached = (schema, str(template.module.method(name, schema)))
+            methods[name] = cached
+        # Procedures that were removed are dropped from the cache too.
+        self._methods = methods
+        return template.render(methods=[code for _, code in methods.values()])
 
 
 def generate_typescript_client(registry: Any) -> str:
     """
     Generate a TypeScript client from a pRPC registry.
     """
-    schemas = get_registry_schema(registry)
-    
-    # Setup Jinja2
-    template_dir = Path(__file__).parent / "templates"
-    env = Environment(loader=FileSystemLoader(template_dir))
-    template = env.get_template("client.ts.j2")
+    return TypeScriptGenerator().generate(registry)
 
-    
-    return template.render(schemas=schemas)
 
-
-def save_typescript_client(registry: Any, output_path: str):
+def save_typescript_client(
+    registry: Any, output_path: str, generator: Optional[TypeScriptGenerator] = None
+) -> bool:
     """
     Generate and save the TypeScript client to a file.
+
+    The file is left untouched when its content would not change, so that
+    tools watching it (e.g. a frontend dev server) do not rebuild for nothing.
+
+    Returns:
+        Whether the file was written.
     """
-    content = generate_typescript_client(registry)
+    content = (generator or TypeScriptGenerator()).generate(registry).encode("utf-8")
+    try:
+        with open(output_path, "rb") as f:
+            current = hashlib.sha256(f.read()).digest()
+    except FileNotFoundError:
+        current = None
+    if current == hashlib.sha256(content).digest():
+        return False
+
     os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
+    # Written next to the output, then renamed over it, so that watchers never
+    # see a partially written file.
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "wb") as f:
         f.write(content)
+    os.replace(tmp_path, output_path)
+    return True
@@ -0,0 +1,86 @@
+import importlib
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+# Packages of pRPC itself, never reloaded even when run from a source checkout
+# under the watched root: reloading them would replace the registry and
+# classes the project's modules hold on to.
+FRAMEWORK_PACKAGES = frozenset({"prpc", "prpc_codegen", "prpc_fastapi", "prpc_flask"})
+
+
+class ModuleWatcher:
+    """
+    Polls the source files of a project's imported modules and reloads the
+    ones that changed.
+
+    Only modules whose file is under ``root`` are watched, leaving out
+    installed packages and pRPC's own packages. Before a module is reloaded,
+    the procedures it registered are unregistered, so that procedures deleted
+    from it disappear and the procedures of other modules keep their cached
+    schemas.
+    """
+
+    def __init__(self, root: str, registry: Any) -> None:
+        self.root = os.path.abspath(root) + os.sep
+        self.registry = registry
+        self._mtimes: Dict[str, float] = {}
+        self.scan()
+
+    def _files(self) -> Dict[str, str]:
+        """The source file of each watched module, by module name."""
+        files = {}
+        for name, module in list(sys.modules.items()):
+            if name.partition(".")[0] in FRAMEWORK_PACKAGES:
+                continue
+            path = getattr(module, "__file__", None)
+            if not path:
+                continue
+            path = os.path.abspath(path)
+            if path.startswith(self.root) and "site-packages" not in path:
+                files[name] = path
+        return files
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def scan(self) -> None:
+        """Record the current modification time of every watched module."""
+        mtimes = {}
+        for name, path in self._files().items():
+            mtime = self._mtime(path)
+            if mtime is not None:
+                mtimes[name] = mtime
+        self._mtimes = mtimes
+
+    def changed(self) -> List[str]:
+        """The names of the modules whose file changed since the last scan."""
+        changed = []
+        for name, path in self._files().items():
+            mtime = self._mtime(path)
+            if mtime is not None and mtime != self._mtimes.get(name):
+                changed.append(name)
+        return changed
+
+    def reload(self, names: List[str]) -> None:
+        """
+        Reload modules, replacing the procedures they registered.
+
+        Raises:
+            Exception: Whatever reloading a module raised, e.g. a SyntaxError.
+                The modules are not reloaded again until they change.
+        """
+        try:
+            for name in names:
+                for procedure in self.registry.list():
+                    plan = self.registry.get_plan(procedure)
+                    module = getattr(plan.fn, "__module__", None) if plan else None
+                    if module == name:
+                        self.registry.unregister(procedure)
+                importlib.reload(sys.modules[name])
+        finally:
+            self.scan()
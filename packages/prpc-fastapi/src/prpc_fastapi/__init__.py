@@ -1,16 +1,64 @@
-from typing import Any, Dict
+from typing import Any, Optional
+
+from fastapi import Request, Response
 
 from prpc import handle_request
+from prpc.transport.asgi import DEFAULT_MAX_BODY_SIZE
+from prpc.transport.codec import (
+    DecodeError,
+    get_codecs,
+    get_default_codec,
+    select_request_codec,
+    select_response_codec,
+)
+from prpc.transport.compression import DecompressionError, UnsupportedEncodingError, decompress
 
 
-def mount_fastapi(app: Any) -> None:
+def mount_fastapi(app: Any, max_body_size: Optional[int] = DEFAULT_MAX_BODY_SIZE) -> None:
     """
     Mount the pRPC RPC endpoint onto a FastAPI application.
 
+    The endpoint accepts a single request object or an array of requests to
+    run as a batch, as JSON or, when ``msgpack`` is installed, MessagePack.
+    The response is encoded in the format asked for by ``Accept``, or else in
+    the format of the request. Compressed request bodies are decompressed; use
+    Starlette's ``GZipMiddleware`` to compress responses.
+
     Args:
         app: A FastAPI application instance.
+        max_body_size: Maximum size of a request body in bytes, once
+            decompressed; larger requests are rejected with 413. None
+            disables the limit.
     """
+    default = get_default_codec()
+    codecs = get_codecs(default)
 
     @app.post("/rpc")
-    async def rpc_endpoint(payload: Dict[str, Any]):
-        return await handle_request(payload)
+    async def rpc_endpoint(request: Request) -> Response:
+        codec = select_request_codec(request.headers.get("content-type"), codecs, default)
+        body = await request.body()
+        content_encoding = request.headers.get("content-encoding")
+        try:
+            if content_encoding and body:
+                body = decompress(body, content_encoding.strip().lower(), max_body_size)
+            if max_body_size is not None and len(body) > max_body_size:
+                return Response(
+                    default.encode({"error": "Payload Too Large"}),
+                    status_code=413,
+                    media_type=default.content_type,
+                )
+            payload = codec.decode(body) if body else {}
+        except UnsupportedEncodingError:
+            return Response(
+                default.encode({"error": "Unsupported Content-Encoding"}),
+                status_code=415,
+                media_type=default.content_type,
+            )
+        except (DecodeError, DecompressionError):
+            return Response(
+                default.encode({"error": "Invalid body"}),
+                status_code=400,
+                media_type=default.content_type,
+            )
+        out = select_response_codec(request.headers.get("accept"), codecs, codec)
+        return Response(out.encode(await handle_request(payload)), media_type=out.content_type)
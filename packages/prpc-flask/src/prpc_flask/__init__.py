@@ -1,22 +1,115 @@
-from typing import Any
+import os
+import threading
+from typing import Any, Optional
 
-from prpc import handle_request
+from prpc import handle_request, handle_request_sync
+from prpc.core.interpreter import requires_event_loop
+from prpc.transport.asgi import DEFAULT_MAX_BODY_SIZE
+from prpc.transport.codec import (
+    DecodeError,
+    get_codecs,
+    get_default_codec,
+    select_request_codec,
+    select_response_codec,
+)
+from prpc.transport.compression import DecompressionError, UnsupportedEncodingError, decompress
 
 
-def mount_flask(app: Any) -> None:
+class _LoopRunner:
+    """
+    Runs async procedures on a long-lived event loop shared by all request threads.
+
+    The loop lives in a background thread started by an anyio blocking portal on
+    first use. It is restarted after a fork, since the thread does not survive
+    into the child process of a pre-forking server.
+    """
+
+    def __init__(self) -> None:
+        self._portal: Optional[Any] = None
+        self._portal_cm: Optional[Any] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _get_portal(self) -> Any:
+        if self._portal is None or self._pid != os.getpid():
+            with self._lock:
+                if self._portal is None or self._pid != os.getpid():
+                    from anyio.from_thread import start_blocking_portal
+
+                    self._portal_cm = start_blocking_portal()
+                    self._portal = self._portal_cm.__enter__()
+                    self._pid = os.getpid()
+        return self._portal
+
+    def call(self, fn: Any, *args: Any) -> Any:
+        return self._get_portal().call(fn, *args)
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._portal_cm is not None and self._pid == os.getpid():
+                self._portal_cm.__exit__(None, None, None)
+            self._portal = self._portal_cm = self._pid = None
+
+
+def mount_flask(app: Any, max_body_size: Optional[int] = DEFAULT_MAX_BODY_SIZE) -> None:
     """
     Mount the pRPC RPC endpoint onto a Flask application.
 
+    Requests that only target sync procedures are handled directly in the
+    request thread. Requests for async procedures run on a long-lived event
+    loop, started on first use, instead of a new loop per request.
+
+    Bodies are JSON or, when ``msgpack`` is installed, MessagePack, as given
+    by ``Content-Type``; responses follow ``Accept`` or else the request.
+    Compressed request bodies are decompressed.
+
     Args:
         app: A Flask application instance.
+        max_body_size: Maximum size of a request body in bytes, once
+            decompressed; larger requests are rejected with 413. None
+            disables the limit.
     """
     # Import inside function to avoid hard dependency on Flask if not used
-    from flask import request, jsonify
-    import anyio
+    import atexit
+
+    from flask import Response, request
+
+    runner = _LoopRunner()
+    atexit.register(runner.stop)
+    app.extensions["prpc_loop_runner"] = runner
+    default = get_default_codec()
+    codecs = get_codecs(default)
 
     @app.route("/rpc", methods=["POST"])
     def rpc_endpoint():
-        payload = request.get_json(force=True)
-        # Flask is generally sync, so we use anyio.run to execute the async interpreter
-        response_dict = anyio.run(handle_request, payload)
-        return jsonify(response_dict)
+        codec = select_request_codec(request.content_type, codecs, default)
+        body = request.get_data()
+        content_encoding = request.headers.get("Content-Encoding")
+        try:
+            if content_encoding and body:
+                body = decompress(body, content_encoding.strip().lower(), max_body_size)
+            if max_body_size is not None and len(body) > max_body_size:
+                return Response(
+                    default.encode({"error": "Payload Too Large"}),
+                    status=413,
+                    mimetype=default.content_type,
+                )
+            payload = codec.decode(body) if body else {}
+        except UnsupportedEncodingError:
+            return Response(
+                default.encode({"error": "Unsupported Content-Encoding"}),
+                status=415,
+                mimetype=default.content_type,
+            )
+        except (DecodeError, DecompressionError):
+            return Response(
+                default.encode({"error": "Invalid body"}),
+                status=400,
+                mimetype=default.content_type,
+            )
+        if requires_event_loop(payload):
+            response = runner.call(handle_request, payload)
+        else:
+            response = handle_request_sync(payload)
+        out = select_response_codec(request.headers.get("Accept"), codecs, codec)
+        return Response(out.encode(response), mimetype=out.content_type)
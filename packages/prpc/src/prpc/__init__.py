@@ -1,12 +1,28 @@
 __version__ = "0.1.0"
 
-from .client.python_client import RPCClient, RPCError
-from .core.decorators import default_registry, rpc
-from .core.introspection import get_procedure_schema, get_registry_schema
-from .core.interpreter import handle_request
-from .core.models import RpcRequest, RpcResponse
-from .core.registry import ProcedureRegistry
-from .transport.asgi import PRPCAsgiApp, app as asgi_app
+import importlib
+from typing import TYPE_CHECKING, Any
+
+# Public names and the module they are loaded from on first access (PEP 562),
+# so that e.g. a server never pays for importing the client and httpx.
+_LAZY_ATTRIBUTES = {
+    "ProcedureRegistry": ".core.registry",
+    "rpc": ".core.decorators",
+    "default_registry": ".core.decorators",
+    "RpcRequest": ".core.models",
+    "RpcResponse": ".core.models",
+    "handle_request": ".core.interpreter",
+    "handle_request_sync": ".core.interpreter",
+    "PRPCAsgiApp": ".transport.asgi",
+    "asgi_app": ".transport.asgi",
+    "RPCClient": ".client.python_client",
+    "RPCError": ".client.python_client",
+    "get_procedure_schema": ".core.introspection",
+    "get_registry_schema": ".core.introspection",
+}
+
+# Attributes exported under another name than in their module.
+_RENAMED = {"asgi_app": "app"}
 
 __all__ = [
     "ProcedureRegistry",
@@ -15,6 +31,7 @@ __all__ = [
     "RpcRequest",
     "RpcResponse",
     "handle_request",
+    "handle_request_sync",
     "PRPCAsgiApp",
     "asgi_app",
     "RPCClient",
@@ -22,3 +39,27 @@ __all__ = [
     "get_procedure_schema",
     "get_registry_schema",
 ]
+
+if TYPE_CHECKING:
+    from .client.python_client import RPCClient, RPCError
+    from .core.decorators import default_registry, rpc
+    from .core.interpreter import handle_request, handle_request_sync
+    from .core.introspection import get_procedure_schema, get_registry_schema
+    from .core.models import RpcRequest, RpcResponse
+    from .core.registry import ProcedureRegistry
+    from .transport.asgi import PRPCAsgiApp, app as asgi_app
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(module_name, __name__)
+    value = getattr(module, _RENAMED.get(name, name))
+    # Cache it so that __getattr__ only runs once per name.
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
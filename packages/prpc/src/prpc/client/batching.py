@@ -0,0 +1,114 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import anyio
+
+# Default time a batch stays open for more calls, in seconds.
+DEFAULT_BATCH_WINDOW = 0.002
+
+# Default maximum number of calls sent in one batch.
+DEFAULT_MAX_BATCH_SIZE = 32
+
+
+class _PendingCall:
+    __slots__ = ("payload", "done", "response", "error")
+
+    def __init__(self, payload: Dict[str, Any]) -> None:
+        self.payload = payload
+        self.done = anyio.Event()
+        self.response: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+
+class _Batch:
+    __slots__ = ("calls", "full")
+
+    def __init__(self) -> None:
+        self.calls: List[_PendingCall] = []
+        self.full = anyio.Event()
+
+
+class CallBatcher:
+    """
+    Coalesces concurrent calls into batched requests.
+
+    The first call opens a batch and waits up to ``window`` seconds, or until
+    ``max_size`` calls have joined, then sends every call of the batch in one
+    request and hands each caller the response with its ``id``. The first
+    caller's cancellation, e.g. by its deadline, also interrupts the request;
+    the other callers of the batch are then woken up and send their calls
+    again.
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        window: float = DEFAULT_BATCH_WINDOW,
+        max_size: int = DEFAULT_MAX_BATCH_SIZE,
+    ) -> None:
+        """
+        Args:
+            send_batch: Coroutine function sending a list of requests and
+                returning the decoded responses, or a single response that
+                applies to every request.
+            window: How long a batch stays open for more calls, in seconds.
+            max_size: Maximum number of calls per batch.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.window = window
+        self.max_size = max_size
+        self._send_batch = send_batch
+        self._current: Optional[_Batch] = None
+
+    async def call(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue one request and wait for its response.
+        """
+        call = _PendingCall(payload)
+        batch = self._current
+        leader = batch is None
+        if batch is None:
+            batch = self._current = _Batch()
+
+        batch.calls.append(call)
+        if len(batch.calls) >= self.max_size:
+            self._current = None
+            batch.full.set()
+
+        if leader:
+            try:
+                with anyio.move_on_after(self.window):
+                    await batch.full.wait()
+                if self._current is batch:
+                    self._current = None
+                await self._flush(batch.calls)
+            finally:
+                # Waking the callers does not wait, so cancellation cannot
+                # interrupt the hand-off.
+                if self._current is batch:
+                    self._current = None
+                for c in batch.calls:
+                    c.done.set()
+        else:
+            await call.done.wait()
+            if call.response is None and call.error is None:
+                # The first caller was cancelled before the batch completed.
+                return await self.call(payload)
+
+        if call.error is not None:
+            raise call.error
+        return call.response  # type: ignore[return-value]
+
+    async def _flush(self, calls: List[_PendingCall]) -> None:
+        try:
+            responses = await self._send_batch([c.payload for c in calls])
+            if isinstance(responses, dict):
+                responses = [dict(responses, id=c.payload["id"]) for c in calls]
+            by_id = {r.get("id"): r for r in responses if isinstance(r, dict)}
+            for c in calls:
+                c.response = by_id.get(c.payload["id"])
+                if c.response is None:
+                    c.error = RuntimeError(f"No response for request {c.payload['id']}")
+        except Exception as e:
+            for c in calls:
+                c.error = e
@@ -0,0 +1,42 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+# Shared HTTP clients, keyed by origin and connection options, with the
+# number of RPCClient instances using each.
+_shared_clients: Dict[Hashable, List[Any]] = {}
+_lock = threading.Lock()
+
+
+def acquire_shared_client(key: Hashable, factory: Callable[[], Any]) -> Any:
+    """
+    Return the shared HTTP client for ``key``, creating it on first use.
+
+    Args:
+        key: Identifies the origin and connection options of the client.
+        factory: Builds a new client when none is shared under ``key`` yet.
+    """
+    with _lock:
+        entry = _shared_clients.get(key)
+        if entry is None:
+            entry = _shared_clients[key] = [factory(), 0]
+        entry[1] += 1
+        return entry[0]
+
+
+def release_shared_client(key: Hashable) -> Optional[Any]:
+    """
+    Drop one reference to the shared client for ``key``.
+
+    Returns:
+        The client once its last user released it, for the caller to close,
+        otherwise None.
+    """
+    with _lock:
+        entry = _shared_clients.get(key)
+        if entry is None:
+            return None
+        entry[1] -= 1
+        if entry[1] > 0:
+            return None
+        del _shared_clients[key]
+        return entry[0]
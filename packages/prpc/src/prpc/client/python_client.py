@@ -1,8 +1,28 @@
+import json
+import re
 import uuid
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, Hashable, Iterator, List, Optional, Tuple, Union
 
 import httpx
 
+from ..transport.codec import Codec, get_default_codec
+from ..transport.compression import DEFAULT_COMPRESSION_MIN_SIZE, check_encoding, compress
+from .batching import DEFAULT_BATCH_WINDOW, DEFAULT_MAX_BATCH_SIZE, CallBatcher
+from .pool import acquire_shared_client, release_shared_client
+from .websocket import WebSocketConnection
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+# Same defaults as httpx.
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 5.0
+
+# How much longer than a call's deadline its HTTP request may take, in seconds,
+# so that the server's deadline error arrives before the client gives up.
+DEADLINE_MARGIN = 1.0
+
 
 class RPCError(Exception):
     """
@@ -15,22 +35,188 @@ class RPCError(Exception):
         super().__init__(f"RPC {code}: {message}")
 
 
+def parse_server_timing(value: str) -> Dict[str, float]:
+    """
+    Parse a ``Server-Timing`` header into durations in milliseconds by phase.
+
+    Entries without a ``dur`` parameter are ignored.
+    """
+    timings: Dict[str, float] = {}
+    for entry in value.split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        for param in params:
+            key, _, duration = param.partition("=")
+            if key.strip() == "dur":
+                try:
+                    timings[name] = float(duration.strip('" '))
+                except ValueError:
+                    pass
+    return timings
+
+
 class RPCClient:
     """
     A dynamic RPC client for pRPC.
     Allows calling remote procedures as if they were local methods.
+
+    The underlying sync and async HTTP clients are only created when first used.
+
+    When the server reports a ``Server-Timing`` header (see
+    ``PRPCAsgiApp(server_timing=True)``), the phase breakdown of the last
+    response is available as ``last_server_timing``, in milliseconds.
+
+    Calls are sent as JSON unless a ``codec`` is given, e.g. ``MsgpackCodec()``
+    for the smaller and faster MessagePack format, or ``FramesCodec()`` to
+    exchange bytes and NumPy arrays as raw binary attachments: they are
+    returned as ``memoryview`` and ``ndarray`` objects over the response body.
+
+    Compressed responses are decompressed transparently (gzip always, brotli
+    and zstd when ``brotli`` and ``zstandard`` are installed). Set
+    ``compression`` to compress large request bodies too.
+
+    :meth:`fetch_schema` returns the schema of the server's procedures. It is
+    kept along with its ``ETag``, and later fetches only download it again if
+    it has changed.
     """
 
-    def __init__(self, base_url: str) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        websocket: bool = False,
+        batch: bool = False,
+        batch_window: float = DEFAULT_BATCH_WINDOW,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        timeout: Union[float, httpx.Timeout, None] = DEFAULT_TIMEOUT,
+        max_connections: Optional[int] = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: Optional[int] = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: Optional[float] = DEFAULT_KEEPALIVE_EXPIRY,
+        http2: bool = False,
+        share_pool: bool = False,
+        call_timeout: Optional[float] = None,
+        codec: Optional[Codec] = None,
+        compression: Optional[str] = None,
+        compression_level: Optional[int] = None,
+        compression_min_size: int = DEFAULT_COMPRESSION_MIN_SIZE,
+    ) -> None:
         """
         Initialize the RPC client.
 
         Args:
             base_url: The base URL of the pRPC server.
+            websocket: Send async calls over one persistent WebSocket connection
+                instead of an HTTP request each. Requires the ``websockets``
+                package. Sync calls and streams still use HTTP.
+            batch: Coalesce concurrent async calls into batched requests.
+                Calls made within ``batch_window`` seconds of each other, up
+                to ``max_batch_size`` of them, are sent in one request.
+            batch_window: How long a batch stays open for more calls, in seconds.
+            max_batch_size: Maximum number of calls per batched request.
+            timeout: Request timeout in seconds, an ``httpx.Timeout``, or None
+                to wait forever.
+            max_connections: Maximum number of open connections per HTTP client.
+            max_keepalive_connections: Maximum number of idle connections kept
+                open for reuse.
+            keepalive_expiry: Seconds an idle connection is kept open.
+            http2: Multiplex requests over HTTP/2 connections. Requires the
+                ``h2`` package (``httpx[http2]``).
+            share_pool: Reuse the connection pool of other RPCClient instances
+                with the same origin and options instead of opening a new one.
+                A shared async pool must only be used from one event loop.
+            call_timeout: Default deadline of every call, in seconds. It is
+                sent with the request and the server cancels the call once it
+                elapses. Override per call with ``client.method.with_timeout()``.
+                The HTTP request of a call waits up to its deadline plus
+                ``DEADLINE_MARGIN``, even beyond ``timeout``.
+            codec: Codec of request and response bodies over HTTP, instead of
+                JSON. Stream responses and WebSocket calls are always JSON.
+            compression: Encoding of request bodies of at least
+                ``compression_min_size`` bytes: ``"gzip"``, ``"zstd"`` or
+                ``"br"``. The server must accept it; ``PRPCAsgiApp`` does.
+            compression_level: Compression level, or None for the default
+                level of the algorithm.
+            compression_min_size: Request bodies smaller than this, in bytes,
+                are sent uncompressed.
         """
+        if websocket and batch:
+            raise ValueError("batch and websocket modes cannot be combined")
+        if compression is not None:
+            check_encoding(compression)
         self.base_url = base_url.rstrip("/")
-        self._async_client = httpx.AsyncClient(base_url=self.base_url)
-        self._sync_client = httpx.Client(base_url=self.base_url)
+        self._rpc_url = self.base_url + "/rpc"
+        self._client_options: Dict[str, Any] = {
+            "timeout": timeout,
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            "http2": http2,
+        }
+        self._share_pool = share_pool
+        self.call_timeout = call_timeout
+        self.last_server_timing: Optional[Dict[str, float]] = None
+        self.codec = codec
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_min_size = compression_min_size
+        self._codec_headers: Dict[str, str] = {}
+        if codec is not None:
+            self._codec_headers = {"content-type": codec.content_type, "accept": codec.content_type}
+        self._schema: Optional[Tuple[str, Dict[str, Any]]] = None
+        self._async_http: Optional[httpx.AsyncClient] = None
+        self._sync_http: Optional[httpx.Client] = None
+        self._websocket: Optional[WebSocketConnection] = None
+        if websocket:
+            ws_url = re.sub(r"^http", "ws", self.base_url)
+            self._websocket = WebSocketConnection(ws_url + "/rpc")
+        self._batcher: Optional[CallBatcher] = None
+        if batch:
+            self._batcher = CallBatcher(self._send_batch, batch_window, max_batch_size)
+
+    def _pool_key(self, kind: str) -> Tuple[Hashable, ...]:
+        url = httpx.URL(self.base_url)
+        limits = self._client_options["limits"]
+        return (
+            kind,
+            url.scheme,
+            url.host,
+            url.port,
+            repr(self._client_options["timeout"]),
+            limits.max_connections,
+            limits.max_keepalive_connections,
+            limits.keepalive_expiry,
+            self._client_options["http2"],
+        )
+
+    @property
+    def _async_client(self) -> httpx.AsyncClient:
+        if self._async_http is None:
+            if self._share_pool:
+                self._async_http = acquire_shared_client(
+                    self._pool_key("async"), lambda: httpx.AsyncClient(**self._client_options)
+                )
+            else:
+                self._async_http = httpx.AsyncClient(**self._client_options)
+        return self._async_http
+
+    @_async_client.setter
+    def _async_client(self, client: httpx.AsyncClient) -> None:
+        self._async_http = client
+
+    @property
+    def _sync_client(self) -> httpx.Client:
+        if self._sync_http is None:
+            if self._share_pool:
+                self._sync_http = acquire_shared_client(
+                    self._pool_key("sync"), lambda: httpx.Client(**self._client_options)
+                )
+            else:
+                self._sync_http = httpx.Client(**self._client_options)
+        return self._sync_http
+
+    @_sync_client.setter
+    def _sync_client(self, client: httpx.Client) -> None:
+        self._sync_http = client
 
     def __getattr__(self, name: str) -> Any:
         """
@@ -64,15 +250,179 @@ class RPCClient:
         return RPCCallable(self, name)
 
     async def call_async(self, method: str, *args: Any, **kwargs: Any) -> Any:
-        payload = self._prepare_payload(method, *args, **kwargs)
-        response = await self._async_client.post("/rpc", json=payload)
-        return self._handle_response(response)
+        return await self._call_async(self._prepare_payload(method, *args, **kwargs))
 
     def call_sync(self, method: str, *args: Any, **kwargs: Any) -> Any:
-        payload = self._prepare_payload(method, *args, **kwargs)
-        response = self._sync_client.post("/rpc", json=payload)
+        return self._call_sync(self._prepare_payload(method, *args, **kwargs))
+
+    async def _call_async(self, payload: Dict[str, Any]) -> Any:
+        if self._websocket is not None:
+            return self._handle_data(await self._websocket.call(payload))
+        if self._batcher is not None:
+            return self._handle_data(await self._batcher.call(payload))
+        response = await self._async_client.post(self._rpc_url, **self._body(payload))
+        return self._handle_response(response)
+
+    def _call_sync(self, payload: Dict[str, Any]) -> Any:
+        response = self._sync_client.post(self._rpc_url, **self._body(payload))
         return self._handle_response(response)
 
+    async def _send_batch(self, payloads: List[Dict[str, Any]]) -> Any:
+        body = payloads[0] if len(payloads) == 1 else payloads
+        response = await self._async_client.post(self._rpc_url, **self._body(body))
+        shed = self._shed_data(response)
+        if shed is not None:
+            return shed
+        response.raise_for_status()
+        return self._decode(response)
+
+    def _body(self, body: Any, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        The arguments sending ``body`` with the client's codec and compression,
+        and a timeout that outlasts the deadline of its calls.
+        """
+        if self.codec is None and self.compression is None:
+            arguments: Dict[str, Any] = {"json": body}
+            if headers is not None:
+                arguments["headers"] = headers
+        else:
+            codec = self.codec or get_default_codec()
+            content = codec.encode(body)
+            headers = {**self._codec_headers, "content-type": codec.content_type, **(headers or {})}
+            if self.compression is not None and len(content) >= self.compression_min_size:
+                content = compress(content, self.compression, self.compression_level)
+                headers["content-encoding"] = self.compression
+            arguments = {"content": content, "headers": headers}
+        timeout = self._request_timeout(body)
+        if timeout is not None:
+            arguments["timeout"] = timeout
+        return arguments
+
+    def _request_timeout(self, body: Any) -> Optional[httpx.Timeout]:
+        """
+        The timeout of a request whose calls have a deadline, or None to keep
+        the client's timeout.
+
+        The read timeout is raised to the longest deadline plus
+        ``DEADLINE_MARGIN``, so that the request waits for the server to
+        answer or to report the deadline as exceeded.
+        """
+        entries = body if isinstance(body, list) else [body]
+        deadlines = [
+            entry["timeout"]
+            for entry in entries
+            if isinstance(entry, dict) and entry.get("timeout") is not None
+        ]
+        if not deadlines:
+            return None
+        configured = httpx.Timeout(self._client_options["timeout"])
+        needed = max(deadlines) + DEADLINE_MARGIN
+        if configured.read is None or configured.read >= needed:
+            return None
+        return httpx.Timeout(
+            connect=configured.connect,
+            read=needed,
+            write=configured.write,
+            pool=configured.pool,
+        )
+
+    def _decode(self, response: httpx.Response) -> Any:
+        codec = self.codec
+        if codec is not None and response.headers.get("content-type", "").startswith(
+            codec.content_type
+        ):
+            return codec.decode(response.content)
+        return response.json()
+
+    def stream(self, method: str, *args: Any, **kwargs: Any) -> Iterator[Any]:
+        """
+        Call a streaming (generator) procedure and iterate over its items.
+
+        Items are yielded as the server produces them. Calling a regular
+        procedure yields its result once, or each element if it is a list.
+        """
+        return self._stream(self._prepare_payload(method, *args, **kwargs))
+
+    def _stream(self, payload: Dict[str, Any]) -> Iterator[Any]:
+        with self._sync_client.stream(
+            "POST", self._rpc_url, **self._body(payload, {"accept": NDJSON_CONTENT_TYPE})
+        ) as response:
+            if not self._is_stream(response):
+                response.read()
+                yield from self._unstreamed_items(response)
+                return
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield self._handle_data(json.loads(line))
+
+    def astream(self, method: str, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        """
+        Async version of :meth:`stream`.
+        """
+        return self._astream(self._prepare_payload(method, *args, **kwargs))
+
+    async def _astream(self, payload: Dict[str, Any]) -> AsyncIterator[Any]:
+        async with self._async_client.stream(
+            "POST", self._rpc_url, **self._body(payload, {"accept": NDJSON_CONTENT_TYPE})
+        ) as response:
+            if not self._is_stream(response):
+                await response.aread()
+                for item in self._unstreamed_items(response):
+                    yield item
+                return
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    yield self._handle_data(json.loads(line))
+
+    def fetch_schema(self) -> Dict[str, Any]:
+        """
+        Fetch the schema document of the server, from ``GET /rpc/schema``.
+
+        Returns:
+            The document, with the schema of every procedure by name under
+            ``"procedures"``.
+        """
+        response = self._sync_client.get(
+            self.base_url + "/rpc/schema", headers=self._schema_headers()
+        )
+        return self._handle_schema_response(response)
+
+    async def afetch_schema(self) -> Dict[str, Any]:
+        """
+        Async version of :meth:`fetch_schema`.
+        """
+        response = await self._async_client.get(
+            self.base_url + "/rpc/schema", headers=self._schema_headers()
+        )
+        return self._handle_schema_response(response)
+
+    def _schema_headers(self) -> Dict[str, str]:
+        if self._schema is None:
+            return {}
+        return {"if-none-match": self._schema[0]}
+
+    def _handle_schema_response(self, response: httpx.Response) -> Dict[str, Any]:
+        if response.status_code == 304 and self._schema is not None:
+            return self._schema[1]
+        response.raise_for_status()
+        document = response.json()
+        etag = response.headers.get("etag")
+        self._schema = (etag, document) if etag is not None else None
+        return document
+
+    @staticmethod
+    def _is_stream(response: httpx.Response) -> bool:
+        return response.headers.get("content-type", "").startswith(NDJSON_CONTENT_TYPE)
+
+    def _unstreamed_items(self, response: httpx.Response) -> Iterator[Any]:
+        result = self._handle_response(response)
+        if isinstance(result, list):
+            yield from result
+        else:
+            yield result
+
     def _prepare_payload(self, method: str, *args: Any, **kwargs: Any) -> Dict[str, Any]:
         params: Union[List[Any], Dict[str, Any]]
         if kwargs:
@@ -80,25 +430,63 @@ class RPCClient:
         else:
             params = list(args)
 
-        return {
+        payload = {
             "id": str(uuid.uuid4()),
             "method": method,
             "params": params,
         }
+        if self.call_timeout is not None:
+            payload["timeout"] = self.call_timeout
+        return payload
 
     def _handle_response(self, response: httpx.Response) -> Any:
+        server_timing = response.headers.get("server-timing")
+        if server_timing is not None:
+            self.last_server_timing = parse_server_timing(server_timing)
+        shed = self._shed_data(response)
+        if shed is not None:
+            return self._handle_data(shed)
         response.raise_for_status()
-        data = response.json()
+        return self._handle_data(self._decode(response))
+
+    def _shed_data(self, response: httpx.Response) -> Optional[Dict[str, Any]]:
+        """The RPC error response of a call shed by the server, if it is one."""
+        if response.status_code != 503:
+            return None
+        # Calls shed by the server still carry their RPC error.
+        try:
+            data = self._decode(response)
+        except ValueError:
+            return None
+        if isinstance(data, dict) and data.get("error"):
+            return data
+        return None
+
+    def _handle_data(self, data: Dict[str, Any]) -> Any:
         if "error" in data and data["error"]:
             error = data["error"]
             raise RPCError(error["code"], error["message"])
         return data.get("result")
 
     async def aclose(self) -> None:
-        await self._async_client.aclose()
+        if self._websocket is not None:
+            await self._websocket.close()
+        client, self._async_http = self._async_http, None
+        if client is None:
+            return
+        if self._share_pool:
+            client = release_shared_client(self._pool_key("async"))
+        if client is not None:
+            await client.aclose()
 
     def close(self) -> None:
-        self._sync_client.close()
+        client, self._sync_http = self._sync_http, None
+        if client is None:
+            return
+        if self._share_pool:
+            client = release_shared_client(self._pool_key("sync"))
+        if client is not None:
+            client.close()
 
     async def __aenter__(self) -> "RPCClient":
         return self
@@ -119,14 +507,38 @@ class RPCCallable:
     Supports both sync call and async call (via .aio() or similar).
     """
 
-    def __init__(self, client: RPCClient, method: str):
+    def __init__(self, client: RPCClient, method: str, timeout: Optional[float] = None):
         self.client = client
         self.method = method
+        self.timeout = timeout
+
+    def with_timeout(self, timeout: Optional[float]) -> "RPCCallable":
+        """
+        Return this procedure with a per-call deadline, in seconds.
+
+        Usage:
+            client.report.with_timeout(2.5)(report_id)
+        """
+        return RPCCallable(self.client, self.method, timeout)
+
+    def _payload(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        payload = self.client._prepare_payload(self.method, *args, **kwargs)
+        if self.timeout is not None:
+            payload["timeout"] = self.timeout
+        return payload
 
     def __call__(self, *args: Any, **kwargs: Any) -> Any:
         """Sync call by default."""
-        return self.client.call_sync(self.method, *args, **kwargs)
+        return self.client._call_sync(self._payload(args, kwargs))
 
     async def aio(self, *args: Any, **kwargs: Any) -> Any:
         """Explicit async call."""
-        return await self.client.call_async(self.method, *args, **kwargs)
+        return await self.client._call_async(self._payload(args, kwargs))
+
+    def stream(self, *args: Any, **kwargs: Any) -> Iterator[Any]:
+        """Iterate over the items of a streaming procedure."""
+        return self.client._stream(self._payload(args, kwargs))
+
+    def astream(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        """Asynchronously iterate over the items of a streaming procedure."""
+        return self.client._astream(self._payload(args, kwargs))
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class WebSocketConnection:
+    """
+    A persistent WebSocket connection multiplexing many RPC calls.
+
+    Requests are sent as soon as they are made and responses are matched to
+    their callers by ``id``, so any number of calls can be in flight at once.
+    The connection is opened on first use.
+
+    Requires the optional ``websockets`` package unless a custom ``connect``
+    factory is given.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        connect: Optional[Callable[[str], Awaitable[Any]]] = None,
+    ) -> None:
+        """
+        Args:
+            url: The ``ws://`` or ``wss://`` URL of the RPC endpoint.
+            connect: Coroutine function opening the socket. Defaults to
+                ``websockets.connect``.
+        """
+        self.url = url
+        self._connect = connect
+        self._socket: Optional[Any] = None
+        self._reader: Optional["asyncio.Task[None]"] = None
+        self._pending: Dict[Any, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._lock = asyncio.Lock()
+
+    async def _ensure_connected(self) -> Any:
+        async with self._lock:
+            if self._socket is None:
+                connect = self._connect
+                if connect is None:
+                    try:
+                        import websockets
+                    except ImportError:
+                        raise RuntimeError(
+                            "WebSocket mode requires the 'websockets' package"
+                        ) from None
+                    connect = websockets.connect
+                self._socket = await connect(self.url)
+                self._reader = asyncio.create_task(self._read_loop(self._socket))
+        return self._socket
+
+    async def _read_loop(self, socket: Any) -> None:
+        error: BaseException = ConnectionError("WebSocket connection closed")
+        try:
+            async for message in socket:
+                data = json.loads(message)
+                for response in data if isinstance(data, list) else [data]:
+                    future = self._pending.pop(response.get("id"), None)
+                    if future is not None and not future.done():
+                        future.set_result(response)
+        except Exception as e:
+            error = e
+        finally:
+            if self._socket is socket:
+                self._socket = None
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(error)
+
+    async def call(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send one request and wait for the response with the same ``id``.
+
+        Raises:
+            ConnectionError: If the connection closes before the response arrives.
+        """
+        socket = await self._ensure_connected()
+        future: "asyncio.Future[Dict[str, Any]]" = asyncio.get_running_loop().create_future()
+        self._pending[payload["id"]] = future
+        try:
+            await socket.send(json.dumps(payload))
+            return await future
+        finally:
+            self._pending.pop(payload["id"], None)
+
+    async def close(self) -> None:
+        """Close the socket and fail any call still waiting for a response."""
+        socket, self._socket = self._socket, None
+        if socket is not None:
+            await socket.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
@@ -0,0 +1,111 @@
+from typing import Any, Callable, Dict, List, Sequence
+
+# Key of the placeholders that stand for a buffer in serialized data.
+ATTACHMENT_KEY = "$attachment"
+
+
+def _is_ndarray(obj: Any) -> bool:
+    # Checked by name so that NumPy is never imported here.
+    cls = type(obj)
+    return cls.__name__ == "ndarray" and cls.__module__ == "numpy"
+
+
+def is_buffer(obj: Any) -> bool:
+    """Whether ``obj`` is carried as a binary attachment: bytes-like or a NumPy array."""
+    return isinstance(obj, (bytes, bytearray, memoryview)) or _is_ndarray(obj)
+
+
+def buffer_view(obj: Any) -> memoryview:
+    """
+    A flat byte view of a buffer, without copying it unless it is a
+    non-contiguous array.
+    """
+    if _is_ndarray(obj) and not obj.flags.c_contiguous:
+        import numpy
+
+        obj = numpy.ascontiguousarray(obj)
+    view = memoryview(obj)
+    if view.ndim != 1 or view.format != "B":
+        view = view.cast("B")
+    return view
+
+
+def placeholder(index: int, obj: Any) -> Dict[str, Any]:
+    """The placeholder of the ``index``-th buffer; arrays also record their dtype and shape."""
+    if _is_ndarray(obj):
+        return {ATTACHMENT_KEY: index, "dtype": obj.dtype.str, "shape": list(obj.shape)}
+    return {ATTACHMENT_KEY: index}
+
+
+def _is_placeholder(obj: Dict[str, Any]) -> bool:
+    return isinstance(obj.get(ATTACHMENT_KEY), int)
+
+
+def extract_buffers(obj: Any, buffers: List[Any]) -> Any:
+    """
+    Replace the buffers found in lists, tuples and dicts of ``obj`` with
+    placeholders, appending them to ``buffers``.
+    """
+    if is_buffer(obj):
+        buffers.append(obj)
+        return placeholder(len(buffers) - 1, obj)
+    if isinstance(obj, dict):
+        return {k: extract_buffers(v, buffers) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [extract_buffers(v, buffers) for v in obj]
+    return obj
+
+
+def _replace_placeholders(obj: Any, replace: Callable[[Dict[str, Any]], Any]) -> Any:
+    if isinstance(obj, dict):
+        if _is_placeholder(obj):
+            return replace(obj)
+        return {k: _replace_placeholders(v, replace) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_replace_placeholders(v, replace) for v in obj]
+    return obj
+
+
+def restore_buffers(obj: Any, frames: Sequence[memoryview]) -> Any:
+    """
+    Replace placeholders with the received ``frames``: arrays are rebuilt as
+    NumPy arrays over the frame when NumPy is installed, everything else is a
+    read-only ``memoryview``. Nothing is copied.
+    """
+
+    def replace(ref: Dict[str, Any]) -> Any:
+        frame = frames[ref[ATTACHMENT_KEY]]
+        if "dtype" in ref:
+            try:
+                import numpy
+            except ImportError:
+                return frame
+            return numpy.frombuffer(frame, dtype=ref["dtype"]).reshape(ref["shape"])
+        return frame
+
+    return _replace_placeholders(obj, replace)
+
+
+class Attached:
+    """
+    A serialized result whose buffers are kept out of the serialized data.
+
+    ``data`` holds placeholders numbered after ``buffers``. Codecs either send
+    the buffers as separate frames or inline them with :meth:`inline`.
+    """
+
+    __slots__ = ("data", "buffers")
+
+    def __init__(self, data: Any, buffers: List[Any]) -> None:
+        self.data = data
+        self.buffers = buffers
+
+    def inline(self, convert: Callable[[Any], Any]) -> Any:
+        """Return ``data`` with each placeholder replaced by ``convert(buffer)``."""
+        buffers = self.buffers
+        return _replace_placeholders(
+            self.data, lambda ref: convert(buffers[ref[ATTACHMENT_KEY]])
+        )
+
+    def __repr__(self) -> str:
+        return f"Attached({self.data!r}, {len(self.buffers)} buffers)"
@@ -0,0 +1,239 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import anyio
+from pydantic_core import to_jsonable_python
+
+# Default number of results kept when only a TTL is given.
+DEFAULT_CACHE_SIZE = 1024
+
+
+def make_cache_key(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Optional[str]:
+    """
+    Build a canonical key from bound call arguments.
+
+    The arguments are the validated output of ``ProcedurePlan.bind``, so
+    ``f(1, 2)`` and ``f(a=1, b="2")`` map to the same key.
+
+    Returns:
+        The key, or None if the arguments cannot be canonicalized, in which
+        case the call is not cached.
+    """
+    try:
+        return json.dumps(
+            to_jsonable_python([args, kwargs]), sort_keys=True, separators=(",", ":")
+        )
+    except Exception:
+        return None
+
+
+class _Flight:
+    __slots__ = ("thread", "done", "value", "error", "cancelled")
+
+    def __init__(self) -> None:
+        self.thread = threading.get_ident()
+        self.done = anyio.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.cancelled = False
+
+
+class _SyncFlight:
+    __slots__ = ("done", "value", "error", "cancelled")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.cancelled = False
+
+
+class ResultCache:
+    """
+    A bounded LRU cache of procedure results with an optional time-to-live.
+
+    Concurrent misses for the same key are deduplicated ("single-flight"): the
+    first caller computes the result and the others wait for it. Failed calls
+    are not cached. If the computing caller is cancelled (e.g. its deadline
+    passed or its client went away), a waiting caller computes it instead.
+    Callers on another event loop thread compute on their own, since they
+    cannot wait on this loop. Synchronous callers, such as sync procedures in
+    the thread pool, use :meth:`get_or_compute_sync` and wait on each other
+    across threads.
+    """
+
+    def __init__(
+        self, ttl: Optional[float] = None, max_size: int = DEFAULT_CACHE_SIZE
+    ) -> None:
+        """
+        Args:
+            ttl: Seconds a result stays valid, or None for no expiry.
+            max_size: Maximum number of results kept; the least recently
+                used one is evicted first.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._sync_inflight: Dict[str, _SyncFlight] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Look up a result.
+
+        Returns:
+            ``(True, result)`` on a hit, ``(False, None)`` on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a result, evicting the least recently used one if full."""
+        expires = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one result, or every result when ``key`` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit and miss counters and the number of cached results."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
+
+    async def get_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return the cached result for ``key``, computing it on a miss.
+
+        Concurrent callers missing the same key share a single computation.
+        """
+        while True:
+            found, value = self.get(key)
+            if found:
+                return value
+
+            with self._lock:
+                flight = self._inflight.get(key)
+                owner = flight is None or flight.thread != threading.get_ident()
+                if owner:
+                    flight = self._inflight[key] = _Flight()
+                else:
+                    # Served by another caller's computation: count it as a hit.
+                    self.misses -= 1
+                    self.hits += 1
+            assert flight is not None
+
+            if owner:
+                return await self._compute(key, flight, compute)
+
+            await flight.done.wait()
+            if not flight.cancelled:
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+            # The computing caller was cancelled: try again, which computes
+            # the result unless another waiter has already taken over.
+            with self._lock:
+                self.hits -= 1
+
+    async def _compute(
+        self, key: str, flight: _Flight, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        try:
+            value = await compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        except BaseException:
+            flight.cancelled = True
+            raise
+        else:
+            self.set(key, value)
+            flight.value = value
+            return value
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            flight.done.set()
+
+    def get_or_compute_sync(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Blocking version of :meth:`get_or_compute` for threads.
+        """
+        while True:
+            found, value = self.get(key)
+            if found:
+                return value
+
+            with self._lock:
+                flight = self._sync_inflight.get(key)
+                owner = flight is None
+                if owner:
+                    flight = self._sync_inflight[key] = _SyncFlight()
+                else:
+                    self.misses -= 1
+                    self.hits += 1
+            assert flight is not None
+
+            if owner:
+                return self._compute_sync(key, flight, compute)
+
+            flight.done.wait()
+            if not flight.cancelled:
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+            with self._lock:
+                self.hits -= 1
+
+    def _compute_sync(
+        self, key: str, flight: _SyncFlight, compute: Callable[[], Any]
+    ) -> Any:
+        try:
+            value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        except BaseException:
+            flight.cancelled = True
+            raise
+        else:
+            self.set(key, value)
+            flight.value = value
+            return value
+        finally:
+            with self._lock:
+                del self._sync_inflight[key]
+            flight.done.set()
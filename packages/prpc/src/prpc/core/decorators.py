@@ -1,6 +1,6 @@
-import functools
-from typing import Any, Callable, Optional, Union, overload
+from typing import Any, Callable, Optional, Sequence, Union, overload
 
+from .interceptors import Interceptor
 from .registry import ProcedureRegistry
 
 # Global default registry for easy use
@@ -12,33 +12,91 @@ def rpc(fn: Callable[..., Any]) -> Callable[..., Any]: ...
 
 
 @overload
-def rpc(*, name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]: ...
+def rpc(
+    *,
+    name: Optional[str] = None,
+    inline: bool = False,
+    cache_ttl: Optional[float] = None,
+    cache_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    max_queue: int = 0,
+    queue_timeout: Optional[float] = None,
+    interceptors: Sequence[Interceptor] = (),
+    binary: bool = False,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]: ...
 
 
 def rpc(
-    fn: Optional[Callable[..., Any]] = None, *, name: Optional[str] = None
+    fn: Optional[Callable[..., Any]] = None,
+    *,
+    name: Optional[str] = None,
+    inline: bool = False,
+    cache_ttl: Optional[float] = None,
+    cache_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    max_queue: int = 0,
+    queue_timeout: Optional[float] = None,
+    interceptors: Sequence[Interceptor] = (),
+    binary: bool = False,
 ) -> Union[Callable[..., Any], Callable[[Callable[..., Any]], Callable[..., Any]]]:
     """
     Decorator to register a function as an RPC procedure.
 
+    Synchronous procedures run in a thread pool so they cannot block the event
+    loop; pass ``inline=True`` to call a trivially cheap one directly instead.
+
+    Pure or read-mostly procedures can cache their results with ``cache_ttl``
+    (seconds) and/or ``cache_size`` (LRU bound); see ``ProcedureRegistry.invalidate``.
+
+    Expensive procedures can cap how many of their calls run at once with
+    ``max_concurrency``. Up to ``max_queue`` further calls wait for a slot, for
+    at most ``queue_timeout`` seconds; the rest are rejected with a 503 error.
+
+    ``interceptors`` wrap this procedure only; see
+    ``ProcedureRegistry.add_interceptor`` for interceptors wrapping every
+    procedure. The function itself is registered and returned unchanged.
+
+    Procedures returning bytes or NumPy arrays can set ``binary`` to send them
+    as raw binary attachments to clients that accept them, instead of
+    converting them.
+
     Usage:
         @rpc
         def my_func(): ...
 
         @rpc(name="custom_name")
         def my_func(): ...
-    """
 
-    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
-        procedure_name = name or func.__name__
+        @rpc(inline=True)
+        def cheap_func(): ...
+
+        @rpc(cache_ttl=30, cache_size=10000)
+        def lookup(key: str): ...
 
-        @functools.wraps(func)
-        def wrapper(*args: Any, **kwargs: Any) -> Any:
-            return func(*args, **kwargs)
+        @rpc(max_concurrency=4, max_queue=16, queue_timeout=1.0)
+        def render_report(report_id: int): ...
 
-        default_registry.register(procedure_name, wrapper)
-        return wrapper
+        @rpc(interceptors=[require_admin])
+        def delete_user(user_id: int): ...
 
+        @rpc(binary=True)
+        def embeddings(ids: List[int]) -> np.ndarray: ...
+    """
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        default_registry.register(
+            name or func.__name__,
+            func,
+            inline=inline,
+            cache_ttl=cache_ttl,
+            cache_size=cache_size,
+            max_concurrency=max_concurrency,
+            max_queue=max_queue,
+            queue_timeout=queue_timeout,
+            interceptors=interceptors,
+            binary=binary,
+        )
+        return func
 
     if fn is None:
         return decorator
@@ -0,0 +1,144 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import anyio.to_thread
+
+from .limiter import OverloadedError
+
+# Same default as ``concurrent.futures.ThreadPoolExecutor``.
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+
+class ExecutorBusyError(OverloadedError):
+    """
+    Raised when a sync procedure cannot be queued because the pool is saturated.
+    """
+
+
+class SyncExecutor:
+    """
+    A bounded thread pool for running synchronous procedures off the event loop.
+
+    At most ``max_workers`` procedures run at the same time. When ``max_queue``
+    is set, at most that many further calls may wait for a free worker; calls
+    beyond that are rejected with :class:`ExecutorBusyError` instead of queuing
+    without bound.
+
+    The pool is shared by every event loop using the executor. On anyio
+    backends other than asyncio, calls run in anyio's worker threads instead.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, max_queue: Optional[int] = None) -> None:
+        """
+        Args:
+            max_workers: Number of worker threads.
+            max_queue: Maximum number of calls waiting for a worker, or None
+                for no limit.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of calls currently running or waiting for a worker."""
+        return self._pending
+
+    def _releaser(self) -> Callable[..., None]:
+        """A function freeing one pending slot, however often it is called."""
+        released = False
+
+        def release(*_: Any) -> None:
+            nonlocal released
+            with self._lock:
+                if not released:
+                    released = True
+                    self._pending -= 1
+
+        return release
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="prpc-worker"
+                    )
+        return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run ``fn(*args, **kwargs)`` in the pool and wait for its result.
+
+        A cancelled call keeps its slot until its thread finishes, so that
+        abandoned threads still count towards the limit.
+
+        Raises:
+            ExecutorBusyError: If the pool and its queue are full.
+        """
+        with self._lock:
+            if self.max_queue is not None and self._pending >= self.max_workers + self.max_queue:
+                raise ExecutorBusyError("Server busy: too many pending calls")
+            self._pending += 1
+
+        release = self._releaser()
+        call = functools.partial(fn, *args, **kwargs)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return await self._run_in_anyio_thread(call, release)
+
+        try:
+            # Propagate context variables to the worker, like asyncio.to_thread.
+            ctx = contextvars.copy_context()
+            future = self._get_pool().submit(ctx.run, call)
+        except BaseException:
+            release()
+            raise
+        # Also called when the call is cancelled before a worker picks it up.
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    async def _run_in_anyio_thread(
+        call: Callable[[], Any], release: Callable[..., None]
+    ) -> Any:
+        started = threading.Event()
+
+        def work() -> Any:
+            started.set()
+            try:
+                # The result is boxed, as trio rejects sync functions that
+                # return a coroutine, which the caller may await.
+                return (call(),)
+            finally:
+                release()
+
+        try:
+            # Like the asyncio path, give up on the thread when cancelled.
+            (result,) = await anyio.to_thread.run_sync(work, abandon_on_cancel=True)
+        except BaseException:
+            if not started.is_set():
+                release()
+            raise
+        return result
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker threads. The pool is recreated on the next call."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+
+# Executor used when the caller does not provide one
+default_executor = SyncExecutor()
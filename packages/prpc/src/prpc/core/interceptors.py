@@ -0,0 +1,28 @@
+from typing import Any, Callable, Sequence
+
+# An interceptor receives the name of a procedure and the callable that runs
+# it, and returns the callable to run instead. It is applied once, when the
+# procedure is registered, so it costs nothing per call beyond what the
+# returned callable itself does.
+#
+# The returned callable must be of the same kind as the one it wraps: a
+# coroutine function around an async procedure, a (async) generator function
+# around a (async) generator procedure, and a plain function around a sync
+# one, which runs in the thread pool like the procedure itself.
+Interceptor = Callable[[str, Callable[..., Any]], Callable[..., Any]]
+
+
+def compose_interceptors(
+    name: str, fn: Callable[..., Any], interceptors: Sequence[Interceptor]
+) -> Callable[..., Any]:
+    """
+    Wrap ``fn`` in ``interceptors``, the first one being the outermost.
+
+    Returns:
+        The callable running the whole chain, or ``fn`` itself if there is no
+        interceptor.
+    """
+    call = fn
+    for interceptor in reversed(interceptors):
+        call = interceptor(name, call)
+    return call
@@ -1,56 +1,537 @@
-import asyncio
 import inspect
-from typing import Any, Dict
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import anyio
 
 from .decorators import default_registry
-from .models import RpcErrorModel, RpcRequest, RpcResponse
+from .executor import SyncExecutor, default_executor
+from .limiter import ConcurrencyLimiter, OverloadedError
+from .metrics import Metrics, default_metrics
+from .models import RpcRequest
+from .plan import InvalidParamsError, ProcedurePlan
+
+# Default number of entries of a batch that are executed at the same time.
+DEFAULT_BATCH_CONCURRENCY = 16
+
+# Error code of calls shed because the procedure or the thread pool is saturated.
+OVERLOADED = 503
+
+# Error code of calls cancelled because their ``timeout`` elapsed.
+DEADLINE_EXCEEDED = 504
+
+# Error code recorded in the metrics for calls cancelled before they
+# completed, e.g. because the client disconnected.
+CANCELLED = 499
+
+# Marks the end of a sync generator when it is advanced in a worker thread.
+_EXHAUSTED = object()
+
+# Responses are built as plain dicts with the same shape as
+# ``RpcResponse.model_dump()``; constructing and dumping the model on every
+# call is measurable overhead and the transports encode the dict directly.
+
 
+def _result(request_id: Any, result: Any) -> Dict[str, Any]:
+    return {"id": request_id, "result": result, "error": None}
 
-async def handle_request(payload: Dict[str, Any]) -> Dict[str, Any]:
+
+def _error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {"id": request_id, "result": None, "error": {"code": code, "message": message}}
+
+
+async def handle_request(
+    payload: Union[Dict[str, Any], List[Any]],
+    *,
+    max_concurrency: Optional[int] = None,
+    executor: Optional[SyncExecutor] = None,
+    timings: Optional[Dict[str, int]] = None,
+    metrics: Optional[Metrics] = None,
+) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
     """
-    Handle an incoming RPC request.
+    Handle an incoming RPC request or a batch of requests.
+
+    A request carrying a ``timeout`` (in seconds) is cancelled once it elapses
+    and answered with a ``DEADLINE_EXCEEDED`` error. A synchronous procedure
+    running in the thread pool cannot be interrupted; its result is dropped.
 
     Args:
-        payload: The raw dictionary representing the RPC request.
+        payload: The raw dictionary representing the RPC request, or a list of
+            them to execute as a batch.
+        max_concurrency: Maximum number of batch entries running at once.
+            Defaults to ``DEFAULT_BATCH_CONCURRENCY``.
+        executor: Thread pool for synchronous procedures. Defaults to
+            ``default_executor``.
+        timings: If given, the nanoseconds spent in each phase are added to
+            it: ``validate`` (parsing the request and its params), ``call``
+            (running the procedure) and ``serialize`` (converting its result).
+            Phases of batch entries are summed.
+        metrics: Where calls are recorded. Defaults to ``default_metrics``.
+
+    Returns:
+        A dictionary representing the RPC response, or a list of responses in
+        the same order as the batch entries.
+    """
+    executor = executor or default_executor
+    if isinstance(payload, list):
+        return await handle_batch(
+            payload,
+            max_concurrency=max_concurrency,
+            executor=executor,
+            timings=timings,
+            metrics=metrics,
+        )
+    return await _handle_single(payload, executor, timings, metrics)
+
+
+async def handle_batch(
+    payloads: List[Any],
+    *,
+    max_concurrency: Optional[int] = None,
+    executor: Optional[SyncExecutor] = None,
+    timings: Optional[Dict[str, int]] = None,
+    metrics: Optional[Metrics] = None,
+) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Handle a batch of RPC requests concurrently.
+
+    Every entry is handled independently: an error in one entry is reported in
+    its own response and does not affect the others.
+
+    Args:
+        payloads: The raw request dictionaries.
+        max_concurrency: Maximum number of entries running at once.
+        executor: Thread pool for synchronous procedures.
+        timings: Collects the phase timings of the entries; see ``handle_request``.
+        metrics: Where calls are recorded. Defaults to ``default_metrics``.
 
     Returns:
-        A dictionary representing the RPC response.
+        A list of responses in the same order as the entries, each carrying
+        the ``id`` of its request. An empty batch yields a single error response.
+    """
+    if not payloads:
+        return _error(None, 400, "Invalid request: empty batch")
+
+    executor = executor or default_executor
+    limit = max_concurrency or DEFAULT_BATCH_CONCURRENCY
+    if limit == 1 or len(payloads) == 1:
+        return [
+            await _handle_single(entry, executor, timings, metrics) for entry in payloads
+        ]
+
+    responses: List[Dict[str, Any]] = [{}] * len(payloads)
+    limiter = anyio.CapacityLimiter(limit)
+
+    async def run(index: int, entry: Any) -> None:
+        async with limiter:
+            responses[index] = await _handle_single(entry, executor, timings, metrics)
+
+    async with anyio.create_task_group() as tg:
+        for index, entry in enumerate(payloads):
+            tg.start_soon(run, index, entry)
+
+    return responses
+
+
+def handle_request_sync(
+    payload: Union[Dict[str, Any], List[Any]],
+    *,
+    metrics: Optional[Metrics] = None,
+) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
     """
-    request_id = payload.get("id")
+    Handle an RPC request or batch from synchronous code, without an event loop.
+
+    Procedures are called directly in the calling thread and batch entries run
+    one after the other, so the ``timeout`` of a request is not enforced. Async
+    procedures cannot be called this way; use
+    ``requires_event_loop`` to decide between this and ``handle_request``.
+
+    Args:
+        payload: The raw dictionary representing the RPC request, or a list of them.
+        metrics: Where calls are recorded. Defaults to ``default_metrics``.
+
+    Returns:
+        A dictionary representing the RPC response, or a list of responses.
+    """
+    if isinstance(payload, list):
+        if not payload:
+            return _error(None, 400, "Invalid request: empty batch")
+        return [_handle_single_sync(entry, metrics) for entry in payload]
+    return _handle_single_sync(payload, metrics)
+
+
+def requires_event_loop(payload: Union[Dict[str, Any], List[Any]]) -> bool:
+    """
+    Check whether a request or batch targets any async procedure.
+
+    Args:
+        payload: The raw dictionary representing the RPC request, or a list of them.
+
+    Returns:
+        True if ``handle_request`` is needed, False if ``handle_request_sync``
+        can handle the payload.
+    """
+    entries = payload if isinstance(payload, list) else [payload]
+    for entry in entries:
+        method = entry.get("method") if isinstance(entry, dict) else None
+        if isinstance(method, str):
+            plan = default_registry.get_plan(method)
+            if plan is not None and (plan.is_coroutine or plan.is_async_generator):
+                return True
+    return False
+
+
+def _prepare(
+    payload: Any,
+) -> Union[
+    Dict[str, Any], Tuple[Any, ProcedurePlan, Tuple[Any, ...], Dict[str, Any], Optional[float]]
+]:
+    """
+    Parse a request, find its procedure and bind its params.
+
+    Returns:
+        ``(request_id, plan, args, kwargs, timeout)``, or an error response.
+    """
+    request_id = payload.get("id") if isinstance(payload, dict) else None
+
+    # 1. Parse Request
     try:
-        # 1. Parse Request
         request = RpcRequest.model_validate(payload)
+    except Exception as e:
+        return _error(request_id, 400, f"Invalid request: {str(e)}")
 
-        # 2. Find Procedure
-        procedure = default_registry.get(request.method)
-        if not procedure:
-            return RpcResponse(
-                id=request_id,
-                error=RpcErrorModel(code=404, message=f"Method not found: {request.method}"),
-            ).model_dump()
+    # 2. Find Procedure
+    plan = default_registry.get_plan(request.method)
+    if not plan:
+        return _error(request_id, 404, f"Method not found: {request.method}")
 
-        # 3. Call Function (support both sync and async)
-        params = request.params or {}
+    # 3. Validate params against the precompiled signature
+    try:
+        args, kwargs = plan.bind(request.params)
+    except InvalidParamsError as e:
+        return _error(request_id, 400, f"Invalid params: {e}")
 
-        try:
-            if isinstance(params, list):
-                result = procedure(*params)
-            else:
-                result = procedure(**params)
+    return request_id, plan, args, kwargs, request.timeout
+
+
+def _add_timing(timings: Dict[str, int], phase: str, elapsed: int) -> None:
+    timings[phase] = timings.get(phase, 0) + elapsed
+
+
+async def _handle_single(
+    payload: Any,
+    executor: SyncExecutor,
+    timings: Optional[Dict[str, int]] = None,
+    metrics: Optional[Metrics] = None,
+) -> Dict[str, Any]:
+    if timings is None:
+        prepared = _prepare(payload)
+    else:
+        start = time.perf_counter_ns()
+        prepared = _prepare(payload)
+        _add_timing(timings, "validate", time.perf_counter_ns() - start)
+    if isinstance(prepared, dict):
+        return prepared
+    request_id, plan, args, kwargs, timeout = prepared
 
-            if inspect.isawaitable(result):
-                result = await result
+    metrics = metrics or default_metrics
+    if timings is None and not metrics.enabled:
+        return await _run_with_timeout(request_id, plan, args, kwargs, timeout, executor)
+    return await _run_instrumented(
+        request_id, plan, args, kwargs, timeout, executor, timings, metrics
+    )
 
-            return RpcResponse(id=request_id, result=result).model_dump()
+
+async def _run_instrumented(
+    request_id: Any,
+    plan: ProcedurePlan,
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+    timeout: Optional[float],
+    executor: SyncExecutor,
+    timings: Optional[Dict[str, int]],
+    metrics: Metrics,
+) -> Dict[str, Any]:
+    """Run a call, recording its metrics and, if requested, its phase timings."""
+    stats = metrics.start(plan.name) if metrics.enabled else None
+    # Collected per call, so that the phases of concurrent batch entries do not mix.
+    phases: Optional[Dict[str, int]] = {} if timings is not None else None
+    start = time.perf_counter_ns()
+    error_code: Optional[int] = CANCELLED
+    try:
+        response = await _run_with_timeout(
+            request_id, plan, args, kwargs, timeout, executor, phases
+        )
+        error_code = response["error"]["code"] if response["error"] else None
+        return response
+    finally:
+        elapsed = time.perf_counter_ns() - start
+        if stats is not None:
+            metrics.finish(stats, elapsed / 1e9, error_code)
+        if timings is not None and phases is not None:
+            serialize = phases.get("serialize", 0)
+            _add_timing(timings, "call", elapsed - serialize)
+            _add_timing(timings, "serialize", serialize)
+
+
+async def _run_with_timeout(
+    request_id: Any,
+    plan: ProcedurePlan,
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+    timeout: Optional[float],
+    executor: SyncExecutor,
+    timings: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    if timeout is None:
+        return await _run(request_id, plan, args, kwargs, executor, timings)
+    with anyio.move_on_after(timeout):
+        return await _run(request_id, plan, args, kwargs, executor, timings)
+    return _error(request_id, DEADLINE_EXCEEDED, f"Deadline exceeded after {timeout}s")
+
+
+async def _run(
+    request_id: Any,
+    plan: ProcedurePlan,
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+    executor: SyncExecutor,
+    timings: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    """Call a prepared request and build its response."""
+    # 4. Call Function; cached procedures go through their cache in plan.call
+    try:
+        return _result(request_id, await _call(plan, args, kwargs, executor, timings))
+    except OverloadedError as e:
+        return _error(request_id, OVERLOADED, str(e))
+
+    except Exception as e:
+        return _error(request_id, 500, str(e))
+
+
+async def _call(
+    plan: ProcedurePlan,
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+    executor: SyncExecutor,
+    timings: Optional[Dict[str, int]] = None,
+) -> Any:
+    """Call a procedure and return its serialized result."""
+    if plan.is_streaming:
+        # Transports that cannot stream get all the items at once.
+        return [item async for item in _iterate(plan, args, kwargs, executor)]
+
+    if plan.limiter is None:
+        return await _invoke(plan, args, kwargs, executor, timings)
+    await plan.limiter.acquire()
+    try:
+        return await _invoke(plan, args, kwargs, executor, timings)
+    finally:
+        plan.limiter.release()
+
+
+async def _invoke(
+    plan: ProcedurePlan,
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+    executor: SyncExecutor,
+    timings: Optional[Dict[str, int]] = None,
+) -> Any:
+    # Sync functions run in the thread pool unless inline
+    if plan.is_coroutine:
+        result = await plan.call(*args, **kwargs)
+    elif plan.inline:
+        result = plan.call(*args, **kwargs)
+    else:
+        result = await executor.run(plan.call, *args, **kwargs)
+    if not plan.is_coroutine and inspect.isawaitable(result):
+        # A sync wrapper around a coroutine function, e.g. a decorator without
+        # functools.wraps. Checked after the call, so coroutines pay nothing.
+        result = await result
+    if timings is None:
+        return plan.serialize(result)
+    start = time.perf_counter_ns()
+    data = plan.serialize(result)
+    _add_timing(timings, "serialize", time.perf_counter_ns() - start)
+    return data
 
 
-        except Exception as e:
-            return RpcResponse(
-                id=request_id, error=RpcErrorModel(code=500, message=str(e))
-            ).model_dump()
+def _handle_single_sync(payload: Any, metrics: Optional[Metrics] = None) -> Dict[str, Any]:
+    prepared = _prepare(payload)
+    if isinstance(prepared, dict):
+        return prepared
+    request_id, plan, args, kwargs, _ = prepared
 
+    metrics = metrics or default_metrics
+    if not metrics.enabled:
+        return _run_sync(request_id, plan, args, kwargs)
+
+    stats = metrics.start(plan.name)
+    start = time.perf_counter()
+    error_code: Optional[int] = CANCELLED
+    try:
+        response = _run_sync(request_id, plan, args, kwargs)
+        error_code = response["error"]["code"] if response["error"] else None
+        return response
+    finally:
+        metrics.finish(stats, time.perf_counter() - start, error_code)
+
+
+def _run_sync(
+    request_id: Any, plan: ProcedurePlan, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+) -> Dict[str, Any]:
+    if plan.is_coroutine or plan.is_async_generator:
+        return _error(request_id, 500, f"Async procedure {plan.name} requires an event loop")
+
+    try:
+        if plan.limiter is not None:
+            plan.limiter.acquire_sync()
+    except OverloadedError as e:
+        return _error(request_id, OVERLOADED, str(e))
+
+    try:
+        if plan.is_generator:
+            result = [plan.serialize(item) for item in plan.call(*args, **kwargs)]
+        else:
+            result = plan.serialize(plan.call(*args, **kwargs))
     except Exception as e:
-        # Handle parsing errors or other unexpected errors
-        return RpcResponse(
-            id=request_id, error=RpcErrorModel(code=400, message=f"Invalid request: {str(e)}")
-        ).model_dump()
+        return _error(request_id, 500, str(e))
+    finally:
+        if plan.limiter is not None:
+            plan.limiter.release()
+
+    return _result(request_id, result)
+
+
+def is_streaming_request(payload: Any) -> bool:
+    """
+    Check whether a (non-batch) request targets a generator procedure.
+
+    Args:
+        payload: The raw dictionary representing the RPC request.
+
+    Returns:
+        True if the transport can stream the response with ``stream_request``.
+    """
+    method = payload.get("method") if isinstance(payload, dict) else None
+    if not isinstance(method, str):
+        return False
+    plan = default_registry.get_plan(method)
+    return plan is not None and plan.is_streaming
+
+
+async def stream_request(
+    payload: Dict[str, Any],
+    *,
+    executor: Optional[SyncExecutor] = None,
+    metrics: Optional[Metrics] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Handle a request for a generator procedure, yielding one response per item.
+
+    Each response carries the request ``id`` and one item as its ``result``.
+    If the request is invalid, the procedure fails or the ``timeout`` of the
+    request elapses, an error response is yielded and the stream ends.
+
+    Args:
+        payload: The raw dictionary representing the RPC request.
+        executor: Thread pool used to advance sync generators. Defaults to
+            ``default_executor``.
+        metrics: Where the call is recorded. Defaults to ``default_metrics``.
+    """
+    prepared = _prepare(payload)
+    if isinstance(prepared, dict):
+        yield prepared
+        return
+    request_id, plan, args, kwargs, timeout = prepared
+    deadline = anyio.current_time() + timeout if timeout is not None else None
+
+    metrics = metrics or default_metrics
+    stats = metrics.start(plan.name) if metrics.enabled else None
+    start = time.perf_counter()
+    error_code: Optional[int] = CANCELLED
+
+    items = _iterate(plan, args, kwargs, executor or default_executor)
+    try:
+        while True:
+            if deadline is None:
+                item = await items.__anext__()
+            else:
+                with anyio.move_on_after(deadline - anyio.current_time()) as scope:
+                    item = await items.__anext__()
+                if scope.cancelled_caught:
+                    error_code = DEADLINE_EXCEEDED
+                    yield _error(
+                        request_id, DEADLINE_EXCEEDED, f"Deadline exceeded after {timeout}s"
+                    )
+                    return
+            yield _result(request_id, item)
+    except StopAsyncIteration:
+        error_code = None
+    except OverloadedError as e:
+        error_code = OVERLOADED
+        yield _error(request_id, OVERLOADED, str(e))
+    except Exception as e:
+        error_code = 500
+        yield _error(request_id, 500, str(e))
+    finally:
+        if stats is not None:
+            # A stream is timed from its request to its last item.
+            metrics.finish(stats, time.perf_counter() - start, error_code)
+        # Close the procedure's generator right away if the consumer stops early.
+        await items.aclose()
+
+
+def _iterate(
+    plan: ProcedurePlan, args: Tuple[Any, ...], kwargs: Dict[str, Any], executor: SyncExecutor
+) -> AsyncIterator[Any]:
+    """Drive a generator procedure, yielding its serialized items."""
+    items = _iterate_items(plan, args, kwargs, executor)
+    if plan.limiter is None:
+        return items
+    return _hold_slot(plan.limiter, items)
+
+
+async def _hold_slot(limiter: ConcurrencyLimiter, items: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """Keep a concurrency slot of a streaming procedure until its stream ends."""
+    await limiter.acquire()
+    try:
+        async for item in items:
+            yield item
+    finally:
+        try:
+            await items.aclose()  # type: ignore[attr-defined]
+        finally:
+            limiter.release()
+
+
+async def _iterate_items(
+    plan: ProcedurePlan, args: Tuple[Any, ...], kwargs: Dict[str, Any], executor: SyncExecutor
+) -> AsyncIterator[Any]:
+    if plan.is_async_generator:
+        agen = plan.call(*args, **kwargs)
+        try:
+            async for item in agen:
+                yield plan.serialize(item)
+        finally:
+            await agen.aclose()
+        return
+
+    gen = plan.call(*args, **kwargs)
+    try:
+        while True:
+            if plan.inline:
+                item = next(gen, _EXHAUSTED)
+            else:
+                # Each step may block, so it runs in the thread pool.
+                item = await executor.run(next, gen, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                break
+            yield plan.serialize(item)
+    finally:
+        try:
+            gen.close()
+        except ValueError:
+            # Cancelled while a worker thread is still advancing it; the
+            # generator is released once that step returns.
+            pass
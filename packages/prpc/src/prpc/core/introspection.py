@@ -1,5 +1,7 @@
+import hashlib
 import inspect
-from typing import Any, Callable, Dict, List, Optional, Type
+import json
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Type
 
 from pydantic import BaseModel, TypeAdapter
 
@@ -68,9 +70,37 @@ def get_procedure_schema(func: Callable[..., Any], name: Optional[str] = None) -
 def get_registry_schema(registry: Any) -> Dict[str, ProcedureSchema]:
     """
     Generate schemas for all procedures in a registry.
+
+    ``registry`` is a ``ProcedureRegistry``, any object whose ``_procedures``
+    maps names to functions, or such a mapping itself. The schema of a
+    procedure compiled by a ``ProcedureRegistry`` is built once and cached on
+    its plan, so only procedures registered since the last call are
+    introspected; the returned schemas are then shared and must not be
+    modified. Bare functions are introspected on every call.
     """
+    procedures = getattr(registry, "_procedures", registry)
     schemas = {}
-    # registry._procedures is a dict mapping name to func
-    for name, func in registry._procedures.items():
-        schemas[name] = get_procedure_schema(func, name=name)
+    for name, entry in procedures.items():
+        if callable(entry):
+            schemas[name] = get_procedure_schema(entry, name=name)
+        else:
+            # A compiled plan, which caches its schema.
+            schemas[name] = entry.schema
     return schemas
+
+
+def render_schema_document(schemas: Mapping[str, ProcedureSchema]) -> Tuple[bytes, str]:
+    """
+    Serialize schemas into the JSON document served at ``/rpc/schema``.
+
+    Returns:
+        The document and its ``ETag``, a hash of the document.
+    """
+    procedures = {name: schema.model_dump() for name, schema in schemas.items()}
+    # Sorted keys make the document, and so the ETag, deterministic. Defaults
+    # that are not JSON serializable are sent as their string representation.
+    body = json.dumps(
+        {"procedures": procedures}, sort_keys=True, separators=(",", ":"), default=str
+    ).encode()
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    return body, etag
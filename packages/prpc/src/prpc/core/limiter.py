@@ -0,0 +1,167 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Deque, Optional
+
+import anyio
+
+# Wakes a caller waiting for a slot; callable from any thread.
+_Wake = Callable[[], None]
+
+
+class OverloadedError(Exception):
+    """
+    Raised when a call is shed because the server is saturated.
+    """
+
+
+def _async_wake(event: anyio.Event) -> _Wake:
+    """Wake for ``event``, which belongs to the running event loop."""
+    thread = threading.get_ident()
+    schedule: Callable[[Callable[[], None]], object]
+    try:
+        schedule = asyncio.get_running_loop().call_soon_threadsafe
+    except RuntimeError:
+        import trio
+
+        schedule = trio.lowlevel.current_trio_token().run_sync_soon
+
+    def wake() -> None:
+        if threading.get_ident() == thread:
+            event.set()
+        else:
+            # anyio events are not thread-safe: set it from its own loop.
+            schedule(event.set)
+
+    return wake
+
+
+class ConcurrencyLimiter:
+    """
+    Limits how many calls of a procedure run at the same time.
+
+    Up to ``max_concurrency`` calls run at once and up to ``max_queue`` more
+    wait for a free slot, in arrival order, for at most ``queue_timeout``
+    seconds. Calls beyond that are rejected immediately with
+    :class:`OverloadedError` rather than piling up.
+
+    Async callers wait on an event of their own event loop, and sync callers
+    (such as the Flask adapter's request threads) block on a thread event.
+    Either kind may release a slot: a waiter is woken through its own event
+    loop when the slot is released from another thread.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int = 0,
+        queue_timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Args:
+            max_concurrency: Maximum number of calls running at once.
+            max_queue: Maximum number of calls waiting for a slot.
+            queue_timeout: Maximum time a call waits for a slot, in seconds,
+                or None to wait as long as it takes.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: Deque[_Wake] = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> int:
+        """Number of calls currently holding a slot."""
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        """Number of calls waiting for a slot."""
+        return len(self._waiters)
+
+    def _try_acquire(self, wake: Optional[_Wake]) -> bool:
+        """
+        Take a free slot, or enqueue ``wake`` if given. Returns True if a slot
+        was taken.
+        """
+        with self._lock:
+            if self._active < self.max_concurrency and not self._waiters:
+                self._active += 1
+                return True
+            if wake is None:
+                return False
+            if len(self._waiters) >= self.max_queue:
+                raise OverloadedError("Server busy: too many concurrent calls")
+            self._waiters.append(wake)
+            return False
+
+    def _abandon(self, wake: _Wake) -> bool:
+        """
+        Leave the queue. Returns False if the waiter was handed a slot meanwhile,
+        in which case the caller owns it.
+        """
+        with self._lock:
+            try:
+                self._waiters.remove(wake)
+            except ValueError:
+                return False
+            return True
+
+    async def acquire(self) -> None:
+        """
+        Wait for a slot.
+
+        Raises:
+            OverloadedError: If the queue is full or the wait timed out.
+        """
+        # The waiter is only set up when there is no free slot.
+        if self._try_acquire(None):
+            return
+        waiter = anyio.Event()
+        wake = _async_wake(waiter)
+        if self._try_acquire(wake):
+            return
+        try:
+            with anyio.fail_after(self.queue_timeout):
+                await waiter.wait()
+        except BaseException as e:
+            if self._abandon(wake):
+                if isinstance(e, TimeoutError):
+                    raise OverloadedError(
+                        "Server busy: timed out waiting for a free slot"
+                    ) from None
+                raise
+            # The slot arrived together with the cancellation; pass it on.
+            self.release()
+            raise
+
+    def acquire_sync(self) -> None:
+        """
+        Blocking version of :meth:`acquire` for threads without an event loop.
+        """
+        waiter = threading.Event()
+        wake = waiter.set
+        if self._try_acquire(wake):
+            return
+        if not waiter.wait(self.queue_timeout) and self._abandon(wake):
+            raise OverloadedError("Server busy: timed out waiting for a free slot")
+
+    def release(self) -> None:
+        """Free a slot, handing it to the oldest waiter if there is one."""
+        while True:
+            with self._lock:
+                if not self._waiters:
+                    self._active -= 1
+                    return
+                # The slot changes hands; the number of active calls is unchanged.
+                wake = self._waiters.popleft()
+            try:
+                wake()
+                return
+            except RuntimeError:
+                # The waiter's event loop is closed: hand the slot on.
+                continue
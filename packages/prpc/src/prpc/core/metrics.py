@@ -0,0 +1,231 @@
+import os
+import threading
+import weakref
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+# Upper bounds of the latency histogram buckets, in seconds.
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _MethodStats:
+    __slots__ = ("calls", "errors", "in_flight", "buckets", "latency_sum")
+
+    def __init__(self, bucket_count: int) -> None:
+        self.calls = 0
+        self.errors: Dict[int, int] = {}
+        self.in_flight = 0
+        # One counter per bucket plus one for +Inf; not cumulative.
+        self.buckets = [0] * (bucket_count + 1)
+        self.latency_sum = 0.0
+
+    def add(self, other: "_MethodStats") -> None:
+        """Add the counters of ``other`` to these."""
+        self.calls += other.calls
+        self.in_flight += other.in_flight
+        self.latency_sum += other.latency_sum
+        for code, count in list(other.errors.items()):
+            self.errors[code] = self.errors.get(code, 0) + count
+        for i, count in enumerate(other.buckets):
+            self.buckets[i] += count
+
+
+class _ThreadToken:
+    """Kept in a thread's locals; collected when the thread exits."""
+
+    __slots__ = ("__weakref__",)
+
+
+class Metrics:
+    """
+    Per-procedure call counters, error counters by code, in-flight gauges and
+    latency histograms.
+
+    Recording is skipped entirely unless ``enabled`` is set, so the cost of
+    disabled metrics is one attribute check per call. When enabled, every
+    thread records into its own counters, so recording takes no lock; the
+    counters of all threads are only merged when a snapshot is taken. The
+    counters of a thread are folded into shared totals once it exits, so
+    thread-per-request servers do not accumulate them.
+    """
+
+    def __init__(
+        self, enabled: bool = False, buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        """
+        Args:
+            enabled: Whether calls are recorded.
+            buckets: Upper bounds of the latency histogram buckets, in seconds.
+        """
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self._local = threading.local()
+        self._shards: List[Dict[str, _MethodStats]] = []
+        # The counters of the threads that exited.
+        self._retired: Dict[str, _MethodStats] = {}
+        # Reentrant: a thread may exit, and retire its shard, while the
+        # garbage collector runs inside a locked section.
+        self._lock = threading.RLock()
+
+    def _shard(self) -> Dict[str, _MethodStats]:
+        shard = getattr(self._local, "stats", None)
+        if shard is None:
+            shard = self._local.stats = {}
+            token = self._local.token = _ThreadToken()
+            with self._lock:
+                self._shards.append(shard)
+            weakref.finalize(token, self._retire, shard)
+        return shard
+
+    def _retire(self, shard: Dict[str, _MethodStats]) -> None:
+        """Fold the shard of an exited thread into the retired counters."""
+        with self._lock:
+            for i, other in enumerate(self._shards):
+                if other is shard:
+                    del self._shards[i]
+                    break
+            for method, stats in list(shard.items()):
+                retired = self._retired.get(method)
+                if retired is None:
+                    retired = self._retired[method] = _MethodStats(len(self.buckets))
+                retired.add(stats)
+
+    def start(self, method: str) -> _MethodStats:
+        """
+        Record the start of a call, to be passed to :meth:`finish` once it ends.
+        """
+        shard = self._shard()
+        stats = shard.get(method)
+        if stats is None:
+            stats = shard[method] = _MethodStats(len(self.buckets))
+        stats.in_flight += 1
+        return stats
+
+    def finish(
+        self, stats: _MethodStats, elapsed: float, error_code: Optional[int] = None
+    ) -> None:
+        """
+        Record the end of a call.
+
+        Args:
+            stats: The value returned by :meth:`start`.
+            elapsed: Duration of the call, in seconds.
+            error_code: Error code of the response, if the call failed.
+        """
+        stats.in_flight -= 1
+        stats.calls += 1
+        stats.latency_sum += elapsed
+        stats.buckets[bisect_left(self.buckets, elapsed)] += 1
+        if error_code is not None:
+            stats.errors[error_code] = stats.errors.get(error_code, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Merge the counters of every thread.
+
+        Returns:
+            For each procedure: ``calls``, ``errors`` (by code), ``in_flight``,
+            ``latency_sum`` and ``buckets`` (cumulative counts per upper bound,
+            ending with ``+Inf``).
+        """
+        with self._lock:
+            shards = list(self._shards)
+            # Copied, as threads exiting meanwhile add to the retired counters.
+            retired: Dict[str, _MethodStats] = {}
+            for method, stats in self._retired.items():
+                retired[method] = _MethodStats(len(self.buckets))
+                retired[method].add(stats)
+            shards.append(retired)
+
+        merged: Dict[str, Dict[str, Any]] = {}
+        for shard in shards:
+            for method, stats in list(shard.items()):
+                entry = merged.get(method)
+                if entry is None:
+                    entry = merged[method] = {
+                        "calls": 0,
+                        "errors": {},
+                        "in_flight": 0,
+                        "latency_sum": 0.0,
+                        "buckets": [0] * (len(self.buckets) + 1),
+                    }
+                entry["calls"] += stats.calls
+                entry["in_flight"] += stats.in_flight
+                entry["latency_sum"] += stats.latency_sum
+                for code, count in list(stats.errors.items()):
+                    entry["errors"][code] = entry["errors"].get(code, 0) + count
+                for i, count in enumerate(stats.buckets):
+                    entry["buckets"][i] += count
+
+        for entry in merged.values():
+            total = 0
+            for i, count in enumerate(entry["buckets"]):
+                total += count
+                entry["buckets"][i] = total
+        return merged
+
+    def reset(self) -> None:
+        """Drop every recorded value."""
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+            self._retired.clear()
+
+    def render_prometheus(self) -> str:
+        """Render a snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        bounds = [_format_float(b) for b in self.buckets] + ["+Inf"]
+        lines = [
+            "# HELP prpc_calls_total Number of completed RPC calls.",
+            "# TYPE prpc_calls_total counter",
+        ]
+        for method, entry in snapshot.items():
+            label = f'method="{_escape(method)}"'
+            lines.append(f'prpc_calls_total{{{label}}} {entry["calls"]}')
+
+        lines.append(
+            "# HELP prpc_errors_total Number of RPC calls that returned an error."
+        )
+        lines.append("# TYPE prpc_errors_total counter")
+        for method, entry in snapshot.items():
+            label = f'method="{_escape(method)}"'
+            for code, count in sorted(entry["errors"].items()):
+                lines.append(f'prpc_errors_total{{{label},code="{code}"}} {count}')
+
+        lines.append("# HELP prpc_in_flight Number of RPC calls currently running.")
+        lines.append("# TYPE prpc_in_flight gauge")
+        for method, entry in snapshot.items():
+            label = f'method="{_escape(method)}"'
+            lines.append(f'prpc_in_flight{{{label}}} {entry["in_flight"]}')
+
+        lines.append("# HELP prpc_call_duration_seconds Duration of RPC calls.")
+        lines.append("# TYPE prpc_call_duration_seconds histogram")
+        for method, entry in snapshot.items():
+            label = f'method="{_escape(method)}"'
+            for bound, count in zip(bounds, entry["buckets"], strict=True):
+                lines.append(
+                    f'prpc_call_duration_seconds_bucket{{{label},le="{bound}"}} {count}'
+                )
+            latency_sum = _format_float(entry["latency_sum"])
+            calls = entry["calls"]
+            lines.append(f"prpc_call_duration_seconds_sum{{{label}}} {latency_sum}")
+            lines.append(f"prpc_call_duration_seconds_count{{{label}}} {calls}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+# Metrics recorded by the interpreter. Enabled by ``PRPCAsgiApp(metrics=True)``
+# or the ``PRPC_METRICS=1`` environment variable.
+default_metrics = Metrics(enabled=os.environ.get("PRPC_METRICS", "") not in ("", "0"))
@@ -11,6 +11,8 @@ class RpcRequest(BaseModel):
     id: Optional[Union[str, int]] = None
     method: str
     params: Optional[Union[List[Any], Dict[str, Any]]] = None
+    # Seconds the caller is willing to wait; the call is cancelled after that.
+    timeout: Optional[float] = Field(default=None, gt=0)
 
 
 class RpcErrorModel(BaseModel):
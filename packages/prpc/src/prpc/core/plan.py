@@ -0,0 +1,377 @@
+import collections.abc
+import functools
+import inspect
+import types
+import typing
+from typing import (
+    Annotated,
+    Any,
+    Callable,
+    Dict,
+    List,
+    NotRequired,
+    Optional,
+    Required,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from pydantic import BeforeValidator, ConfigDict, TypeAdapter
+
+from .attachments import Attached, extract_buffers
+from .cache import ResultCache, make_cache_key
+from .interceptors import Interceptor, compose_interceptors
+from .introspection import ProcedureSchema, get_procedure_schema
+from .limiter import ConcurrencyLimiter
+
+# pydantic only accepts ``typing_extensions.TypedDict`` before Python 3.12.
+from typing_extensions import TypedDict
+
+_POSITIONAL_KINDS = (
+    inspect.Parameter.POSITIONAL_ONLY,
+    inspect.Parameter.POSITIONAL_OR_KEYWORD,
+)
+
+_STREAM_ORIGINS = (
+    collections.abc.Iterator,
+    collections.abc.Iterable,
+    collections.abc.Generator,
+    collections.abc.AsyncIterator,
+    collections.abc.AsyncIterable,
+    collections.abc.AsyncGenerator,
+)
+
+
+class InvalidParamsError(Exception):
+    """
+    Raised when the parameters of a call do not match the procedure signature.
+    """
+
+
+def _resolve_hints(fn: Callable[..., Any]) -> Dict[str, Any]:
+    """Resolve string annotations where possible, falling back to the raw ones."""
+    try:
+        return typing.get_type_hints(fn, include_extras=True)
+    except Exception:
+        return {}
+
+
+def _adapter(tp: Any) -> TypeAdapter:
+    """Build a TypeAdapter, degrading to ``Any`` for types pydantic cannot handle."""
+    try:
+        return TypeAdapter(tp)
+    except Exception:
+        return TypeAdapter(Any)
+
+
+def _to_bytes(value: Any) -> Any:
+    return bytes(value) if isinstance(value, memoryview) else value
+
+
+# Binary attachments arrive as memoryviews, which pydantic rejects as bytes.
+_BUFFER_BYTES = Annotated[bytes, BeforeValidator(_to_bytes)]
+
+
+def _accept_buffers(tp: Any) -> Any:
+    """``tp`` with every ``bytes`` in it also accepting memoryviews."""
+    if tp is bytes:
+        return _BUFFER_BYTES
+    origin, args = typing.get_origin(tp), typing.get_args(tp)
+    if origin is Annotated:
+        inner = _accept_buffers(args[0])
+        return tp if inner is args[0] else Annotated[(inner, *tp.__metadata__)]
+    if not args or origin is typing.Literal:
+        return tp
+    new_args = tuple(_accept_buffers(arg) for arg in args)
+    if new_args == args:
+        return tp
+    try:
+        if origin in (Union, types.UnionType):
+            return Union[new_args]
+        if isinstance(tp, types.GenericAlias):
+            return types.GenericAlias(origin, new_args)
+        return tp.copy_with(new_args)
+    except Exception:
+        return tp
+
+
+def _has_kind(fn: Callable[..., Any], check: Callable[[Any], bool]) -> bool:
+    if check(fn) or check(inspect.unwrap(fn)):
+        return True
+    # Callable instances: check their class's __call__.
+    return callable(fn) and check(type(fn).__call__)
+
+
+def _stream_item_type(return_type: Any) -> Any:
+    """Extract ``T`` from ``Iterator[T]``, ``AsyncGenerator[T, None]`` and friends."""
+    if typing.get_origin(return_type) in _STREAM_ORIGINS:
+        args = typing.get_args(return_type)
+        if args:
+            return args[0]
+    return Any
+
+
+def _cached(fn: Callable[..., Any], cache: ResultCache, is_coroutine: bool) -> Callable[..., Any]:
+    """Wrap ``fn`` to go through ``cache``, keyed by its bound arguments."""
+    if is_coroutine:
+
+        @functools.wraps(fn)
+        async def cached_async(*args: Any, **kwargs: Any) -> Any:
+            key = make_cache_key(args, kwargs)
+            if key is None:
+                return await fn(*args, **kwargs)
+            return await cache.get_or_compute(key, lambda: fn(*args, **kwargs))
+
+        return cached_async
+
+    @functools.wraps(fn)
+    def cached(*args: Any, **kwargs: Any) -> Any:
+        key = make_cache_key(args, kwargs)
+        if key is None:
+            return fn(*args, **kwargs)
+        return cache.get_or_compute_sync(key, lambda: fn(*args, **kwargs))
+
+    return cached
+
+
+class ProcedurePlan:
+    """
+    A precompiled invocation plan for a single procedure.
+
+    Everything that only depends on the procedure itself (its signature, the
+    pydantic validator for its parameters, the serializer for its return value
+    and whether it must be awaited) is computed once, when the procedure is
+    registered, so that dispatching a call only has to run the plan.
+
+    Synchronous procedures are run in a thread pool by the interpreter unless
+    ``inline`` is set, in which case they are called on the event loop.
+
+    Generator procedures (sync or async) are streaming procedures: their items
+    are serialized one by one, using the item type of the return annotation.
+
+    When ``binary`` is set, bytes, memoryviews and NumPy arrays in results are
+    kept out of the serialized data (see :class:`Attached`), for codecs to
+    send them as binary attachments.
+
+    When ``cache`` is set, results are cached by their bound arguments. When
+    ``limiter`` is set, calls go through it.
+
+    ``call`` is what the interpreter invokes: ``fn`` wrapped in the registry's
+    interceptors followed by the procedure's own ``interceptors``, composed
+    once by :meth:`compose`. Without interceptors or a cache it is ``fn``
+    itself. The cache sits inside the interceptors, so that they run on cache
+    hits too, e.g. to check the caller's permissions.
+
+    The procedure's :class:`ProcedureSchema` is only built when it is first
+    asked for, then kept for as long as the plan is registered.
+    """
+
+    __slots__ = (
+        "name",
+        "fn",
+        "signature",
+        "is_coroutine",
+        "is_generator",
+        "is_async_generator",
+        "inline",
+        "binary",
+        "cache",
+        "limiter",
+        "interceptors",
+        "call",
+        "_target",
+        "_positional",
+        "_positional_only",
+        "_var_positional",
+        "_params_validator",
+        "_return_serializer",
+        "_schema",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        *,
+        inline: bool = False,
+        cache: Optional[ResultCache] = None,
+        limiter: Optional[ConcurrencyLimiter] = None,
+        interceptors: Sequence[Interceptor] = (),
+        binary: bool = False,
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.interceptors = tuple(interceptors)
+        self.is_coroutine = _has_kind(fn, inspect.iscoroutinefunction)
+        self.is_generator = _has_kind(fn, inspect.isgeneratorfunction)
+        self.is_async_generator = _has_kind(fn, inspect.isasyncgenfunction)
+        self.inline = inline
+        self.binary = binary
+        if cache is not None and self.is_streaming:
+            raise ValueError(f"Streaming procedure {name} cannot be cached")
+        self.cache = cache
+        # The innermost callable of the interceptor chain.
+        self._target = fn if cache is None else _cached(fn, cache, self.is_coroutine)
+        self.call = compose_interceptors(name, self._target, self.interceptors)
+        self.limiter = limiter
+        self._schema: Optional[ProcedureSchema] = None
+
+        try:
+            self.signature: Optional[inspect.Signature] = inspect.signature(fn)
+        except (TypeError, ValueError):
+            # Builtins and some C callables cannot be introspected; such
+            # procedures are called with their params as-is.
+            self.signature = None
+
+        self._positional: List[str] = []
+        self._positional_only: set = set()
+        self._var_positional: Optional[TypeAdapter] = None
+        self._params_validator: Optional[TypeAdapter] = None
+        self._return_serializer = _adapter(Any)
+
+        if self.signature is not None:
+            self._compile(self.signature, _resolve_hints(fn))
+
+    def _compile(self, sig: inspect.Signature, hints: Dict[str, Any]) -> None:
+        fields: Dict[str, Any] = {}
+        allow_extra = False
+
+        for param_name, param in sig.parameters.items():
+            annotation = hints.get(param_name, param.annotation)
+            if annotation is inspect.Parameter.empty:
+                annotation = Any
+            annotation = _accept_buffers(annotation)
+
+            if param.kind is inspect.Parameter.VAR_POSITIONAL:
+                self._var_positional = _adapter(List[annotation])  # type: ignore[valid-type]
+                continue
+            if param.kind is inspect.Parameter.VAR_KEYWORD:
+                allow_extra = True
+                continue
+
+            if param.kind in _POSITIONAL_KINDS:
+                self._positional.append(param_name)
+            if param.kind is inspect.Parameter.POSITIONAL_ONLY:
+                self._positional_only.add(param_name)
+
+            if param.default is inspect.Parameter.empty:
+                fields[param_name] = Required[annotation]
+            else:
+                fields[param_name] = NotRequired[annotation]
+
+        self._params_validator = self._build_params_validator(fields, allow_extra)
+
+        return_type = hints.get("return", sig.return_annotation)
+        if return_type is not inspect.Signature.empty:
+            if self.is_streaming:
+                return_type = _stream_item_type(return_type)
+            self._return_serializer = _adapter(return_type)
+
+    def _build_params_validator(self, fields: Dict[str, Any], allow_extra: bool) -> TypeAdapter:
+        config = ConfigDict(extra="allow" if allow_extra else "forbid")
+        try:
+            params_td = TypedDict(f"{self.name}_params", fields)  # type: ignore[misc]
+            params_td.__pydantic_config__ = config  # type: ignore[attr-defined]
+            return TypeAdapter(params_td)
+        except Exception:
+            pass
+
+        # One of the annotations is not supported by pydantic: validate the
+        # parameters we can and accept the rest unchecked.
+        safe_fields = {}
+        for field_name, field_type in fields.items():
+            wrapper = typing.get_origin(field_type)
+            (inner,) = typing.get_args(field_type)
+            try:
+                TypeAdapter(inner)
+            except Exception:
+                inner = Any
+            safe_fields[field_name] = wrapper[inner]  # type: ignore[index]
+        params_td = TypedDict(f"{self.name}_params", safe_fields)  # type: ignore[misc]
+        params_td.__pydantic_config__ = config  # type: ignore[attr-defined]
+        return TypeAdapter(params_td)
+
+    def compose(self, global_interceptors: Sequence[Interceptor] = ()) -> None:
+        """Rebuild ``call`` with ``global_interceptors`` around the procedure's own."""
+        self.call = compose_interceptors(
+            self.name, self._target, tuple(global_interceptors) + self.interceptors
+        )
+
+    @property
+    def is_streaming(self) -> bool:
+        """Whether the procedure is a (sync or async) generator."""
+        return self.is_generator or self.is_async_generator
+
+    @property
+    def schema(self) -> ProcedureSchema:
+        """The introspected schema of the procedure, built on first access."""
+        if self._schema is None:
+            self._schema = get_procedure_schema(self.fn, name=self.name)
+        return self._schema
+
+    def bind(
+        self, params: Optional[Union[List[Any], Dict[str, Any]]]
+    ) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+        """
+        Validate and coerce call parameters into positional and keyword arguments.
+
+        Raises:
+            InvalidParamsError: If the parameters do not match the signature.
+        """
+        if params is None:
+            params = {}
+
+        if self._params_validator is None:
+            if isinstance(params, list):
+                return tuple(params), {}
+            return (), dict(params)
+
+        extra_args: List[Any] = []
+        if isinstance(params, list):
+            count = len(self._positional)
+            if len(params) > count:
+                if self._var_positional is None:
+                    raise InvalidParamsError(
+                        f"Expected at most {count} positional params, got {len(params)}"
+                    )
+                extra_args = params[count:]
+            # Fewer params than positional parameters is fine; defaults fill in.
+            data = dict(zip(self._positional, params, strict=False))
+        else:
+            data = params
+
+        try:
+            kwargs = self._params_validator.validate_python(data)
+            if extra_args:
+                extra_args = self._var_positional.validate_python(extra_args)  # type: ignore[union-attr]
+        except Exception as e:
+            raise InvalidParamsError(str(e)) from e
+
+        args: List[Any] = []
+        if extra_args or self._positional_only:
+            # Positional-only params, and anything in front of *args, cannot be
+            # passed by keyword.
+            for param_name in self._positional:
+                if param_name not in kwargs:
+                    break
+                if extra_args or param_name in self._positional_only:
+                    args.append(kwargs.pop(param_name))
+            args.extend(extra_args)
+
+        return tuple(args), kwargs
+
+    def serialize(self, result: Any) -> Any:
+        """
+        Convert a procedure result, or one item of a stream, into JSON-compatible
+        data, or into an :class:`Attached` if it holds buffers and ``binary`` is set.
+        """
+        if self.binary:
+            buffers: List[Any] = []
+            data = extract_buffers(result, buffers)
+            if buffers:
+                return Attached(
+                    self._return_serializer.dump_python(data, mode="json", warnings=False),
+                    buffers,
+                )
+        return self._return_serializer.dump_python(result, mode="json", warnings=False)
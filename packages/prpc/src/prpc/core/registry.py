@@ -1,26 +1,204 @@
 import threading
-from typing import Any, Callable, Dict, List, Optional
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from .cache import DEFAULT_CACHE_SIZE, ResultCache, make_cache_key
+from .interceptors import Interceptor
+from .introspection import ProcedureSchema, get_registry_schema, render_schema_document
+from .limiter import ConcurrencyLimiter
+from .plan import ProcedurePlan
 
 
 class ProcedureRegistry:
     """
     A thread-safe registry for storing and retrieving procedures by name.
+
+    Each procedure is compiled into a :class:`ProcedurePlan` when it is
+    registered, so that nothing about its signature has to be recomputed
+    when it is called.
+
+    The registry is copy-on-write: writers build a new mapping and swap it in
+    under a lock, while readers use whichever immutable snapshot is current
+    without locking. Registration happens at import time, lookups on every call.
+
+    Interceptors added with :meth:`add_interceptor` wrap every procedure, outside
+    of the procedure's own interceptors. Chains are composed when a procedure
+    is registered or an interceptor is added, never per call.
+
+    The registry-wide schema document served at ``/rpc/schema`` is rendered
+    once per snapshot. Re-registering a procedure only introspects that
+    procedure again, the schemas of the others are kept on their plans.
     """
 
     def __init__(self) -> None:
-        self._procedures: Dict[str, Callable[..., Any]] = {}
+        self._procedures: Mapping[str, ProcedurePlan] = MappingProxyType({})
+        self._interceptors: Tuple[Interceptor, ...] = ()
         self._lock = threading.Lock()
+        # (snapshot, document, etag) of the last rendered schema document.
+        self._schema_document: Optional[Tuple[Mapping[str, ProcedurePlan], bytes, str]] = None
 
-    def register(self, name: str, fn: Callable[..., Any]) -> None:
+    def register(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        *,
+        inline: bool = False,
+        cache_ttl: Optional[float] = None,
+        cache_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_queue: int = 0,
+        queue_timeout: Optional[float] = None,
+        interceptors: Sequence[Interceptor] = (),
+        binary: bool = False,
+    ) -> None:
         """
         Register a procedure with the given name.
 
         Args:
             name: The name of the procedure.
             fn: The function/callable to register.
+            inline: Call a synchronous procedure directly on the event loop
+                instead of in the thread pool. Only for trivially cheap functions.
+            cache_ttl: Cache results for this many seconds. Setting this or
+                ``cache_size`` enables caching.
+            cache_size: Maximum number of cached results (LRU eviction).
+                Defaults to ``DEFAULT_CACHE_SIZE`` when only a TTL is given.
+            max_concurrency: Maximum number of calls of this procedure running
+                at once. None means no limit.
+            max_queue: Maximum number of calls waiting for a slot once
+                ``max_concurrency`` is reached; further calls are rejected
+                with a 503 error right away.
+            queue_timeout: Maximum time a call waits for a slot, in seconds,
+                before it is rejected. None waits as long as it takes.
+            interceptors: Interceptors wrapping this procedure only, the first
+                one being the outermost.
+            binary: Carry bytes, memoryviews and NumPy arrays found in the
+                results as binary attachments instead of converting them.
         """
+        cache = None
+        if cache_ttl is not None or cache_size is not None:
+            cache = ResultCache(ttl=cache_ttl, max_size=cache_size or DEFAULT_CACHE_SIZE)
+        limiter = None
+        if max_concurrency is not None:
+            limiter = ConcurrencyLimiter(max_concurrency, max_queue, queue_timeout)
+        plan = ProcedurePlan(
+            name,
+            fn,
+            inline=inline,
+            cache=cache,
+            limiter=limiter,
+            interceptors=interceptors,
+            binary=binary,
+        )
         with self._lock:
-            self._procedures[name] = fn
+            if self._interceptors:
+                plan.compose(self._interceptors)
+            procedures = dict(self._procedures)
+            procedures[name] = plan
+            self._procedures = MappingProxyType(procedures)
+
+    def unregister(self, name: str) -> None:
+        """
+        Remove a procedure from the registry, if present.
+
+        Args:
+            name: The name of the procedure.
+        """
+        with self._lock:
+            if name in self._procedures:
+                procedures = dict(self._procedures)
+                del procedures[name]
+                self._procedures = MappingProxyType(procedures)
+
+    def add_interceptor(self, interceptor: Interceptor) -> None:
+        """
+        Wrap every procedure, registered or to come, in an interceptor.
+
+        Interceptors added later run inside the ones added earlier.
+
+        Args:
+            interceptor: Receives a procedure name and the callable running the
+                procedure, and returns the callable to run instead.
+        """
+        with self._lock:
+            self._interceptors += (interceptor,)
+            for plan in self._procedures.values():
+                plan.compose(self._interceptors)
+
+    @property
+    def interceptors(self) -> Tuple[Interceptor, ...]:
+        """The interceptors wrapping every procedure."""
+        return self._interceptors
+
+    def clear(self) -> None:
+        """
+        Remove all procedures and interceptors from the registry.
+        """
+        with self._lock:
+            self._procedures = MappingProxyType({})
+            self._interceptors = ()
+
+    def invalidate(
+        self, name: str, params: Optional[Union[List[Any], Dict[str, Any]]] = None
+    ) -> None:
+        """
+        Drop cached results of a procedure.
+
+        Args:
+            name: The name of the procedure.
+            params: Params of the call to forget, as they would appear in a
+                request. If omitted, every cached result of the procedure is dropped.
+
+        Raises:
+            InvalidParamsError: If ``params`` do not match the procedure signature.
+        """
+        plan = self._procedures.get(name)
+        if plan is None or plan.cache is None:
+            return
+        if params is None:
+            plan.cache.invalidate()
+            return
+        args, kwargs = plan.bind(params)
+        key = make_cache_key(args, kwargs)
+        if key is not None:
+            plan.cache.invalidate(key)
+
+    def cache_stats(self, name: str) -> Optional[Dict[str, int]]:
+        """
+        Return the cache hit/miss counters and size of a procedure.
+
+        Args:
+            name: The name of the procedure.
+
+        Returns:
+            The counters, or None if the procedure does not exist or is not cached.
+        """
+        plan = self._procedures.get(name)
+        if plan is None or plan.cache is None:
+            return None
+        return plan.cache.stats()
+
+    def schemas(self) -> Dict[str, ProcedureSchema]:
+        """
+        Return the schema of every procedure, by name.
+
+        Schemas are cached, so only procedures registered since the last call
+        are introspected. They are shared and must not be modified.
+        """
+        return get_registry_schema(self)
+
+    def schema_document(self) -> Tuple[bytes, str]:
+        """
+        Return the JSON schema document of the registry and its ``ETag``.
+
+        The document is rendered again only when the registry has changed.
+        """
+        procedures = self._procedures
+        cached = self._schema_document
+        if cached is None or cached[0] is not procedures:
+            body, etag = render_schema_document(get_registry_schema(self))
+            cached = self._schema_document = (procedures, body, etag)
+        return cached[1], cached[2]
 
     def get(self, name: str) -> Optional[Callable[..., Any]]:
         """
@@ -32,8 +210,20 @@ class ProcedureRegistry:
         Returns:
             The registered function if found, otherwise None.
         """
-        with self._lock:
-            return self._procedures.get(name)
+        plan = self._procedures.get(name)
+        return plan.fn if plan is not None else None
+
+    def get_plan(self, name: str) -> Optional[ProcedurePlan]:
+        """
+        Retrieve the compiled invocation plan of a procedure by name.
+
+        Args:
+            name: The name of the procedure.
+
+        Returns:
+            The plan if found, otherwise None.
+        """
+        return self._procedures.get(name)
 
     def list(self) -> List[str]:
         """
@@ -42,5 +232,4 @@ class ProcedureRegistry:
         Returns:
             A list of names.
         """
-        with self._lock:
-            return list(self._procedures.keys())
+        return list(self._procedures)
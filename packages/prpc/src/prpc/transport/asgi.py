@@ -1,21 +1,286 @@
-import json
-from typing import Any, Callable, Dict
+import cProfile
+import itertools
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
-from ..core.interpreter import handle_request
+import anyio
+
+from ..core.decorators import default_registry
+from ..core.executor import DEFAULT_MAX_WORKERS, SyncExecutor
+from ..core.interpreter import (
+    DEFAULT_BATCH_CONCURRENCY,
+    OVERLOADED,
+    handle_request,
+    is_streaming_request,
+    stream_request,
+)
+from ..core.metrics import PROMETHEUS_CONTENT_TYPE, Metrics, default_metrics
+from .codec import (
+    JSON_CONTENT_TYPE,
+    Codec,
+    DecodeError,
+    FramesCodec,
+    get_codecs,
+    get_default_codec,
+    select_request_codec,
+    select_response_codec,
+)
+from .compression import (
+    DEFAULT_COMPRESSION_MIN_SIZE,
+    DecompressionError,
+    UnsupportedEncodingError,
+    check_encoding,
+    compressing_send,
+    decompress,
+    select_encoding,
+)
+
+# Default limit on the size of a request body, in bytes.
+DEFAULT_MAX_BODY_SIZE = 16 * 1024 * 1024
+
+# Default number of requests running at once on one WebSocket connection.
+DEFAULT_WEBSOCKET_CONCURRENCY = 64
+
+# Default ``Retry-After`` of requests rejected because the server is saturated, in seconds.
+DEFAULT_RETRY_AFTER = 1
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+SSE_CONTENT_TYPE = "text/event-stream"
+
+
+def format_server_timing(timings: Dict[str, int]) -> str:
+    """Format phase durations in nanoseconds as a ``Server-Timing`` header value."""
+    return ", ".join(f"{phase};dur={elapsed / 1e6:.3f}" for phase, elapsed in timings.items())
+
+
+class BodyTooLargeError(Exception):
+    """
+    Raised when a request body exceeds ``max_body_size``.
+    """
+
+
+class InvalidContentLengthError(Exception):
+    """
+    Raised when the ``content-length`` header is not a valid size.
+    """
+
+
+def get_header(scope: Dict[str, Any], name: bytes) -> Optional[bytes]:
+    """Return the value of a request header (``name`` lowercase), or None."""
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value
+    return None
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag`` (weak comparison)."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _content_length(scope: Dict[str, Any]) -> Optional[int]:
+    value = get_header(scope, b"content-length")
+    if value is None:
+        return None
+    try:
+        length = int(value)
+    except ValueError:
+        raise InvalidContentLengthError(value.decode("latin-1")) from None
+    if length < 0:
+        raise InvalidContentLengthError(value.decode("latin-1"))
+    return length
+
+
+async def read_body(
+    scope: Dict[str, Any], receive: Callable, max_body_size: Optional[int] = None
+) -> memoryview:
+    """
+    Read a request body into a single buffer.
+
+    When ``content-length`` is known the buffer is allocated once and chunks are
+    copied into it in place; otherwise chunks are appended to a growing buffer.
+    Either way the body is read in linear time. Without ``max_body_size``, a
+    declared length is only trusted up to ``DEFAULT_MAX_BODY_SIZE``, so that a
+    header alone cannot make the server allocate any amount of memory.
+
+    Raises:
+        BodyTooLargeError: As soon as the declared or received size exceeds
+            ``max_body_size``, without reading the rest of the body.
+        InvalidContentLengthError: If ``content-length`` is malformed.
+    """
+    declared = _content_length(scope)
+    if declared is not None and max_body_size is not None and declared > max_body_size:
+        raise BodyTooLargeError(declared)
+
+    preallocated = declared or 0
+    if max_body_size is None and preallocated > DEFAULT_MAX_BODY_SIZE:
+        preallocated = 0
+    buffer = bytearray(preallocated)
+    view = memoryview(buffer)
+    received = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunk = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not chunk:
+            continue
+
+        end = received + len(chunk)
+        if max_body_size is not None and end > max_body_size:
+            raise BodyTooLargeError(end)
+        if end <= len(buffer):
+            view[received:end] = chunk
+        else:
+            # More data than declared, or no content-length at all.
+            view.release()
+            del buffer[received:]
+            buffer += chunk
+            view = memoryview(buffer)
+        received = end
+
+    return view[:received]
 
 
 class PRPCAsgiApp:
     """
     A minimal ASGI application for serving pRPC requests.
+
+    Requests for generator procedures are streamed, one response per item, as
+    newline-delimited JSON, or as Server-Sent Events when the client sends
+    ``Accept: text/event-stream``.
+
+    Request bodies are decoded according to their ``Content-Type`` and
+    responses encoded according to ``Accept``: besides JSON, MessagePack
+    (``application/msgpack``) is supported when ``msgpack`` or ``msgspec`` is
+    installed, and ``application/vnd.prpc.frames`` carries the buffers of
+    ``binary`` procedures as raw attachments. Streams are always sent as JSON.
+
+    WebSocket connections to ``/rpc`` carry many concurrent requests: every
+    message is a request (or a batch), and responses are sent back as soon as
+    they are ready, in any order, correlated by ``id``.
+
+    A single request shed because its procedure or the thread pool is saturated
+    gets a 503 status with a ``Retry-After`` header, so that load balancers and
+    clients can back off. Entries of a batch report it in their own response.
+
+    If the client disconnects while its request is being handled, the request
+    is cancelled instead of computing an answer nobody will read.
+
+    Request bodies compressed with gzip (or zstd and brotli, when ``zstandard``
+    and ``brotli`` are installed) are decompressed. Responses are compressed
+    with the first of ``compression`` the client accepts, once they reach
+    ``compression_min_size`` bytes; streams are compressed item by item.
+
+    ``GET /rpc/schema`` serves the JSON schema of every registered procedure,
+    with an ``ETag`` so that clients can revalidate it with ``If-None-Match``.
+
+    While metrics are enabled, ``GET /metrics`` serves them in the Prometheus
+    text format.
+
+    For debugging slow calls, ``server_timing=True`` measures the phases of
+    every non-streaming request (``read``, ``decode``, ``validate``, ``call``,
+    ``serialize`` and ``encode``) and reports them, in milliseconds, in a
+    ``Server-Timing`` response header. ``profile_every=N`` runs one request in
+    every N under cProfile and hands the profile to ``profile_sink``. Since the
+    profiler sees everything running on the event loop meanwhile, concurrent
+    requests show up in the profile too.
     """
 
-    def __init__(self) -> None:
-        pass
+    def __init__(
+        self,
+        max_batch_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        codec: Optional[Codec] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_queue: Optional[int] = None,
+        max_body_size: Optional[int] = DEFAULT_MAX_BODY_SIZE,
+        max_websocket_concurrency: int = DEFAULT_WEBSOCKET_CONCURRENCY,
+        retry_after: int = DEFAULT_RETRY_AFTER,
+        cancel_on_disconnect: bool = True,
+        metrics: Union[bool, Metrics] = False,
+        server_timing: bool = False,
+        profile_every: Optional[int] = None,
+        profile_sink: Optional[Callable[[Dict[str, Any], cProfile.Profile], None]] = None,
+        compression: Sequence[str] = (),
+        compression_level: Optional[int] = None,
+        compression_min_size: int = DEFAULT_COMPRESSION_MIN_SIZE,
+    ) -> None:
+        """
+        Args:
+            max_batch_concurrency: Maximum number of entries of a batch request
+                that are executed at the same time.
+            codec: Default codec, for requests without a known ``Content-Type``.
+                Defaults to the fastest JSON codec installed (see
+                ``get_default_codec``).
+            max_workers: Size of the thread pool running synchronous procedures.
+            max_queue: Maximum number of synchronous calls waiting for a free
+                worker before new ones are rejected, or None for no limit.
+            max_body_size: Maximum size of a request body in bytes; larger
+                requests are rejected with 413. None disables the limit.
+            max_websocket_concurrency: Maximum number of requests running at
+                once on a single WebSocket connection. Further messages are not
+                read until one completes.
+            retry_after: Value of the ``Retry-After`` header of 503 responses,
+                in seconds.
+            cancel_on_disconnect: Watch for client disconnects while a request
+                is handled or its stream is sent, and cancel it when one happens.
+            metrics: True to record the app's calls in metrics of its own, or
+                the ``Metrics`` to record them in. Otherwise they are recorded
+                in ``default_metrics``, which the ``PRPC_METRICS=1`` environment
+                variable enables.
+            server_timing: Report the time spent in each phase of a request in
+                a ``Server-Timing`` response header.
+            profile_every: Profile one request in every ``profile_every``.
+            profile_sink: Called with the request payload and the
+                ``cProfile.Profile`` of each profiled request, on the event
+                loop; e.g. ``lambda payload, profile: profile.dump_stats(path)``.
+            compression: Encodings responses may be compressed with, in order
+                of preference: ``"zstd"``, ``"br"`` and/or ``"gzip"``. Empty
+                disables response compression.
+            compression_level: Compression level, or None for the default
+                level of each algorithm.
+            compression_min_size: Responses smaller than this, in bytes, are
+                sent uncompressed.
+        """
+        if profile_every is not None and (profile_every < 1 or profile_sink is None):
+            raise ValueError("profile_every must be at least 1 and requires a profile_sink")
+        for encoding in compression:
+            check_encoding(encoding)
+        self.max_batch_concurrency = max_batch_concurrency
+        self.executor = SyncExecutor(max_workers=max_workers, max_queue=max_queue)
+        self.codec = codec or get_default_codec()
+        self.codecs = get_codecs()
+        self.codecs[self.codec.content_type] = self.codec
+        self.max_body_size = max_body_size
+        self.max_websocket_concurrency = max_websocket_concurrency
+        self.retry_after = retry_after
+        self.cancel_on_disconnect = cancel_on_disconnect
+        if isinstance(metrics, Metrics):
+            self.metrics = metrics
+        elif metrics:
+            self.metrics = Metrics(enabled=True)
+        else:
+            self.metrics = default_metrics
+        self.server_timing = server_timing
+        self.profile_every = profile_every
+        self.profile_sink = profile_sink
+        self.compression = tuple(compression)
+        self.compression_level = compression_level
+        self.compression_min_size = compression_min_size
+        self._request_counter = itertools.count()
+        self._profiling = False
 
     async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
         """
         The ASGI entry point.
         """
+        if scope["type"] == "websocket":
+            await self.handle_websocket(scope, receive, send)
+            return
         if scope["type"] != "http":
             return
 
@@ -23,49 +288,408 @@ class PRPCAsgiApp:
         path = scope.get("path")
 
         if method == "POST" and path == "/rpc":
-            await self.handle_rpc(receive, send)
+            await self.handle_rpc(scope, receive, send)
+        elif method == "GET" and path == "/rpc/schema":
+            await self.handle_schema(scope, send)
+        elif method == "GET" and path == "/metrics" and self.metrics.enabled:
+            await self.handle_metrics(send)
         else:
             await self.send_response(
                 send, 404, {"error": "Not Found", "message": f"Cannot {method} {path}"}
             )
 
-    async def handle_rpc(self, receive: Callable, send: Callable) -> None:
+    async def handle_rpc(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
         """
         Handle an RPC request.
         """
-        body = b""
-        more_body = True
-        while more_body:
-            message = await receive()
-            body += message.get("body", b"")
-            more_body = message.get("more_body", False)
+        send = self._compressing(scope, send)
+
+        timings: Optional[Dict[str, int]] = None
+        if self.server_timing:
+            timings = {}
+            start = time.perf_counter_ns()
 
+        try:
+            body = await read_body(scope, receive, self.max_body_size)
+        except BodyTooLargeError:
+            await self.send_response(send, 413, {"error": "Payload Too Large"})
+            return
+        except InvalidContentLengthError:
+            await self.send_response(send, 400, {"error": "Invalid Content-Length"})
+            return
+
+        if timings is not None:
+            now = time.perf_counter_ns()
+            timings["read"] = now - start
+            start = now
+
+        content_encoding = get_header(scope, b"content-encoding")
+        if content_encoding is not None and body:
+            try:
+                body = decompress(
+                    body, content_encoding.decode("latin-1").strip().lower(), self.max_body_size
+                )
+            except UnsupportedEncodingError:
+                await self.send_response(send, 415, {"error": "Unsupported Content-Encoding"})
+                return
+            except DecompressionError:
+                await self.send_response(send, 400, {"error": "Invalid compressed body"})
+                return
+            if self.max_body_size is not None and len(body) > self.max_body_size:
+                await self.send_response(send, 413, {"error": "Payload Too Large"})
+                return
+
+        content_type = get_header(scope, b"content-type")
+        codec = self.codec
+        if content_type is not None:
+            codec = select_request_codec(content_type.decode("latin-1"), self.codecs, codec)
         try:
             if not body:
                 payload = {}
             else:
-                payload = json.loads(body)
-        except json.JSONDecodeError:
-            await self.send_response(send, 400, {"error": "Invalid JSON"})
+                payload = codec.decode(body)
+        except DecodeError:
+            message = "Invalid JSON" if codec.content_type == JSON_CONTENT_TYPE else "Invalid body"
+            await self.send_response(send, 400, {"error": message})
+            return
+
+        if timings is not None:
+            timings["decode"] = time.perf_counter_ns() - start
+
+        accept = get_header(scope, b"accept")
+        if accept is not None:
+            codec = select_response_codec(accept.decode("latin-1"), self.codecs, codec)
+
+        profiler = self._start_profiler() if self.profile_every is not None else None
+        if profiler is None:
+            await self._dispatch_rpc(scope, receive, send, payload, timings, codec)
+            return
+        try:
+            await self._dispatch_rpc(scope, receive, send, payload, timings, codec)
+        finally:
+            profiler.disable()
+            self._profiling = False
+            self.profile_sink(payload, profiler)  # type: ignore[misc]
+
+    def _start_profiler(self) -> Optional[cProfile.Profile]:
+        """Start profiling if this request is sampled and no other one is profiled."""
+        every = self.profile_every
+        if every is None or next(self._request_counter) % every or self._profiling:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active on this thread.
+            return None
+        self._profiling = True
+        return profiler
+
+    async def _dispatch_rpc(
+        self,
+        scope: Dict[str, Any],
+        receive: Callable,
+        send: Callable,
+        payload: Any,
+        timings: Optional[Dict[str, int]],
+        codec: Codec,
+    ) -> None:
+        if is_streaming_request(payload):
+            accept = get_header(scope, b"accept") or b""
+            stream = self.send_stream(
+                send,
+                stream_request(payload, executor=self.executor, metrics=self.metrics),
+                sse=SSE_CONTENT_TYPE.encode() in accept,
+            )
+            if self.cancel_on_disconnect:
+                await self._until_disconnect(receive, lambda: stream)
+            else:
+                await stream
+            return
+
+        def handle() -> Awaitable[Any]:
+            return handle_request(
+                payload,
+                max_concurrency=self.max_batch_concurrency,
+                executor=self.executor,
+                timings=timings,
+                metrics=self.metrics,
+            )
+
+        if self.cancel_on_disconnect:
+            response = await self._until_disconnect(receive, handle)
+        else:
+            response = await handle()
+        if response is not None:
+            await self.send_rpc_response(send, response, timings, codec)
+
+    async def _until_disconnect(
+        self, receive: Callable, work: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Run ``work``, cancelling it if the client disconnects first.
+
+        Returns:
+            What ``work`` returned, or None if it was cancelled.
+        """
+        result = None
+        async with anyio.create_task_group() as tg:
+
+            async def watch_disconnect() -> None:
+                # The body has been read, so the next message is the disconnect.
+                while (await receive())["type"] != "http.disconnect":
+                    pass
+                tg.cancel_scope.cancel()
+
+            tg.start_soon(watch_disconnect)
+            result = await work()
+            tg.cancel_scope.cancel()
+        return result
+
+    def _compressing(self, scope: Dict[str, Any], send: Callable) -> Callable:
+        """Wrap ``send`` to compress the response, if the client accepts it."""
+        if self.compression:
+            accept_encoding = get_header(scope, b"accept-encoding")
+            if accept_encoding is not None:
+                encoding = select_encoding(accept_encoding.decode("latin-1"), self.compression)
+                if encoding is not None:
+                    return compressing_send(
+                        send, encoding, self.compression_level, self.compression_min_size
+                    )
+        return send
+
+    async def handle_schema(self, scope: Dict[str, Any], send: Callable) -> None:
+        """
+        Serve the schema document of the registry.
+
+        The document is cached by the registry, so this is a lookup unless a
+        procedure was registered since the last request.
+        """
+        body, etag = default_registry.schema_document()
+        headers = [
+            (b"etag", etag.encode("latin-1")),
+            (b"cache-control", b"no-cache"),
+        ]
+        if_none_match = get_header(scope, b"if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match.decode("latin-1"), etag):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
             return
 
-        response_dict = await handle_request(payload)
-        await self.send_response(send, 200, response_dict)
+        headers.append((b"content-type", JSON_CONTENT_TYPE.encode("latin-1")))
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        send = self._compressing(scope, send)
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
 
-    async def send_response(self, send: Callable, status_code: int, content: Dict[str, Any]) -> None:
+    async def handle_metrics(self, send: Callable) -> None:
         """
-        Helper to send a JSON response.
+        Serve the recorded metrics in the Prometheus text format.
         """
-        response_body = json.dumps(content).encode("utf-8")
         await send(
             {
                 "type": "http.response.start",
-                "status": status_code,
+                "status": 200,
+                "headers": [(b"content-type", PROMETHEUS_CONTENT_TYPE.encode("latin-1"))],
+            }
+        )
+        await send(
+            {"type": "http.response.body", "body": self.metrics.render_prometheus().encode()}
+        )
+
+    async def handle_websocket(
+        self, scope: Dict[str, Any], receive: Callable, send: Callable
+    ) -> None:
+        """
+        Serve RPC requests over a WebSocket connection.
+
+        Each message is dispatched in its own task, so a slow call does not hold
+        up the others on the connection. Responses are sent in the frame type
+        (text or bytes) of the request. Text frames are always JSON; binary
+        frames use the codec named by the ``Content-Type`` of the handshake,
+        JSON by default. Calls still running when the client disconnects are
+        cancelled.
+        """
+        message = await receive()
+        if message["type"] != "websocket.connect":
+            return
+        if scope.get("path") != "/rpc":
+            await send({"type": "websocket.close", "code": 1008})
+            return
+        await send({"type": "websocket.accept"})
+
+        send_lock = anyio.Lock()
+        slots = anyio.Semaphore(self.max_websocket_concurrency)
+        text_codec = self.codecs[JSON_CONTENT_TYPE]
+        content_type = get_header(scope, b"content-type")
+        binary_codec = select_request_codec(
+            content_type.decode("latin-1") if content_type else None, self.codecs, text_codec
+        )
+
+        async def reply(content: Any, as_text: bool) -> None:
+            data = (text_codec if as_text else binary_codec).encode(content)
+            frame = {"type": "websocket.send"}
+            if as_text:
+                frame["text"] = data.decode("utf-8")
+            else:
+                frame["bytes"] = data
+            async with send_lock:
+                await send(frame)
+
+        async def dispatch(data: bytes, as_text: bool) -> None:
+            codec = text_codec if as_text else binary_codec
+            try:
+                try:
+                    payload = codec.decode(data)
+                except DecodeError:
+                    message = (
+                        "Invalid JSON"
+                        if codec.content_type == JSON_CONTENT_TYPE
+                        else "Invalid body"
+                    )
+                    response: Any = {
+                        "id": None,
+                        "result": None,
+                        "error": {"code": 400, "message": message},
+                    }
+                else:
+                    response = await handle_request(
+                        payload,
+                        max_concurrency=self.max_batch_concurrency,
+                        executor=self.executor,
+                        metrics=self.metrics,
+                    )
+                await reply(response, as_text)
+            finally:
+                slots.release()
+
+        async with anyio.create_task_group() as tg:
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    tg.cancel_scope.cancel()
+                    break
+                if message["type"] != "websocket.receive":
+                    continue
+
+                text = message.get("text")
+                data = text.encode("utf-8") if text is not None else message.get("bytes") or b""
+                await slots.acquire()
+                tg.start_soon(dispatch, data, text is not None)
+
+    async def send_stream(
+        self, send: Callable, responses: AsyncIterator[Dict[str, Any]], sse: bool = False
+    ) -> None:
+        """
+        Stream responses as chunked ``http.response.body`` messages.
+
+        Each response is sent as soon as it is produced; awaiting ``send``
+        applies the server's backpressure to the producing procedure. If the
+        first response is an error, such as a call shed under load, it is sent
+        as a regular response instead.
+        """
+        try:
+            first: Optional[Dict[str, Any]] = await responses.__anext__()
+        except StopAsyncIteration:
+            first = None
+        if first is not None and first.get("error"):
+            await responses.aclose()  # type: ignore[attr-defined]
+            await self.send_rpc_response(send, first)
+            return
+
+        content_type = SSE_CONTENT_TYPE if sse else NDJSON_CONTENT_TYPE
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
                 "headers": [
-                    (b"content-type", b"application/json"),
+                    (b"content-type", content_type.encode("latin-1")),
+                    (b"cache-control", b"no-cache"),
                 ],
             }
         )
+        try:
+            if first is not None:
+                await self._send_chunk(send, first, sse)
+            async for response in responses:
+                await self._send_chunk(send, response, sse)
+        finally:
+            # Closes the procedure's generator, also when the client went away.
+            with anyio.CancelScope(shield=True):
+                await responses.aclose()  # type: ignore[attr-defined]
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _send_chunk(self, send: Callable, response: Dict[str, Any], sse: bool) -> None:
+        # NDJSON and SSE are JSON formats, whatever the default codec.
+        data = self.codecs[JSON_CONTENT_TYPE].encode(response)
+        chunk = b"data: " + data + b"\n\n" if sse else data + b"\n"
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+    async def send_rpc_response(
+        self,
+        send: Callable,
+        response: Union[Dict[str, Any], List[Dict[str, Any]]],
+        timings: Optional[Dict[str, int]] = None,
+        codec: Optional[Codec] = None,
+    ) -> None:
+        """
+        Send the response of an RPC request, with a 503 status if it was shed.
+        """
+        error = response.get("error") if isinstance(response, dict) else None
+        if error and error.get("code") == OVERLOADED:
+            headers = [(b"retry-after", str(self.retry_after).encode("latin-1"))]
+            await self.send_response(send, 503, response, headers, timings, codec)
+        else:
+            await self.send_response(send, 200, response, timings=timings, codec=codec)
+
+    async def send_response(
+        self,
+        send: Callable,
+        status_code: int,
+        content: Union[Dict[str, Any], List[Dict[str, Any]]],
+        headers: Optional[List[Tuple[bytes, bytes]]] = None,
+        timings: Optional[Dict[str, int]] = None,
+        codec: Optional[Codec] = None,
+    ) -> None:
+        """
+        Helper to encode and send a response, with ``codec`` or the default one.
+
+        If ``timings`` is given, the encoding time is added to it and all the
+        phases are sent in a ``Server-Timing`` header.
+
+        With a :class:`FramesCodec`, each frame is sent as its own body
+        message, so that binary attachments go out without being copied.
+        """
+        codec = codec or self.codec
+        encode = codec.encode_frames if isinstance(codec, FramesCodec) else codec.encode
+        if timings is None:
+            response_body = encode(content)
+        else:
+            start = time.perf_counter_ns()
+            response_body = encode(content)
+            timings["encode"] = time.perf_counter_ns() - start
+        response_headers = [(b"content-type", codec.content_type.encode("latin-1"))]
+        if isinstance(response_body, list):
+            length = sum(len(frame) for frame in response_body)
+            response_headers.append((b"content-length", str(length).encode("latin-1")))
+        if headers:
+            response_headers.extend(headers)
+        if timings is not None:
+            response_headers.append(
+                (b"server-timing", format_server_timing(timings).encode("latin-1"))
+            )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": response_headers,
+            }
+        )
+        if isinstance(response_body, list):
+            last = len(response_body) - 1
+            for i, frame in enumerate(response_body):
+                await send({"type": "http.response.body", "body": frame, "more_body": i < last})
+            return
         await send(
             {
                 "type": "http.response.body",
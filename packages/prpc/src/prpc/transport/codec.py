@@ -0,0 +1,383 @@
+import base64
+import functools
+import json
+import struct
+from typing import Any, Dict, List, Mapping, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depends on the environment
+    msgspec = None  # type: ignore[assignment]
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None  # type: ignore[assignment]
+
+from ..core.attachments import (
+    Attached,
+    buffer_view,
+    is_buffer,
+    placeholder,
+    restore_buffers,
+)
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+# Other names MessagePack bodies are sent under.
+MSGPACK_CONTENT_TYPE_ALIASES = ("application/x-msgpack", "application/vnd.msgpack")
+
+# A JSON envelope followed by binary attachments; see FramesCodec.
+FRAMES_CONTENT_TYPE = "application/vnd.prpc.frames"
+
+
+class DecodeError(ValueError):
+    """
+    Raised when a request body cannot be decoded.
+    """
+
+
+class Codec:
+    """
+    Base class for the wire codecs used by the transports.
+
+    A codec turns a request body into Python data and encodes response data
+    straight to bytes.
+    """
+
+    name = "base"
+    content_type = "application/json"
+
+    def encode(self, obj: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: Buffer) -> Any:
+        raise NotImplementedError
+
+
+def _inline_json(buffer: Any) -> Any:
+    # Bytes-like buffers become base64 strings and arrays nested lists.
+    if isinstance(buffer, (bytes, bytearray, memoryview)):
+        return base64.b64encode(buffer).decode("ascii")
+    return buffer.tolist()
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, Attached):
+        return obj.inline(_inline_json)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JsonCodec(Codec):
+    """
+    JSON codec based on the standard library.
+    """
+
+    name = "json"
+
+    def encode(self, obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+    def decode(self, data: Buffer) -> Any:
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        try:
+            return json.loads(data)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise DecodeError(str(e)) from e
+
+
+class OrjsonCodec(Codec):
+    """
+    JSON codec based on ``orjson``.
+    """
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        if orjson is None:
+            raise RuntimeError("orjson is not installed")
+        self._fallback = JsonCodec()
+
+    def encode(self, obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, default=_json_default)
+        except TypeError:
+            # orjson rejects a few values the stdlib accepts, such as
+            # integers wider than 64 bits.
+            return self._fallback.encode(obj)
+
+    def decode(self, data: Buffer) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as e:
+            raise DecodeError(str(e)) from e
+
+
+class MsgspecJsonCodec(Codec):
+    """
+    JSON codec based on ``msgspec``.
+    """
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        if msgspec is None:
+            raise RuntimeError("msgspec is not installed")
+        self._encoder = msgspec.json.Encoder(enc_hook=_json_default)
+        self._decoder = msgspec.json.Decoder()
+        self._fallback = JsonCodec()
+
+    def encode(self, obj: Any) -> bytes:
+        try:
+            return self._encoder.encode(obj)
+        except (TypeError, OverflowError):
+            return self._fallback.encode(obj)
+
+    def decode(self, data: Buffer) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise DecodeError(str(e)) from e
+
+
+def _inline_msgpack(buffer: Any) -> Any:
+    # Bytes-like buffers are native MessagePack binaries; arrays become lists.
+    if isinstance(buffer, (bytes, bytearray, memoryview)):
+        return buffer
+    return buffer.tolist()
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, Attached):
+        return obj.inline(_inline_msgpack)
+    raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
+
+class MsgpackCodec(Codec):
+    """
+    MessagePack codec, based on ``msgpack`` or, failing that, ``msgspec``.
+
+    A binary format: numbers and nested records are smaller and faster to
+    encode and decode than as JSON text.
+    """
+
+    name = "msgpack"
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def __init__(self) -> None:
+        if msgpack is not None:
+            # packb rather than a shared Packer, which is not thread-safe.
+            self._encode = functools.partial(
+                msgpack.packb, use_bin_type=True, default=_msgpack_default
+            )
+            self._decode = functools.partial(msgpack.unpackb, raw=False, strict_map_key=False)
+            self._errors: Any = (ValueError, msgpack.UnpackException)
+        elif msgspec is not None:
+            self._encode = msgspec.msgpack.Encoder(enc_hook=_msgpack_default).encode
+            self._decode = msgspec.msgpack.Decoder().decode
+            self._errors = msgspec.DecodeError
+        else:
+            raise RuntimeError("MessagePack requires the 'msgpack' or 'msgspec' package")
+
+    def encode(self, obj: Any) -> bytes:
+        return self._encode(obj)
+
+    def decode(self, data: Buffer) -> Any:
+        try:
+            return self._decode(data)
+        except self._errors as e:
+            raise DecodeError(str(e)) from e
+
+
+class FramesCodec(Codec):
+    """
+    A JSON envelope followed by binary attachments, sent as raw frames.
+
+    Bytes, memoryviews and NumPy arrays found in the data, including the
+    results of ``binary`` procedures, are replaced in the envelope by
+    ``{"$attachment": n}`` placeholders (plus ``dtype`` and ``shape`` for
+    arrays) and sent after it without being copied. Decoding rebuilds them as
+    ``memoryview`` or NumPy arrays over the received body.
+
+    Layout: the number of frames as a big-endian uint32, the length of each
+    frame as a big-endian uint64, then the frames. The envelope is frame 0 and
+    attachment ``n`` is frame ``n + 1``.
+    """
+
+    name = "frames"
+    content_type = FRAMES_CONTENT_TYPE
+
+    def __init__(self, json_codec: Optional[Codec] = None) -> None:
+        self._json = json_codec or get_default_codec()
+
+    def encode_frames(self, obj: Any) -> List[Buffer]:
+        """Encode ``obj`` into the frames of a body: header, envelope, attachments."""
+        attachments: List[memoryview] = []
+
+        def attach(buffer: Any) -> Dict[str, Any]:
+            attachments.append(buffer_view(buffer))
+            return placeholder(len(attachments) - 1, buffer)
+
+        def default(value: Any) -> Any:
+            if isinstance(value, Attached):
+                return value.inline(attach)
+            if is_buffer(value):
+                return attach(value)
+            raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+        envelope = None
+        if orjson is not None:
+            try:
+                envelope = orjson.dumps(obj, default=default)
+            except TypeError:
+                # Same fallback as OrjsonCodec; start over with the stdlib.
+                attachments.clear()
+        if envelope is None:
+            envelope = json.dumps(obj, separators=(",", ":"), default=default).encode("utf-8")
+        lengths = [len(envelope)] + [a.nbytes for a in attachments]
+        header = struct.pack(f">I{len(lengths)}Q", len(lengths), *lengths)
+        return [header, envelope, *attachments]
+
+    def encode(self, obj: Any) -> bytes:
+        return b"".join(self.encode_frames(obj))
+
+    def decode(self, data: Buffer) -> Any:
+        view = memoryview(data)
+        try:
+            (count,) = struct.unpack_from(">I", view)
+            lengths = struct.unpack_from(f">{count}Q", view, 4)
+        except struct.error as e:
+            raise DecodeError(f"Invalid frames header: {e}") from e
+        if count == 0:
+            raise DecodeError("Missing envelope frame")
+        offset = 4 + 8 * count
+        if offset + sum(lengths) != len(view):
+            raise DecodeError("Frame lengths do not match the body size")
+
+        frames = []
+        for length in lengths:
+            frames.append(view[offset : offset + length])
+            offset += length
+        envelope = self._json.decode(frames[0])
+        if count == 1:
+            return envelope
+        return restore_buffers(envelope, [f.toreadonly() for f in frames[1:]])
+
+
+_default_codec: Optional[Codec] = None
+
+
+def get_default_codec() -> Codec:
+    """
+    Return the fastest JSON codec available.
+
+    ``orjson`` is preferred, then ``msgspec``; the standard library is used
+    when neither is installed.
+    """
+    global _default_codec
+    if _default_codec is None:
+        if orjson is not None:
+            _default_codec = OrjsonCodec()
+        elif msgspec is not None:
+            _default_codec = MsgspecJsonCodec()
+        else:
+            _default_codec = JsonCodec()
+    return _default_codec
+
+
+def msgpack_available() -> bool:
+    """Whether a MessagePack implementation is installed."""
+    return msgpack is not None or msgspec is not None
+
+
+def get_codecs(default: Optional[Codec] = None) -> Dict[str, Codec]:
+    """
+    Return the codecs available for content negotiation, by media type.
+
+    Args:
+        default: The JSON codec to use. Defaults to ``get_default_codec()``.
+    """
+    json_codec = default or get_default_codec()
+    codecs: Dict[str, Codec] = {
+        JSON_CONTENT_TYPE: json_codec,
+        FRAMES_CONTENT_TYPE: FramesCodec(json_codec),
+    }
+    if msgpack_available():
+        binary = MsgpackCodec()
+        for content_type in (MSGPACK_CONTENT_TYPE,) + MSGPACK_CONTENT_TYPE_ALIASES:
+            codecs[content_type] = binary
+    return codecs
+
+
+def _media_type(value: str) -> str:
+    return value.split(";", 1)[0].strip().lower()
+
+
+def select_request_codec(
+    content_type: Optional[str], codecs: Mapping[str, Codec], default: Codec
+) -> Codec:
+    """Pick the codec of a request body from its ``Content-Type``."""
+    if not content_type:
+        return default
+    return codecs.get(_media_type(content_type), default)
+
+
+def _quality(value: str) -> float:
+    """The ``q`` parameter of an ``Accept`` entry; invalid values count as 0."""
+    for param in value.split(";")[1:]:
+        name, _, q = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return min(max(float(q), 0.0), 1.0)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def select_response_codec(
+    accept: Optional[str], codecs: Mapping[str, Codec], request_codec: Codec
+) -> Codec:
+    """
+    Pick the codec of a response from the request's ``Accept`` header.
+
+    The media type with a codec and the highest quality wins, the first
+    listed one among equals; types with ``q=0`` are not acceptable. A
+    wildcard (``*/*`` or ``application/*``) stands for the request's codec,
+    or for the first other codec when that one is excluded. Without an
+    acceptable match, the response uses the request's codec.
+    """
+    if not accept:
+        return request_codec
+
+    entries = []
+    # The quality given to each codec by name, which overrides wildcards.
+    explicit: Dict[int, float] = {}
+    for part in accept.split(","):
+        media_type, q = _media_type(part), _quality(part)
+        codec = codecs.get(media_type)
+        if codec is not None:
+            explicit.setdefault(id(codec), q)
+            entries.append((codec, q))
+        elif media_type in ("*/*", "application/*"):
+            entries.append((None, q))
+
+    best, best_q = request_codec, 0.0
+    for codec, q in entries:
+        if codec is None:
+            candidates = [request_codec, *codecs.values()]
+            codec = next(
+                (c for c in candidates if explicit.get(id(c), q) > 0), request_codec
+            )
+            q = explicit.get(id(codec), q)
+        if q > best_q:
+            best, best_q = codec, q
+    return best
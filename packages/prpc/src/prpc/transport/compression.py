@@ -0,0 +1,281 @@
+import zlib
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None  # type: ignore[assignment]
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None  # type: ignore[assignment]
+
+from .codec import FRAMES_CONTENT_TYPE
+
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+BROTLI = "br"
+
+# Bodies smaller than this are sent uncompressed: the saving would not be
+# worth the CPU time, and small gzip bodies can even grow.
+DEFAULT_COMPRESSION_MIN_SIZE = 1024
+
+# The package each encoding needs, for error messages.
+_REQUIREMENTS = {ZSTD: "zstandard", BROTLI: "brotli"}
+
+_FRAMES_CONTENT_TYPE = FRAMES_CONTENT_TYPE.encode("latin-1")
+
+
+class UnsupportedEncodingError(ValueError):
+    """
+    Raised for a ``Content-Encoding`` this installation cannot decode.
+    """
+
+
+class DecompressionError(ValueError):
+    """
+    Raised when a compressed body is corrupt.
+    """
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """The encodings that can be used, in order of preference."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append(ZSTD)
+    if brotli is not None:
+        encodings.append(BROTLI)
+    encodings.append(GZIP)
+    return tuple(encodings)
+
+
+def check_encoding(encoding: str) -> None:
+    """
+    Raises:
+        UnsupportedEncodingError: If ``encoding`` is unknown or its package is
+            not installed.
+    """
+    if encoding not in available_encodings():
+        requirement = _REQUIREMENTS.get(encoding)
+        if requirement is not None:
+            raise UnsupportedEncodingError(
+                f"{encoding} compression requires the '{requirement}' package"
+            )
+        raise UnsupportedEncodingError(f"Unsupported encoding {encoding!r}")
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Compress a whole body; ``level`` defaults to the algorithm's own default."""
+    if encoding == GZIP:
+        compressor = zlib.compressobj(-1 if level is None else level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+    if encoding == ZSTD:
+        options = {} if level is None else {"level": level}
+        return zstandard.ZstdCompressor(**options).compress(data)
+    if encoding == BROTLI:
+        options = {} if level is None else {"quality": level}
+        return brotli.compress(data, **options)
+    raise UnsupportedEncodingError(f"Unsupported encoding {encoding!r}")
+
+
+def decompress(data: bytes, encoding: str, max_size: Optional[int] = None) -> bytes:
+    """
+    Decompress a whole body.
+
+    With ``max_size``, inflating stops shortly after ``max_size`` bytes, so
+    that the caller can reject an oversized body without inflating all of it.
+
+    Raises:
+        UnsupportedEncodingError: If the encoding cannot be decoded.
+        DecompressionError: If the body is corrupt.
+    """
+    if encoding == IDENTITY:
+        return data
+    limit = None if max_size is None else max_size + 1
+    try:
+        if encoding == GZIP:
+            # 47 accepts both gzip and zlib headers.
+            decompressor = zlib.decompressobj(47)
+            data = decompressor.decompress(data, limit or 0)
+            finished = decompressor.eof
+        elif encoding == ZSTD and zstandard is not None:
+            reader = zstandard.ZstdDecompressor().stream_reader(data)
+            chunks = []
+            size = 0
+            while limit is None or size < limit:
+                chunk = reader.read(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+            return b"".join(chunks)
+        elif encoding == BROTLI and brotli is not None:
+            decompressor = brotli.Decompressor()
+            if limit is None:
+                data = decompressor.process(data)
+            else:
+                data = decompressor.process(data, output_buffer_limit=limit)
+            finished = decompressor.is_finished()
+        else:
+            raise UnsupportedEncodingError(f"Unsupported encoding {encoding!r}")
+    except zlib.error as e:
+        raise DecompressionError(str(e)) from e
+    except Exception as e:
+        if (zstandard is not None and isinstance(e, zstandard.ZstdError)) or (
+            brotli is not None and isinstance(e, brotli.error)
+        ):
+            raise DecompressionError(str(e)) from e
+        raise
+    if not finished and (limit is None or len(data) < limit):
+        raise DecompressionError(f"Truncated {encoding} body")
+    return data
+
+
+class StreamCompressor:
+    """
+    Compresses a body chunk by chunk.
+
+    Each compressed chunk is flushed, so that the receiver can decode every
+    item of a stream as soon as it arrives.
+    """
+
+    def __init__(self, encoding: str, level: Optional[int] = None) -> None:
+        self.encoding = encoding
+        if encoding == GZIP:
+            self._compressor: Any = zlib.compressobj(
+                -1 if level is None else level, zlib.DEFLATED, 31
+            )
+        elif encoding == ZSTD:
+            options = {} if level is None else {"level": level}
+            self._compressor = zstandard.ZstdCompressor(**options).compressobj()
+        elif encoding == BROTLI:
+            options = {} if level is None else {"quality": level}
+            self._compressor = brotli.Compressor(**options)
+        else:
+            raise UnsupportedEncodingError(f"Unsupported encoding {encoding!r}")
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = self._compressor
+        if self.encoding == GZIP:
+            return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == ZSTD:
+            return compressor.compress(data) + compressor.flush(
+                zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            )
+        return compressor.process(data) + compressor.flush()
+
+    def finish(self) -> bytes:
+        if self.encoding == BROTLI:
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def select_encoding(
+    accept_encoding: Optional[str], encodings: Sequence[str]
+) -> Optional[str]:
+    """
+    Pick the first of ``encodings`` allowed by an ``Accept-Encoding`` header.
+
+    Returns:
+        The encoding, or None to send the body as-is.
+    """
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for encoding in encodings:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def _skip_compression(
+    headers: Sequence[Tuple[bytes, bytes]], body: bytes, more_body: bool, min_size: int
+) -> bool:
+    """Whether a response with ``headers`` and first body message is sent as-is."""
+    length: Optional[int] = None
+    for key, value in headers:
+        key = key.lower()
+        if key == b"content-encoding":
+            return True
+        if key == b"content-type" and value.startswith(_FRAMES_CONTENT_TYPE):
+            return True
+        if key == b"content-length" and value.isdigit():
+            length = int(value)
+    if length is None and not more_body:
+        length = len(body)
+    return length is not None and length < min_size
+
+
+def compressing_send(
+    send: Callable,
+    encoding: str,
+    level: Optional[int] = None,
+    min_size: int = DEFAULT_COMPRESSION_MIN_SIZE,
+) -> Callable:
+    """
+    Wrap an ASGI ``send`` to compress the response body with ``encoding``.
+
+    A response is compressed if it has at least ``min_size`` bytes, as given
+    by its ``Content-Length`` or, without one, by its body when it is sent in
+    one message. A response sent in several messages without a length, such
+    as a stream, is compressed chunk by chunk. Frames responses are never
+    compressed, so that their binary attachments go out without a copy.
+    """
+    start: Optional[Dict[str, Any]] = None
+    compressor: Optional[StreamCompressor] = None
+    passthrough = False
+
+    async def wrapped(message: Dict[str, Any]) -> None:
+        nonlocal start, compressor, passthrough
+        if message["type"] == "http.response.start":
+            # Held back until the first body message tells the response size.
+            start = message
+            return
+        if message["type"] != "http.response.body" or passthrough:
+            await send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if start is not None:
+            response_start, start = start, None
+            headers = list(response_start.get("headers", []))
+            if _skip_compression(headers, body, more_body, min_size):
+                passthrough = True
+                await send(response_start)
+                await send(message)
+                return
+
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"vary", b"accept-encoding"))
+            if not more_body:
+                data = compress(body, encoding, level)
+                headers.append((b"content-length", str(len(data)).encode("latin-1")))
+                await send(dict(response_start, headers=headers))
+                await send({"type": "http.response.body", "body": data})
+                return
+            compressor = StreamCompressor(encoding, level)
+            await send(dict(response_start, headers=headers))
+
+        assert compressor is not None
+        data = compressor.compress(body) if body else b""
+        if not more_body:
+            data += compressor.finish()
+        await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    return wrapped
@@ -4,7 +4,7 @@ from prpc import rpc, asgi_app, default_registry
 
 @pytest.fixture(autouse=True)
 def clear_registry():
-    default_registry._procedures.clear()
+    default_registry.clear()
 
 @pytest.mark.anyio
 async def test_asgi_rpc_success():
@@ -38,3 +38,321 @@ async def test_asgi_invalid_json():
         )
         assert response.status_code == 400
         assert "Invalid JSON" in response.json()["error"]
+
+@pytest.mark.anyio
+async def test_asgi_rpc_batch():
+    @rpc
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    async with AsyncClient(transport=ASGITransport(app=asgi_app), base_url="http://test") as client:
+        payload = [
+            {"id": 1, "method": "add", "params": [1, 2]},
+            {"id": 2, "method": "ghost"},
+        ]
+        response = await client.post("/rpc", json=payload)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data[0] == {"id": 1, "result": 3, "error": None}
+        assert data[1]["id"] == 2
+        assert data[1]["error"]["code"] == 404
+
+def _receive_chunks(chunks):
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    return receive
+
+@pytest.mark.anyio
+async def test_read_body_chunks():
+    from prpc.transport.asgi import read_body
+
+    chunks = [b'{"id": 1, ', b'"method": ', b'"ping"}']
+    total = sum(len(c) for c in chunks)
+
+    with_length = {"headers": [(b"content-length", str(total).encode())]}
+    body = await read_body(with_length, _receive_chunks(chunks))
+    assert bytes(body) == b"".join(chunks)
+
+    body = await read_body({"headers": []}, _receive_chunks(chunks))
+    assert bytes(body) == b"".join(chunks)
+
+    # A declared length shorter than the actual body still yields the full body
+    short_length = {"headers": [(b"content-length", b"4")]}
+    body = await read_body(short_length, _receive_chunks(chunks))
+    assert bytes(body) == b"".join(chunks)
+
+@pytest.mark.anyio
+async def test_read_body_too_large():
+    from prpc.transport.asgi import BodyTooLargeError, read_body
+
+    declared = {"headers": [(b"content-length", b"100")]}
+    with pytest.raises(BodyTooLargeError):
+        await read_body(declared, _receive_chunks([b"x" * 100]), max_body_size=10)
+
+    with pytest.raises(BodyTooLargeError):
+        await read_body({"headers": []}, _receive_chunks([b"x" * 8, b"x" * 8]), max_body_size=10)
+
+@pytest.mark.anyio
+async def test_read_body_unlimited_does_not_trust_large_lengths():
+    import tracemalloc
+
+    from prpc.transport.asgi import read_body
+
+    declared = {"headers": [(b"content-length", b"100000000")]}
+    tracemalloc.start()
+    try:
+        body = await read_body(declared, _receive_chunks([b"x" * 100]), max_body_size=None)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert bytes(body) == b"x" * 100
+    assert peak < 1024 * 1024
+
+@pytest.mark.anyio
+async def test_asgi_payload_too_large():
+    from prpc.transport.asgi import PRPCAsgiApp
+
+    app = PRPCAsgiApp(max_body_size=16)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/rpc", json={"id": 1, "method": "x" * 32})
+        assert response.status_code == 413
+
+@pytest.mark.anyio
+async def test_asgi_invalid_content_length():
+    from prpc.transport.asgi import PRPCAsgiApp
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/rpc", "headers": [(b"content-length", b"abc")]}
+    await PRPCAsgiApp()(scope, _receive_chunks([b"{}"]), send)
+
+    assert sent[0]["status"] == 400
+
+@pytest.mark.anyio
+async def test_asgi_stream_ndjson_and_sse():
+    import json
+
+    @rpc
+    async def ticks(n: int):
+        for i in range(n):
+            yield {"tick": i}
+
+    async with AsyncClient(transport=ASGITransport(app=asgi_app), base_url="http://test") as client:
+        payload = {"id": 1, "method": "ticks", "params": [3]}
+        response = await client.post("/rpc", json=payload)
+
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["result"] for line in lines] == [{"tick": 0}, {"tick": 1}, {"tick": 2}]
+        assert all(line["id"] == 1 for line in lines)
+
+        response = await client.post("/rpc", json=payload, headers={"accept": "text/event-stream"})
+
+        assert response.headers["content-type"] == "text/event-stream"
+        events = [e for e in response.text.split("\n\n") if e]
+        assert len(events) == 3
+        assert json.loads(events[0].removeprefix("data: "))["result"] == {"tick": 0}
+
+@pytest.mark.anyio
+async def test_asgi_streams_json_with_binary_default_codec():
+    import json
+
+    from prpc.transport.asgi import PRPCAsgiApp
+    from prpc.transport.codec import MsgpackCodec
+
+    pytest.importorskip("msgpack")
+
+    @rpc
+    async def ticks(n: int):
+        for i in range(n):
+            yield i
+
+    app = PRPCAsgiApp(codec=MsgpackCodec())
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        payload = {"id": 1, "method": "ticks", "params": [2]}
+        response = await client.post("/rpc", json=payload)
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["result"] for line in lines] == [0, 1]
+
+        response = await client.post("/rpc", json=payload, headers={"accept": "text/event-stream"})
+        events = [e for e in response.text.split("\n\n") if e]
+        assert json.loads(events[1].removeprefix("data: "))["result"] == 1
+
+@pytest.mark.anyio
+async def test_asgi_cancels_on_client_disconnect():
+    import anyio
+
+    cancelled = []
+
+    @rpc
+    async def slow() -> str:
+        try:
+            await anyio.sleep(10)
+        except BaseException:
+            cancelled.append(True)
+            raise
+        return "done"
+
+    body = b'{"id": 1, "method": "slow"}'
+    messages = [
+        {"type": "http.request", "body": body, "more_body": False},
+        {"type": "http.disconnect"},
+    ]
+    sent = []
+
+    async def receive():
+        message = messages.pop(0)
+        if message["type"] == "http.disconnect":
+            await anyio.sleep(0.01)
+        return message
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/rpc", "headers": []}
+    with anyio.fail_after(5):
+        await asgi_app(scope, receive, send)
+
+    assert cancelled == [True]
+    assert sent == []
+
+@pytest.mark.anyio
+async def test_asgi_stops_streams_on_client_disconnect():
+    import anyio
+
+    produced = []
+    closed = []
+
+    @rpc
+    async def ticks():
+        try:
+            while True:
+                produced.append(len(produced))
+                yield len(produced)
+                await anyio.sleep(0.001)
+        finally:
+            closed.append(True)
+
+    body = b'{"id": 1, "method": "ticks", "stream": true}'
+    messages = [
+        {"type": "http.request", "body": body, "more_body": False},
+        {"type": "http.disconnect"},
+    ]
+
+    async def receive():
+        message = messages.pop(0)
+        if message["type"] == "http.disconnect":
+            await anyio.sleep(0.05)
+        return message
+
+    async def send(message):
+        # Like uvicorn, sending after the client went away does nothing.
+        pass
+
+    scope = {"type": "http", "method": "POST", "path": "/rpc", "headers": []}
+    with anyio.fail_after(5):
+        await asgi_app(scope, receive, send)
+
+    assert closed == [True]
+    count = len(produced)
+    await anyio.sleep(0.05)
+    assert len(produced) == count
+
+@pytest.mark.anyio
+async def test_asgi_server_timing():
+    from prpc import PRPCAsgiApp
+
+    @rpc
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    app = PRPCAsgiApp(server_timing=True)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/rpc", json={"id": 1, "method": "add", "params": [1, 2]})
+
+    assert response.json()["result"] == 3
+    phases = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert phases == ["read", "decode", "validate", "call", "serialize", "encode"]
+
+@pytest.mark.anyio
+async def test_asgi_server_timing_disabled_by_default():
+    @rpc
+    def ping() -> str:
+        return "pong"
+
+    async with AsyncClient(transport=ASGITransport(app=asgi_app), base_url="http://test") as client:
+        response = await client.post("/rpc", json={"id": 1, "method": "ping"})
+    assert "server-timing" not in response.headers
+
+@pytest.mark.anyio
+async def test_asgi_profile_sampling():
+    import cProfile
+    from prpc import PRPCAsgiApp
+
+    @rpc
+    def ping() -> str:
+        return "pong"
+
+    profiles = []
+    app = PRPCAsgiApp(profile_every=2, profile_sink=lambda payload, profile: profiles.append((payload, profile)))
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        for i in range(4):
+            response = await client.post("/rpc", json={"id": i, "method": "ping"})
+            assert response.json()["result"] == "pong"
+
+    assert [payload["id"] for payload, _ in profiles] == [0, 2]
+    assert all(isinstance(profile, cProfile.Profile) for _, profile in profiles)
+
+def test_asgi_profile_requires_sink():
+    from prpc import PRPCAsgiApp
+
+    with pytest.raises(ValueError):
+        PRPCAsgiApp(profile_every=10)
+
+@pytest.mark.anyio
+async def test_asgi_msgpack_negotiation():
+    msgpack = pytest.importorskip("msgpack")
+
+    @rpc
+    def scale(values: list, factor: float) -> list:
+        return [v * factor for v in values]
+
+    request = {"id": 1, "method": "scale", "params": [[1, 2, 3], 0.5]}
+    async with AsyncClient(transport=ASGITransport(app=asgi_app), base_url="http://test") as client:
+        response = await client.post(
+            "/rpc",
+            content=msgpack.packb(request),
+            headers={"content-type": "application/msgpack"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/msgpack"
+        assert msgpack.unpackb(response.content) == {"id": 1, "result": [0.5, 1.0, 1.5], "error": None}
+
+        # JSON request, MessagePack response.
+        response = await client.post("/rpc", json=request, headers={"accept": "application/msgpack"})
+        assert msgpack.unpackb(response.content)["result"] == [0.5, 1.0, 1.5]
+
+        # MessagePack request, JSON response.
+        response = await client.post(
+            "/rpc",
+            content=msgpack.packb(request),
+            headers={"content-type": "application/x-msgpack", "accept": "application/json"},
+        )
+        assert response.headers["content-type"] == "application/json"
+        assert response.json()["result"] == [0.5, 1.0, 1.5]
+
+        response = await client.post(
+            "/rpc", content=b"\xc1", headers={"content-type": "application/msgpack"}
+        )
+        assert response.status_code == 400
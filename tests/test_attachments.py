@@ -0,0 +1,102 @@
+import base64
+import pytest
+import httpx
+from prpc import rpc, asgi_app, default_registry, RPCClient
+from prpc.core.attachments import Attached
+from prpc.core.plan import ProcedurePlan
+from prpc.transport.codec import FramesCodec, JsonCodec, DecodeError
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    default_registry.clear()
+
+def test_frames_roundtrip_without_copy():
+    codec = FramesCodec()
+    blob = bytes(range(256)) * 4
+    frames = codec.encode_frames({"id": 1, "params": [blob, {"raw": memoryview(b"abc")}]})
+
+    # Header, envelope, then the attachments as views of the original buffers.
+    assert len(frames) == 4
+    assert frames[2].obj is blob
+
+    data = codec.decode(b"".join(frames))
+    assert data["id"] == 1
+    first, nested = data["params"]
+    assert isinstance(first, memoryview) and first.readonly
+    assert first == blob
+    assert nested["raw"] == b"abc"
+
+def test_frames_without_attachments():
+    codec = FramesCodec()
+    assert codec.decode(codec.encode({"id": 1, "result": [1, 2]})) == {"id": 1, "result": [1, 2]}
+
+@pytest.mark.parametrize("body", [b"", b"\x00\x00\x00\x01", b"\x00\x00\x00\x01" + b"\x00" * 7 + b"\x05{}"])
+def test_frames_decode_error(body):
+    with pytest.raises(DecodeError):
+        FramesCodec().decode(body)
+
+def test_binary_plan_keeps_buffers_out_of_band():
+    def blob() -> dict:
+        return {"name": "x", "data": b"\xff\x00"}
+
+    attached = ProcedurePlan("blob", blob, binary=True).serialize(blob())
+    assert isinstance(attached, Attached)
+    assert attached.data == {"name": "x", "data": {"$attachment": 0}}
+    assert attached.buffers == [b"\xff\x00"]
+
+    # Results without buffers, and plans without binary, are unchanged.
+    assert ProcedurePlan("blob", blob, binary=True).serialize({"n": 1}) == {"n": 1}
+    assert ProcedurePlan("blob", blob).serialize({"data": b"ok"}) == {"data": "ok"}
+
+    # Codecs that cannot carry attachments inline them.
+    encoded = JsonCodec().decode(JsonCodec().encode({"result": attached}))
+    assert encoded["result"]["data"] == base64.b64encode(b"\xff\x00").decode()
+
+@pytest.mark.anyio
+async def test_client_receives_binary_attachments():
+    @rpc(binary=True)
+    def chunks(count: int) -> list:
+        return [bytes([i]) * 1024 for i in range(count)]
+
+    @rpc
+    def total(data: bytes) -> int:
+        return sum(data)
+
+    async with RPCClient("http://test", codec=FramesCodec()) as client:
+        client._async_client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=asgi_app), base_url="http://test"
+        )
+        result = await client.chunks.aio(3)
+        assert [bytes(chunk) for chunk in result] == [bytes([i]) * 1024 for i in range(3)]
+        assert all(isinstance(chunk, memoryview) for chunk in result)
+
+        assert await client.total.aio(b"\x01\x02\x03") == 6
+
+    # JSON clients get the same result, base64-encoded.
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://test") as client:
+        response = await client.post("/rpc", json={"id": 1, "method": "chunks", "params": [1]})
+        assert response.json()["result"] == [base64.b64encode(b"\x00" * 1024).decode()]
+
+@pytest.mark.anyio
+async def test_numpy_arrays_as_attachments():
+    np = pytest.importorskip("numpy")
+
+    @rpc(binary=True)
+    def features(rows: int) -> dict:
+        return {"ids": list(range(rows)), "values": np.ones((rows, 4), dtype=np.float32)}
+
+    @rpc
+    def norm(values) -> float:
+        return float(np.abs(values).sum())
+
+    async with RPCClient("http://test", codec=FramesCodec()) as client:
+        client._async_client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=asgi_app), base_url="http://test"
+        )
+        result = await client.features.aio(3)
+        assert result["ids"] == [0, 1, 2]
+        assert result["values"].dtype == np.float32
+        assert result["values"].shape == (3, 4)
+
+        # Non-contiguous arrays are sent too.
+        assert await client.norm.aio(np.arange(12.0).reshape(3, 4)[:, 1]) == 15.0
@@ -0,0 +1,177 @@
+import threading
+import time
+import anyio
+import pytest
+from prpc import handle_request, rpc, default_registry
+from prpc.core.cache import ResultCache, make_cache_key
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    default_registry.clear()
+
+def test_cache_lru_eviction():
+    cache = ResultCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == (True, 1)
+
+    cache.set("c", 3)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+    assert cache.stats() == {"hits": 3, "misses": 1, "size": 2}
+
+def test_cache_ttl(monkeypatch):
+    import prpc.core.cache as cache_module
+
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+
+    cache = ResultCache(ttl=10)
+    cache.set("a", 1)
+    now[0] += 5
+    assert cache.get("a") == (True, 1)
+    now[0] += 6
+    assert cache.get("a") == (False, None)
+
+def test_make_cache_key_canonical():
+    assert make_cache_key((), {"a": 1, "b": {"x": 1, "y": 2}}) == make_cache_key((), {"b": {"y": 2, "x": 1}, "a": 1})
+    assert make_cache_key((), {"a": 1}) != make_cache_key((), {"a": 2})
+    assert make_cache_key((), {"a": object()}) is None
+
+@pytest.mark.anyio
+async def test_cache_single_flight():
+    cache = ResultCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await anyio.sleep(0.02)
+        return "value"
+
+    results = []
+
+    async def get():
+        results.append(await cache.get_or_compute("key", compute))
+
+    async with anyio.create_task_group() as tg:
+        for _ in range(5):
+            tg.start_soon(get)
+
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert cache.stats() == {"hits": 4, "misses": 1, "size": 1}
+
+def test_cache_single_flight_sync():
+    cache = ResultCache()
+    calls = 0
+    started = threading.Event()
+
+    def compute():
+        nonlocal calls
+        calls += 1
+        started.set()
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get_or_compute_sync("key", compute)))
+    first.start()
+    started.wait()
+    others = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute_sync("key", compute)))
+        for _ in range(4)
+    ]
+    for thread in others:
+        thread.start()
+    for thread in [first, *others]:
+        thread.join()
+
+    assert results == ["value"] * 5
+    assert calls == 1
+
+@pytest.mark.anyio
+async def test_cache_waiter_takes_over_cancelled_flight():
+    calls = []
+
+    @rpc(cache_ttl=30)
+    async def slow(x: int) -> int:
+        calls.append(x)
+        await anyio.sleep(0.2)
+        return x * 2
+
+    responses = {}
+
+    async def call(name, payload):
+        responses[name] = await handle_request(payload)
+
+    async with anyio.create_task_group() as tg:
+        # The first caller computes the result, but its deadline cuts it short.
+        tg.start_soon(call, "a", {"id": "a", "method": "slow", "params": [2], "timeout": 0.05})
+        await anyio.sleep(0.01)
+        tg.start_soon(call, "b", {"id": "b", "method": "slow", "params": [2]})
+
+    assert responses["a"]["error"]["code"] == 504
+    assert responses["b"]["result"] == 4
+    assert calls == [2, 2]
+    assert default_registry.cache_stats("slow") == {"hits": 0, "misses": 2, "size": 1}
+
+@pytest.mark.anyio
+async def test_cache_does_not_store_errors():
+    cache = ResultCache()
+
+    async def fail():
+        raise ValueError("Boom")
+
+    with pytest.raises(ValueError):
+        await cache.get_or_compute("key", fail)
+    assert cache.stats()["size"] == 0
+
+@pytest.mark.anyio
+async def test_cached_procedure():
+    calls = []
+
+    @rpc(cache_ttl=30, cache_size=10)
+    def lookup(a: int, b: int = 0) -> int:
+        calls.append((a, b))
+        return a + b
+
+    first = await handle_request({"id": 1, "method": "lookup", "params": [1, 2]})
+    second = await handle_request({"id": 2, "method": "lookup", "params": {"a": "1", "b": 2}})
+
+    assert first["result"] == second["result"] == 3
+    assert second["id"] == 2
+    assert calls == [(1, 2)]
+    assert default_registry.cache_stats("lookup") == {"hits": 1, "misses": 1, "size": 1}
+
+    default_registry.invalidate("lookup", {"a": 1, "b": 2})
+    await handle_request({"id": 3, "method": "lookup", "params": [1, 2]})
+    assert len(calls) == 2
+
+    default_registry.invalidate("lookup")
+    assert default_registry.cache_stats("lookup")["size"] == 0
+    assert default_registry.cache_stats("missing") is None
+
+def test_cached_procedure_sync_path():
+    from prpc import handle_request_sync
+
+    calls = []
+
+    @rpc(cache_size=10)
+    def lookup(a: int) -> int:
+        calls.append(a)
+        return a
+
+    handle_request_sync({"id": 1, "method": "lookup", "params": [1]})
+    response = handle_request_sync({"id": 2, "method": "lookup", "params": [1]})
+
+    assert response["result"] == 1
+    assert calls == [1]
+
+def test_streaming_procedure_cannot_be_cached():
+    with pytest.raises(ValueError):
+        @rpc(cache_ttl=10)
+        def numbers():
+            yield 1
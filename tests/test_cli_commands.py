@@ -1,3 +1,5 @@
+import os
+import sys
 import pytest
 from typer.testing import CliRunner
 from prpc_codegen.main import app
@@ -8,7 +10,7 @@ runner = CliRunner()
 
 @pytest.fixture(autouse=True)
 def clear_registry():
-    default_registry._procedures.clear()
+    default_registry.clear()
 
 def test_cli_version():
     result = runner.invoke(app, ["version"])
@@ -55,3 +57,154 @@ def test_cli_serve():
             # Check port was passed
             args, kwargs = mock_run.call_args
             assert kwargs["port"] == 9000
+
+def test_cli_serve_workers(monkeypatch):
+    from prpc_codegen.serve import SERVE_MODULE_ENV
+
+    # Set so that monkeypatch restores it after the command changes it.
+    monkeypatch.setenv(SERVE_MODULE_ENV, "")
+    with mock.patch("prpc_codegen.main._import_module"):
+        with mock.patch("uvicorn.run") as mock_run:
+            result = runner.invoke(
+                app,
+                ["serve", "my_module", "--workers", "4", "--backlog", "512", "--timeout-graceful-shutdown", "10"],
+            )
+            assert result.exit_code == 0
+            args, kwargs = mock_run.call_args
+            # Workers load the module through the app factory.
+            assert args == ("prpc_codegen.serve:create_app",)
+            assert kwargs["factory"] is True
+            assert kwargs["workers"] == 4
+            assert kwargs["backlog"] == 512
+            assert kwargs["timeout_graceful_shutdown"] == 10
+            assert os.environ[SERVE_MODULE_ENV] == "my_module"
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        ["--reload", "--workers", "2"],
+        ["--loop", "trio"],
+        ["--cpu-affinity", "3-1"],
+    ],
+)
+def test_cli_serve_invalid_options(options):
+    with mock.patch("prpc_codegen.main._import_module"):
+        with mock.patch("uvicorn.run") as mock_run:
+            result = runner.invoke(app, ["serve", "my_module", *options])
+            assert result.exit_code == 1
+            mock_run.assert_not_called()
+
+def test_serve_app_factory_registers_module(tmp_path, monkeypatch):
+    from prpc import asgi_app
+    from prpc_codegen.serve import create_app, parse_cpus
+
+    assert parse_cpus("0-2, 5") == {0, 1, 2, 5}
+    with pytest.raises(ValueError):
+        parse_cpus("a")
+
+    (tmp_path / "served_procs.py").write_text("from prpc import rpc\n\n@rpc\ndef hello(): return 'hi'\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "served_procs", raising=False)
+    monkeypatch.setenv("PRPC_SERVE_MODULE", "served_procs")
+    monkeypatch.delenv("PRPC_CPU_AFFINITY", raising=False)
+    try:
+        assert create_app() is asgi_app
+        assert default_registry.list() == ["hello"]
+    finally:
+        sys.modules.pop("served_procs", None)
+
+def test_cli_inspect_live_stats():
+    import httpx
+
+    @rpc
+    def test_proc(x: int):
+        return x
+
+    metrics_text = (
+        'prpc_calls_total{method="test_proc"} 4\n'
+        'prpc_errors_total{method="test_proc",code="500"} 1\n'
+        'prpc_in_flight{method="test_proc"} 2\n'
+        'prpc_call_duration_seconds_bucket{method="test_proc",le="0.005"} 3\n'
+        'prpc_call_duration_seconds_bucket{method="test_proc",le="0.01"} 4\n'
+        'prpc_call_duration_seconds_bucket{method="test_proc",le="+Inf"} 4\n'
+        'prpc_call_duration_seconds_sum{method="test_proc"} 0.02\n'
+    )
+    response = httpx.Response(200, text=metrics_text, request=httpx.Request("GET", "http://srv/metrics"))
+
+    with mock.patch("prpc_codegen.main._import_module"):
+        with mock.patch("httpx.get", return_value=response) as mock_get:
+            result = runner.invoke(app, ["inspect", "anything", "--stats", "http://srv"])
+
+    assert result.exit_code == 0
+    mock_get.assert_called_once_with("http://srv/metrics")
+    # The table is narrow in the test runner, so the name may be truncated.
+    row = next(line for line in result.output.splitlines() if "test_" in line)
+    cells = [cell.strip() for cell in row.split("│")]
+    assert cells[-6:-1] == ["4", "1", "2", "5.0", "10.0"]
+
+def test_cli_bench_json():
+    import json
+
+    @rpc
+    def ping() -> str:
+        return "pong"
+
+    @rpc
+    def echo(text: str) -> str:
+        return text
+
+    with mock.patch("prpc_codegen.main._import_module"):
+        result = runner.invoke(app, [
+            "bench", "anything", "-t", "asgi,flask", "-n", "20", "--warmup", "2", "-c", "4",
+            "--call", "ping:2", "--call", "echo", "--params", 'echo={"text": "$PAYLOAD"}',
+            "--payload-size", "8", "--json", "-",
+        ])
+
+    assert result.exit_code == 0, result.output
+    results = json.loads(result.output)
+    assert [r["target"] for r in results] == ["asgi", "flask"]
+    for r in results:
+        assert r["requests"] == 20
+        assert r["errors"] == 0
+        assert r["payload_size"] == 8
+        assert r["rps"] > 0
+        assert r["p50_ms"] <= r["p95_ms"] <= r["p99_ms"]
+
+def test_cli_bench_unknown_target():
+    with mock.patch("prpc_codegen.main._import_module"):
+        result = runner.invoke(app, ["bench", "anything", "-t", "grpc"])
+    assert result.exit_code == 1
+    assert "Unknown target" in result.output
+
+def test_bench_request_mix():
+    from prpc_codegen.bench import BenchCall, build_requests, percentile
+
+    bodies = build_requests(
+        [BenchCall(method="a", weight=3), BenchCall(method="b", params={"s": "<$PAYLOAD>"})],
+        100,
+        payload_size=3,
+    )
+    assert [b["id"] for b in bodies] == list(range(100))
+    assert {b["method"] for b in bodies} == {"a", "b"}
+    assert next(b for b in bodies if b["method"] == "b")["params"] == {"s": "<xxx>"}
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.99) == 4.0
+
+def test_bench_counts_errors_in_streamed_responses():
+    import httpx
+    from prpc_codegen.bench import _is_error
+
+    ok = b'{"id": 1, "result": 0, "error": null}'
+    failed = b'{"id": 1, "result": null, "error": {"code": 500, "message": "Boom"}}'
+
+    def response(content_type, body):
+        return httpx.Response(200, content=body, headers={"content-type": content_type})
+
+    assert not _is_error(response("application/json", ok))
+    assert _is_error(response("application/json", b"[" + ok + b"," + failed + b"]"))
+    assert not _is_error(response("application/x-ndjson", ok + b"\n" + ok + b"\n"))
+    assert _is_error(response("application/x-ndjson", ok + b"\n" + failed + b"\n"))
+    sse = "text/event-stream; charset=utf-8"
+    assert not _is_error(response(sse, b"data: " + ok + b"\n\n"))
+    assert _is_error(response(sse, b"data: " + ok + b"\n\ndata: " + failed + b"\n\n"))
+    assert _is_error(httpx.Response(503, json={"id": 1}))
@@ -3,7 +3,7 @@ from prpc import rpc, asgi_app, default_registry, RPCClient
 
 @pytest.fixture(autouse=True)
 def clear_registry():
-    default_registry._procedures.clear()
+    default_registry.clear()
 
 @pytest.mark.anyio
 async def test_client_async_success():
@@ -79,3 +79,287 @@ async def test_client_error():
         assert "RPC Error Test" in exc.value.message
 
 
+@pytest.mark.anyio
+async def test_client_astream():
+    @rpc
+    def count(n: int):
+        yield from range(n)
+
+    @rpc
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    async with RPCClient("http://test") as client:
+        import httpx
+        client._async_client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=asgi_app),
+            base_url="http://test"
+        )
+
+        assert [item async for item in client.count.astream(3)] == [0, 1, 2]
+        assert [item async for item in client.astream("add", 1, 2)] == [3]
+
+def test_client_stream_sync():
+    import httpx
+    from prpc import RPCError
+
+    def handler(request):
+        body = (
+            b'{"id": "1", "result": 1, "error": null}\n'
+            b'{"id": "1", "result": 2, "error": null}\n'
+            b'{"id": "1", "result": null, "error": {"code": 500, "message": "Boom"}}\n'
+        )
+        return httpx.Response(200, content=body, headers={"content-type": "application/x-ndjson"})
+
+    with RPCClient("http://test") as client:
+        client._sync_client = httpx.Client(transport=httpx.MockTransport(handler), base_url="http://test")
+
+        items = []
+        with pytest.raises(RPCError) as exc:
+            for item in client.count.stream(3):
+                items.append(item)
+
+        assert items == [1, 2]
+        assert exc.value.message == "Boom"
+
+def test_client_overloaded_raises_rpc_error():
+    import httpx
+    from prpc import RPCError
+
+    def handler(request):
+        body = b'{"id": "1", "result": null, "error": {"code": 503, "message": "Server busy"}}'
+        return httpx.Response(503, content=body, headers={"retry-after": "1"})
+
+    with RPCClient("http://test") as client:
+        client._sync_client = httpx.Client(transport=httpx.MockTransport(handler), base_url="http://test")
+
+        with pytest.raises(RPCError) as exc:
+            client.slow()
+        assert exc.value.code == 503
+
+        with pytest.raises(RPCError) as exc:
+            list(client.slow.stream())
+        assert exc.value.code == 503
+
+def test_client_sends_call_timeout():
+    import json
+    import httpx
+
+    sent = []
+
+    read_timeouts = []
+
+    def handler(request):
+        sent.append(json.loads(request.content))
+        read_timeouts.append(request.extensions["timeout"]["read"])
+        return httpx.Response(200, json={"id": "1", "result": "ok", "error": None})
+
+    with RPCClient("http://test", call_timeout=3.0) as client:
+        client._sync_client = httpx.Client(transport=httpx.MockTransport(handler), base_url="http://test")
+
+        assert client.ping() == "ok"
+        assert client.ping.with_timeout(0.5)() == "ok"
+        assert client.ping.with_timeout(30)() == "ok"
+
+    assert [payload["timeout"] for payload in sent] == [3.0, 0.5, 30]
+    # The HTTP request outlasts long deadlines; short ones keep the client's timeout.
+    assert read_timeouts == [5.0, 5.0, 31.0]
+
+def test_client_surfaces_server_timing():
+    import httpx
+    from prpc.client.python_client import parse_server_timing
+
+    assert parse_server_timing("read;dur=0.5, call;desc=\"x\";dur=1.25, miss") == {
+        "read": 0.5,
+        "call": 1.25,
+    }
+
+    def handler(request):
+        return httpx.Response(
+            200,
+            json={"id": "1", "result": "ok", "error": None},
+            headers={"server-timing": "validate;dur=0.010, call;dur=2.000"},
+        )
+
+    with RPCClient("http://test") as client:
+        client._sync_client = httpx.Client(transport=httpx.MockTransport(handler), base_url="http://test")
+        assert client.last_server_timing is None
+        assert client.ping() == "ok"
+        assert client.last_server_timing == {"validate": 0.01, "call": 2.0}
+
+def _counting_app(requests):
+    async def app(scope, receive, send):
+        if scope["type"] == "http":
+            requests.append(scope["path"])
+        await asgi_app(scope, receive, send)
+    return app
+
+@pytest.mark.anyio
+async def test_client_batching_coalesces_calls():
+    import anyio
+    import httpx
+
+    @rpc
+    def square(n: int) -> int:
+        return n * n
+
+    @rpc
+    def fail():
+        raise ValueError("Boom")
+
+    requests = []
+    async with RPCClient("http://test", batch=True, batch_window=0.05, max_batch_size=4) as client:
+        client._async_client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=_counting_app(requests)),
+            base_url="http://test"
+        )
+
+        results = {}
+        errors = []
+
+        async def call(n):
+            results[n] = await client.square.aio(n)
+
+        async def call_fail():
+            from prpc import RPCError
+            try:
+                await client.fail.aio()
+            except RPCError as e:
+                errors.append(e.code)
+
+        async with anyio.create_task_group() as tg:
+            for n in range(7):
+                tg.start_soon(call, n)
+            tg.start_soon(call_fail)
+
+        assert results == {n: n * n for n in range(7)}
+        assert errors == [500]
+        assert len(requests) == 2
+
+        # A lone call is sent as a plain request
+        assert await client.square.aio(3) == 9
+        assert len(requests) == 3
+
+@pytest.mark.anyio
+async def test_client_batching_transport_error():
+    import httpx
+
+    def handler(request):
+        return httpx.Response(500, request=request)
+
+    async with RPCClient("http://test", batch=True) as client:
+        client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test")
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.call_async("anything")
+
+@pytest.mark.anyio
+async def test_client_batching_overloaded_raises_rpc_error():
+    import httpx
+    from prpc import RPCError
+
+    def handler(request):
+        body = b'{"id": "1", "result": null, "error": {"code": 503, "message": "Server busy"}}'
+        return httpx.Response(503, content=body, headers={"retry-after": "1"})
+
+    async with RPCClient("http://test", batch=True) as client:
+        client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test")
+
+        with pytest.raises(RPCError) as exc:
+            await client.call_async("slow")
+        assert exc.value.code == 503
+        assert exc.value.message == "Server busy"
+
+def test_client_batching_and_websocket_exclusive():
+    with pytest.raises(ValueError):
+        RPCClient("http://test", websocket=True, batch=True)
+
+def test_client_creates_http_clients_lazily():
+    client = RPCClient("http://test", timeout=2.0, max_connections=7, keepalive_expiry=1.5)
+    assert client._sync_http is None
+    assert client._async_http is None
+
+    sync_client = client._sync_client
+    assert client._sync_client is sync_client
+    assert client._async_http is None
+    assert sync_client.timeout.read == 2.0
+    pool = sync_client._transport._pool
+    assert pool._max_connections == 7
+    assert pool._keepalive_expiry == 1.5
+
+    client.close()
+    assert sync_client.is_closed
+
+def test_client_shared_pool():
+    first = RPCClient("http://test/api", share_pool=True)
+    second = RPCClient("http://test/other", share_pool=True)
+    separate = RPCClient("http://test/api", share_pool=True, timeout=1.0)
+
+    shared = first._sync_client
+    assert second._sync_client is shared
+    assert separate._sync_client is not shared
+
+    first.close()
+    assert not shared.is_closed
+    second.close()
+    assert shared.is_closed
+    separate.close()
+
+@pytest.mark.anyio
+async def test_client_msgpack_codec():
+    pytest.importorskip("msgpack")
+    import httpx
+    from prpc.transport.codec import MsgpackCodec
+
+    @rpc
+    def echo(data: dict) -> dict:
+        return data
+
+    async with RPCClient("http://test", codec=MsgpackCodec()) as client:
+        sent = []
+
+        async def record(request):
+            sent.append(request.headers["content-type"])
+
+        client._async_client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=asgi_app),
+            base_url="http://test",
+            event_hooks={"request": [record]},
+        )
+        value = {"ints": [1, 2, 3], "nested": {"ok": True}}
+        assert await client.echo.aio(value) == value
+        assert sent == ["application/msgpack"]
+
+@pytest.mark.anyio
+async def test_batcher_leader_cancellation_interrupts_send():
+    import anyio
+    from prpc.client.batching import CallBatcher
+
+    sent = []
+    hang = anyio.Event()
+
+    async def send_batch(payloads):
+        sent.append([p["id"] for p in payloads])
+        if len(sent) == 1:
+            await hang.wait()
+        return [{"id": p["id"], "result": p["id"], "error": None} for p in payloads]
+
+    batcher = CallBatcher(send_batch, window=0.01)
+    results = []
+
+    async def leader():
+        with anyio.move_on_after(0.1) as scope:
+            await batcher.call({"id": 1})
+        results.append(("leader", scope.cancelled_caught))
+
+    async def follower():
+        results.append(("follower", (await batcher.call({"id": 2}))["result"]))
+
+    with anyio.fail_after(2):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(leader)
+            await anyio.sleep(0)
+            tg.start_soon(follower)
+
+    assert sent == [[1, 2], [2]]
+    assert sorted(results) == [("follower", 2), ("leader", True)]
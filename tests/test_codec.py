@@ -0,0 +1,101 @@
+import pytest
+from prpc.transport.codec import (
+    FRAMES_CONTENT_TYPE,
+    DecodeError,
+    JsonCodec,
+    MsgspecJsonCodec,
+    OrjsonCodec,
+    MSGPACK_CONTENT_TYPE,
+    MsgpackCodec,
+    get_codecs,
+    get_default_codec,
+    msgpack_available,
+    select_request_codec,
+    select_response_codec,
+)
+
+def _available_codecs():
+    codecs = [JsonCodec()]
+    for cls in (OrjsonCodec, MsgspecJsonCodec, MsgpackCodec):
+        try:
+            codecs.append(cls())
+        except RuntimeError:
+            pass
+    return codecs
+
+@pytest.mark.parametrize("codec", _available_codecs(), ids=lambda c: c.name)
+def test_codec_roundtrip(codec):
+    data = {"id": 1, "result": [1, "two", {"three": 3.0}], "error": None}
+    encoded = codec.encode(data)
+
+    assert isinstance(encoded, bytes)
+    assert codec.decode(encoded) == data
+    assert codec.decode(memoryview(encoded)) == data
+
+@pytest.mark.parametrize("codec", _available_codecs(), ids=lambda c: c.name)
+def test_codec_decode_error(codec):
+    with pytest.raises(DecodeError):
+        codec.decode(b"invalid-json")
+
+@pytest.mark.parametrize(
+    "codec",
+    [c for c in _available_codecs() if c.content_type == "application/json"],
+    ids=lambda c: c.name,
+)
+def test_codec_encode_big_int(codec):
+    assert str(2**70 + 1).encode() in codec.encode({"n": 2**70 + 1})
+
+def test_default_codec_prefers_fast_implementation():
+    codec = get_default_codec()
+    assert codec is get_default_codec()
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        return
+    assert codec.name == "orjson"
+
+def test_codec_negotiation():
+    json_codec = JsonCodec()
+    codecs = get_codecs(json_codec)
+
+    assert select_request_codec(None, codecs, json_codec) is json_codec
+    assert select_request_codec("text/plain", codecs, json_codec) is json_codec
+    assert select_request_codec("application/json; charset=utf-8", codecs, json_codec) is json_codec
+    assert select_response_codec("*/*", codecs, json_codec) is json_codec
+    assert select_response_codec(None, codecs, json_codec) is json_codec
+
+    if not msgpack_available():
+        assert MSGPACK_CONTENT_TYPE not in codecs
+        return
+    binary = codecs[MSGPACK_CONTENT_TYPE]
+    assert select_request_codec("application/x-msgpack", codecs, json_codec) is binary
+    assert select_response_codec("text/html, application/msgpack", codecs, json_codec) is binary
+    # Without an Accept match, responses use the format of the request.
+    assert select_response_codec("*/*", codecs, binary) is binary
+    assert select_response_codec("application/json", codecs, binary) is json_codec
+
+def test_response_codec_quality_values():
+    json_codec = JsonCodec()
+    codecs = get_codecs(json_codec)
+    frames = codecs[FRAMES_CONTENT_TYPE]
+
+    # The highest quality wins, whatever the order.
+    accept = f"application/json;q=0.5, {FRAMES_CONTENT_TYPE}"
+    assert select_response_codec(accept, codecs, json_codec) is frames
+    accept = f"{FRAMES_CONTENT_TYPE};q=0.2, application/json;q=0.8"
+    assert select_response_codec(accept, codecs, frames) is json_codec
+    # q=0 means not acceptable.
+    accept = f"{FRAMES_CONTENT_TYPE};q=0, application/json;q=0.1"
+    assert select_response_codec(accept, codecs, frames) is json_codec
+    # A wildcard stands for the request's codec, unless it is excluded.
+    assert select_response_codec("text/html, */*;q=0.8", codecs, frames) is frames
+    accept = f"{FRAMES_CONTENT_TYPE};q=0, */*"
+    assert select_response_codec(accept, codecs, frames) is json_codec
+    # Without an acceptable type, the request's codec is used.
+    assert select_response_codec("application/json;q=0", codecs, frames) is frames
+
+def test_msgpack_is_smaller_for_records():
+    pytest.importorskip("msgpack")
+    records = [{"id": i, "active": True, "scores": [i, -i], "tag": None} for i in range(100)]
+    data = {"id": 1, "result": records, "error": None}
+    assert len(MsgpackCodec().encode(data)) < len(JsonCodec().encode(data))
@@ -1,10 +1,14 @@
+import importlib
+import os
+import sys
 import pytest
 from prpc import rpc, default_registry
-from prpc_codegen import generate_typescript_client
+from prpc_codegen import TypeScriptGenerator, generate_typescript_client, save_typescript_client
+from prpc_codegen.watch import ModuleWatcher
 
 @pytest.fixture(autouse=True)
 def clear_registry():
-    default_registry._procedures.clear()
+    default_registry.clear()
 
 def test_generate_typescript_client():
     @rpc
@@ -25,3 +29,78 @@ def test_generate_typescript_client_empty():
     assert "class PRPCClient" in content
     # Should not have any methods other than constructor and execute
     assert "async " not in content.split("private async execute")[1]
+
+def test_generator_renders_changed_procedures_only():
+    @rpc
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    @rpc
+    def neg(a: int) -> int:
+        return -a
+
+    generator = TypeScriptGenerator()
+    generator.generate(default_registry)
+    neg_code = generator._methods["neg"][1]
+
+    @rpc(name="add")
+    def add_three(a: int, b: int, c: int) -> int:
+        return a + b + c
+
+    content = generator.generate(default_registry)
+    assert "async add(a: any, b: any, c: any)" in content
+    assert generator._methods["neg"][1] is neg_code
+
+    default_registry.unregister("neg")
+    assert "async neg(" not in generator.generate(default_registry)
+    assert list(generator._methods) == ["add"]
+
+def test_save_skips_unchanged_content(tmp_path):
+    @rpc
+    def ping() -> str:
+        return "pong"
+
+    output = tmp_path / "gen" / "client.ts"
+    assert save_typescript_client(default_registry, str(output)) is True
+    os.utime(output, (0, 0))
+    assert save_typescript_client(default_registry, str(output)) is False
+    assert output.stat().st_mtime == 0
+
+    @rpc
+    def pong() -> str:
+        return "ping"
+
+    assert save_typescript_client(default_registry, str(output)) is True
+    assert "async pong(" in output.read_text()
+
+def test_module_watcher_reloads_changed_modules(tmp_path, monkeypatch):
+    source = tmp_path / "watched_procs.py"
+    source.write_text("from prpc import rpc\n\n@rpc\ndef old(): return 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "watched_procs", raising=False)
+    importlib.import_module("watched_procs")
+    try:
+        watcher = ModuleWatcher(str(tmp_path), default_registry)
+        assert watcher.changed() == []
+
+        source.write_text("from prpc import rpc\n\n@rpc\ndef new(x: int): return x\n")
+        os.utime(source, (1, 1))
+        assert watcher.changed() == ["watched_procs"]
+
+        watcher.reload(watcher.changed())
+        assert default_registry.list() == ["new"]
+        assert watcher.changed() == []
+    finally:
+        sys.modules.pop("watched_procs", None)
+
+def test_module_watcher_skips_framework_packages():
+    import prpc
+
+    # Watching the checkout that contains pRPC's own sources.
+    root = os.path.dirname(os.path.dirname(os.path.dirname(prpc.__file__)))
+    watcher = ModuleWatcher(root, default_registry)
+
+    assert not [
+        name for name in watcher._files()
+        if name.split(".")[0] in ("prpc", "prpc_codegen", "prpc_fastapi", "prpc_flask")
+    ]
@@ -0,0 +1,151 @@
+import gzip
+import pytest
+import httpx
+from prpc import rpc, default_registry, PRPCAsgiApp, RPCClient
+from prpc.transport.compression import (
+    DecompressionError,
+    StreamCompressor,
+    available_encodings,
+    compress,
+    decompress,
+    select_encoding,
+)
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    default_registry.clear()
+
+@pytest.mark.parametrize("encoding", available_encodings())
+def test_compress_roundtrip(encoding):
+    data = b"pRPC " * 1000
+    compressed = compress(data, encoding, level=5)
+    assert len(compressed) < len(data)
+    assert decompress(compressed, encoding) == data
+
+    # Oversized bodies stop inflating shortly after the limit.
+    assert len(decompress(compressed, encoding, max_size=100)) > 100
+    bomb = compress(bytes(10_000_000), encoding)
+    assert 1000 < len(decompress(bomb, encoding, max_size=1000)) < 1_000_000
+
+    stream = StreamCompressor(encoding)
+    chunks = [stream.compress(b"item %d\n" % i) for i in range(3)] + [stream.finish()]
+    assert decompress(b"".join(chunks), encoding) == b"item 0\nitem 1\nitem 2\n"
+
+def test_decompress_errors():
+    with pytest.raises(DecompressionError):
+        decompress(b"not gzip", "gzip")
+    with pytest.raises(DecompressionError):
+        decompress(compress(b"x" * 100, "gzip")[:-10], "gzip")
+
+def test_select_encoding():
+    assert select_encoding("gzip, br", ["zstd", "br", "gzip"]) == "br"
+    assert select_encoding("gzip;q=1.0, br;q=0", ["br", "gzip"]) == "gzip"
+    assert select_encoding("*", ["gzip"]) == "gzip"
+    assert select_encoding("identity", ["gzip"]) is None
+    assert select_encoding(None, ["gzip"]) is None
+
+def test_unknown_compression():
+    with pytest.raises(ValueError):
+        PRPCAsgiApp(compression=["lz4"])
+    with pytest.raises(ValueError):
+        RPCClient("http://test", compression="lz4")
+
+@pytest.mark.anyio
+async def test_asgi_compresses_large_responses():
+    @rpc
+    def text(size: int) -> str:
+        return "a" * size
+
+    @rpc
+    def count(n: int):
+        for _ in range(n):
+            yield "b" * 100
+
+    app = PRPCAsgiApp(compression=["gzip"], compression_min_size=500)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        headers = {"accept-encoding": "gzip"}
+        response = await client.post("/rpc", json={"id": 1, "method": "text", "params": [2000]}, headers=headers)
+        assert response.headers["content-encoding"] == "gzip"
+        assert int(response.headers["content-length"]) < 500
+        assert response.json()["result"] == "a" * 2000
+
+        response = await client.post("/rpc", json={"id": 2, "method": "text", "params": [10]}, headers=headers)
+        assert "content-encoding" not in response.headers
+
+        response = await client.post(
+            "/rpc", json={"id": 3, "method": "text", "params": [2000]}, headers={"accept-encoding": "identity"}
+        )
+        assert "content-encoding" not in response.headers
+
+        response = await client.post(
+            "/rpc",
+            json={"id": 4, "method": "count", "params": [3], "stream": True},
+            headers={**headers, "accept": "application/x-ndjson"},
+        )
+        assert response.headers["content-encoding"] == "gzip"
+        lines = [line for line in response.text.splitlines() if line]
+        assert len(lines) == 3
+
+@pytest.mark.anyio
+async def test_asgi_does_not_compress_frames_responses():
+    from prpc.transport.codec import FRAMES_CONTENT_TYPE, FramesCodec
+
+    @rpc(binary=True)
+    def blob(size: int) -> bytes:
+        return b"x" * size
+
+    codec = FramesCodec()
+    app = PRPCAsgiApp(compression=["gzip"], compression_min_size=500)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        headers = {"accept-encoding": "gzip", "content-type": FRAMES_CONTENT_TYPE}
+        for size in (10, 5000):
+            body = b"".join(codec.encode_frames({"id": 1, "method": "blob", "params": [size]}))
+            response = await client.post("/rpc", content=body, headers=headers)
+            assert response.headers["content-type"] == FRAMES_CONTENT_TYPE
+            assert "content-encoding" not in response.headers
+            assert bytes(codec.decode(response.content)["result"]) == b"x" * size
+
+@pytest.mark.anyio
+async def test_asgi_decompresses_requests():
+    @rpc
+    def size(text: str) -> int:
+        return len(text)
+
+    app = PRPCAsgiApp(max_body_size=10_000)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        body = b'{"id": 1, "method": "size", "params": ["' + b"x" * 5000 + b'"]}'
+        response = await client.post("/rpc", content=gzip.compress(body), headers={"content-encoding": "gzip"})
+        assert response.json()["result"] == 5000
+
+        response = await client.post("/rpc", content=b"???", headers={"content-encoding": "gzip"})
+        assert response.status_code == 400
+
+        response = await client.post("/rpc", content=body, headers={"content-encoding": "lz4"})
+        assert response.status_code == 415
+
+        # Small once compressed, too large once decompressed.
+        bomb = gzip.compress(b'{"id": 1, "params": ["' + b"x" * 50_000 + b'"]}')
+        response = await client.post("/rpc", content=bomb, headers={"content-encoding": "gzip"})
+        assert response.status_code == 413
+
+@pytest.mark.anyio
+async def test_client_compresses_large_requests():
+    @rpc
+    def size(text: str) -> int:
+        return len(text)
+
+    sent = []
+
+    async def record(request):
+        sent.append(request.headers.get("content-encoding"))
+
+    async with RPCClient("http://test", compression="gzip", compression_min_size=100) as client:
+        client._async_client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=PRPCAsgiApp()),
+            base_url="http://test",
+            event_hooks={"request": [record]},
+        )
+        assert await client.size.aio("x" * 1000) == 1000
+        assert await client.size.aio("x") == 1
+
+    assert sent == ["gzip", None]
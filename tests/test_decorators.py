@@ -2,7 +2,7 @@ from prpc import default_registry, rpc
 
 def test_rpc_decorator_default_name():
     # Clear registry for clean test
-    default_registry._procedures.clear()
+    default_registry.clear()
     
     @rpc
     def hello():
@@ -14,7 +14,7 @@ def test_rpc_decorator_default_name():
 
 def test_rpc_decorator_custom_name():
     # Clear registry for clean test
-    default_registry._procedures.clear()
+    default_registry.clear()
     
     @rpc(name="custom_hello")
     def hello():
@@ -0,0 +1,107 @@
+import threading
+
+import anyio
+import pytest
+from prpc import handle_request, rpc, default_registry
+from prpc.core.executor import ExecutorBusyError, SyncExecutor
+from prpc.transport.asgi import PRPCAsgiApp
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    default_registry.clear()
+
+@pytest.mark.anyio
+async def test_sync_procedure_runs_off_event_loop():
+    @rpc
+    def where() -> str:
+        return threading.current_thread().name
+
+    response = await handle_request({"id": 1, "method": "where"})
+
+    assert response["result"] != threading.current_thread().name
+
+@pytest.mark.anyio
+async def test_inline_procedure_runs_on_event_loop():
+    @rpc(inline=True)
+    def where() -> str:
+        return threading.current_thread().name
+
+    response = await handle_request({"id": 1, "method": "where"})
+
+    assert response["result"] == threading.current_thread().name
+
+@pytest.mark.anyio
+async def test_executor_rejects_when_queue_full():
+    executor = SyncExecutor(max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def occupy():
+        await executor.run(release.wait, 5)
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(occupy)
+        while executor.pending == 0:
+            await anyio.sleep(0.001)
+
+        with pytest.raises(ExecutorBusyError):
+            await executor.run(lambda: None)
+
+        release.set()
+
+    executor.shutdown()
+
+@pytest.mark.anyio
+async def test_executor_keeps_slot_of_cancelled_call_until_it_finishes():
+    executor = SyncExecutor(max_workers=1, max_queue=0)
+    release = threading.Event()
+    finished = threading.Event()
+
+    def block():
+        release.wait(5)
+        finished.set()
+
+    with anyio.move_on_after(0.05):
+        await executor.run(block)
+
+    # The abandoned thread still occupies the only worker.
+    assert executor.pending == 1
+    with pytest.raises(ExecutorBusyError):
+        await executor.run(lambda: None)
+
+    release.set()
+    finished.wait(5)
+    with anyio.fail_after(5):
+        while executor.pending:
+            await anyio.sleep(0.001)
+    assert await executor.run(lambda: "ok") == "ok"
+
+    executor.shutdown()
+
+@pytest.mark.anyio
+async def test_handle_request_reports_busy_executor():
+    @rpc
+    def block(seconds: float) -> None:
+        release.wait(seconds)
+
+    executor = SyncExecutor(max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def occupy():
+        await handle_request({"id": 1, "method": "block", "params": [5]}, executor=executor)
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(occupy)
+        while executor.pending == 0:
+            await anyio.sleep(0.001)
+
+        response = await handle_request({"id": 2, "method": "block", "params": [0]}, executor=executor)
+        release.set()
+
+    assert response["error"]["code"] == 503
+    executor.shutdown()
+
+def test_asgi_app_executor_options():
+    app = PRPCAsgiApp(max_workers=4, max_queue=8)
+
+    assert app.executor.max_workers == 4
+    assert app.executor.max_queue == 8
@@ -1,3 +1,4 @@
+import gzip
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
@@ -6,7 +7,7 @@ from prpc_fastapi import mount_fastapi
 
 @pytest.fixture(autouse=True)
 def clear_registry():
-    default_registry._procedures.clear()
+    default_registry.clear()
 
 def test_fastapi_mount_success():
     @rpc
@@ -40,3 +41,62 @@ def test_fastapi_async_procedure():
     
     assert response.status_code == 200
     assert response.json()["result"] == "Async Hello World"
+
+def test_fastapi_batch():
+    @rpc
+    def greet(name: str) -> str:
+        return f"Hello {name}"
+
+    app = FastAPI()
+    mount_fastapi(app)
+
+    client = TestClient(app)
+    payload = [
+        {"id": "b-1", "method": "greet", "params": {"name": "A"}},
+        {"id": "b-2", "method": "greet", "params": {"name": "B"}},
+    ]
+    response = client.post("/rpc", json=payload)
+
+    assert response.status_code == 200
+    assert [r["result"] for r in response.json()] == ["Hello A", "Hello B"]
+
+def test_fastapi_msgpack():
+    msgpack = pytest.importorskip("msgpack")
+
+    @rpc
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    app = FastAPI()
+    mount_fastapi(app)
+
+    client = TestClient(app)
+    response = client.post(
+        "/rpc",
+        content=msgpack.packb([{"id": 1, "method": "add", "params": [1, 2]}]),
+        headers={"content-type": "application/msgpack"},
+    )
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == [{"id": 1, "result": 3, "error": None}]
+
+    response = client.post("/rpc", json={"id": 2, "method": "add", "params": [2, 3]})
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["result"] == 5
+
+def test_fastapi_limits_decompressed_body():
+    @rpc
+    def size(text: str) -> int:
+        return len(text)
+
+    app = FastAPI()
+    mount_fastapi(app, max_body_size=10_000)
+
+    client = TestClient(app)
+    body = b'{"id": 1, "method": "size", "params": ["' + b"x" * 5000 + b'"]}'
+    response = client.post("/rpc", content=gzip.compress(body), headers={"Content-Encoding": "gzip"})
+    assert response.json()["result"] == 5000
+
+    # Small once compressed, too large once decompressed.
+    bomb = gzip.compress(b'{"id": 1, "params": ["' + b"x" * 50_000_000 + b'"]}')
+    response = client.post("/rpc", content=bomb, headers={"Content-Encoding": "gzip"})
+    assert response.status_code == 413
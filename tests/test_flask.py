@@ -1,3 +1,4 @@
+import gzip
 import pytest
 from flask import Flask
 from prpc import rpc, default_registry
@@ -5,7 +6,7 @@ from prpc_flask import mount_flask
 
 @pytest.fixture(autouse=True)
 def clear_registry():
-    default_registry._procedures.clear()
+    default_registry.clear()
 
 def test_flask_mount_success():
     @rpc
@@ -39,3 +40,114 @@ def test_flask_async_procedure():
     
     assert response.status_code == 200
     assert response.get_json()["result"] == 42
+
+def test_flask_batch():
+    @rpc
+    def subtract(a: int, b: int) -> int:
+        return a - b
+
+    app = Flask(__name__)
+    mount_flask(app)
+
+    client = app.test_client()
+    payload = [
+        {"id": 1, "method": "subtract", "params": [5, 2]},
+        {"id": 2, "method": "subtract", "params": [9, 4]},
+    ]
+    response = client.post("/rpc", json=payload)
+
+    assert response.status_code == 200
+    assert [r["result"] for r in response.get_json()] == [3, 5]
+
+def test_flask_sync_procedure_skips_event_loop():
+    @rpc
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    app = Flask(__name__)
+    mount_flask(app)
+
+    client = app.test_client()
+    response = client.post("/rpc", json={"id": 1, "method": "add", "params": [1, 2]})
+
+    assert response.get_json()["result"] == 3
+    assert app.extensions["prpc_loop_runner"]._portal is None
+
+def test_flask_async_procedures_reuse_event_loop():
+    import threading
+
+    @rpc
+    async def loop_thread() -> str:
+        return threading.current_thread().name
+
+    app = Flask(__name__)
+    mount_flask(app)
+
+    client = app.test_client()
+    first = client.post("/rpc", json={"id": 1, "method": "loop_thread"}).get_json()
+    second = client.post("/rpc", json={"id": 2, "method": "loop_thread"}).get_json()
+
+    assert first["result"] == second["result"]
+    assert first["result"] != threading.current_thread().name
+    app.extensions["prpc_loop_runner"].stop()
+
+def test_flask_generator_procedures():
+    @rpc
+    def count(n: int):
+        yield from range(n)
+
+    @rpc
+    async def async_count(n: int):
+        for i in range(n):
+            yield i
+
+    app = Flask(__name__)
+    mount_flask(app)
+
+    client = app.test_client()
+    response = client.post("/rpc", json={"id": 1, "method": "count", "params": [3]})
+    assert response.get_json()["result"] == [0, 1, 2]
+
+    response = client.post("/rpc", json={"id": 2, "method": "async_count", "params": [2]})
+    assert response.get_json()["result"] == [0, 1]
+    app.extensions["prpc_loop_runner"].stop()
+
+def test_flask_msgpack():
+    msgpack = pytest.importorskip("msgpack")
+
+    @rpc
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    app = Flask(__name__)
+    mount_flask(app)
+
+    client = app.test_client()
+    response = client.post(
+        "/rpc",
+        data=msgpack.packb({"id": 1, "method": "add", "params": [1, 2]}),
+        content_type="application/msgpack",
+    )
+    assert response.mimetype == "application/msgpack"
+    assert msgpack.unpackb(response.data) == {"id": 1, "result": 3, "error": None}
+
+    response = client.post("/rpc", data=b"{", content_type="application/json")
+    assert response.status_code == 400
+
+def test_flask_limits_decompressed_body():
+    @rpc
+    def size(text: str) -> int:
+        return len(text)
+
+    app = Flask(__name__)
+    mount_flask(app, max_body_size=10_000)
+
+    client = app.test_client()
+    body = b'{"id": 1, "method": "size", "params": ["' + b"x" * 5000 + b'"]}'
+    response = client.post("/rpc", data=gzip.compress(body), headers={"Content-Encoding": "gzip"})
+    assert response.get_json()["result"] == 5000
+
+    # Small once compressed, too large once decompressed.
+    bomb = gzip.compress(b'{"id": 1, "params": ["' + b"x" * 50_000_000 + b'"]}')
+    response = client.post("/rpc", data=bomb, headers={"Content-Encoding": "gzip"})
+    assert response.status_code == 413
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Cumulative import time budgets, in microseconds. They are several times
+# the measured times, to absorb slow machines; the module checks below are
+# what catches most regressions.
+BUDGETS = {
+    "prpc": 25_000,
+    "prpc_codegen.main": 300_000,
+}
+
+HEAVY = {"httpx", "pydantic", "uvicorn", "rich", "jinja2"}
+
+def _import_times(statement):
+    """Run ``statement`` in a fresh interpreter; cumulative import time by module."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+def test_import_prpc_is_lazy():
+    times = _import_times("import prpc")
+    assert not HEAVY & times.keys()
+    assert times["prpc"] < BUDGETS["prpc"]
+
+def test_server_imports_skip_client():
+    times = _import_times("from prpc import rpc, PRPCAsgiApp")
+    assert "pydantic" in times
+    assert not {"httpx", "uvicorn", "rich", "jinja2"} & times.keys()
+
+def test_cli_start_up():
+    times = _import_times("import prpc_codegen.main")
+    assert not HEAVY & times.keys()
+    assert times["prpc_codegen.main"] < BUDGETS["prpc_codegen.main"]
+
+@pytest.mark.parametrize("name", ["rpc", "asgi_app", "RPCClient", "get_registry_schema"])
+def test_lazy_attributes_resolve(name):
+    import prpc
+
+    assert getattr(prpc, name) is not None
+    assert name in dir(prpc)
+    with pytest.raises(AttributeError):
+        _ = prpc.not_a_name
+
+def test_all_lists_the_lazy_attributes():
+    import prpc
+
+    assert sorted(prpc.__all__) == sorted(prpc._LAZY_ATTRIBUTES)
@@ -0,0 +1,134 @@
+import functools
+
+import pytest
+from prpc import handle_request, handle_request_sync, rpc, default_registry
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    default_registry.clear()
+
+def tag(label, calls):
+    """An interceptor recording ``label`` around sync procedures."""
+
+    def interceptor(name, call_next):
+        @functools.wraps(call_next)
+        def call(*args, **kwargs):
+            calls.append((label, name))
+            return call_next(*args, **kwargs)
+
+        return call
+
+    return interceptor
+
+def test_rpc_returns_function_unchanged():
+    def hello():
+        return "world"
+
+    assert rpc(hello) is hello
+    plan = default_registry.get_plan("hello")
+    assert plan.fn is hello
+    assert plan.call is hello
+
+@pytest.mark.anyio
+async def test_interceptor_order():
+    calls = []
+    default_registry.add_interceptor(tag("global-1", calls))
+    default_registry.add_interceptor(tag("global-2", calls))
+
+    @rpc(interceptors=[tag("local-1", calls), tag("local-2", calls)])
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    response = await handle_request({"id": 1, "method": "add", "params": [1, 2]})
+
+    assert response["result"] == 3
+    assert [label for label, _ in calls] == ["global-1", "global-2", "local-1", "local-2"]
+    assert {name for _, name in calls} == {"add"}
+    assert default_registry.get("add") is add
+
+def test_global_interceptor_applies_to_registered_procedures():
+    calls = []
+
+    @rpc
+    def ping() -> str:
+        return "pong"
+
+    assert handle_request_sync({"id": 1, "method": "ping"})["result"] == "pong"
+    assert calls == []
+
+    default_registry.add_interceptor(tag("log", calls))
+    assert handle_request_sync({"id": 2, "method": "ping"})["result"] == "pong"
+    assert calls == [("log", "ping")]
+
+@pytest.mark.anyio
+async def test_async_interceptor_can_short_circuit():
+    def deny_negative(name, call_next):
+        async def call(x):
+            if x < 0:
+                raise PermissionError("Denied")
+            return await call_next(x)
+
+        return call
+
+    @rpc(interceptors=[deny_negative])
+    async def square(x: int) -> int:
+        return x * x
+
+    assert (await handle_request({"id": 1, "method": "square", "params": [3]}))["result"] == 9
+    response = await handle_request({"id": 2, "method": "square", "params": [-3]})
+    assert response["error"] == {"code": 500, "message": "Denied"}
+
+def test_clear_removes_interceptors():
+    default_registry.add_interceptor(tag("log", []))
+    default_registry.clear()
+    assert default_registry.interceptors == ()
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("is_async", [False, True])
+async def test_interceptors_run_on_cache_hits(is_async):
+    allowed = {"admin"}
+    computed = []
+
+    def require_admin(name, call_next):
+        if is_async:
+            async def call(user, key):
+                if user not in allowed:
+                    raise PermissionError("Denied")
+                return await call_next(user, key)
+        else:
+            def call(user, key):
+                if user not in allowed:
+                    raise PermissionError("Denied")
+                return call_next(user, key)
+
+        return call
+
+    if is_async:
+        async def secret(user: str, key: str) -> str:
+            computed.append(key)
+            return f"secret-{key}"
+    else:
+        def secret(user: str, key: str) -> str:
+            computed.append(key)
+            return f"secret-{key}"
+
+    rpc(secret, cache_ttl=60, interceptors=[require_admin])
+
+    response = await handle_request({"id": 1, "method": "secret", "params": ["admin", "k"]})
+    assert response["result"] == "secret-k"
+    # The result is cached, but the check still runs and rejects the call.
+    allowed.clear()
+    response = await handle_request({"id": 2, "method": "secret", "params": ["admin", "k"]})
+    assert response["error"] == {"code": 500, "message": "Denied"}
+    assert computed == ["k"]
+
+    allowed.add("admin")
+    response = await handle_request({"id": 3, "method": "secret", "params": ["admin", "k"]})
+    assert response["result"] == "secret-k"
+    assert computed == ["k"]
+    assert default_registry.cache_stats("secret") == {"hits": 1, "misses": 1, "size": 1}
+
+    if not is_async:
+        allowed.clear()
+        response = handle_request_sync({"id": 4, "method": "secret", "params": ["admin", "k"]})
+        assert response["error"]["message"] == "Denied"
@@ -3,7 +3,7 @@ from prpc import handle_request, rpc, default_registry
 
 @pytest.fixture(autouse=True)
 def clear_registry():
-    default_registry._procedures.clear()
+    default_registry.clear()
 
 @pytest.mark.anyio
 async def test_handle_request_sync():
@@ -31,6 +31,25 @@ async def test_handle_request_async():
     assert response["result"] == 10
     assert response["error"] is None
 
+@pytest.mark.anyio
+@pytest.mark.parametrize("inline", [False, True])
+async def test_handle_request_sync_wrapper_returning_coroutine(inline):
+    def logged(fn):
+        # A plain decorator, without functools.wraps.
+        def wrapper(*args, **kwargs):
+            return fn(*args, **kwargs)
+        return wrapper
+
+    @rpc(name="double", inline=inline)
+    @logged
+    async def double(n):
+        return n * 2
+
+    response = await handle_request({"id": 1, "method": "double", "params": [21]})
+
+    assert response["error"] is None
+    assert response["result"] == 42
+
 @pytest.mark.anyio
 async def test_handle_request_not_found():
     payload = {"id": 1, "method": "ghost", "params": {}}
@@ -65,3 +84,229 @@ async def test_handle_request_invalid_payload():
     assert "Invalid request" in response["error"]["message"]
 
 
+@pytest.mark.anyio
+async def test_handle_request_coerces_params():
+    @rpc
+    def double(n: int) -> int:
+        return n * 2
+
+    payload = {"id": 1, "method": "double", "params": {"n": "21"}}
+    response = await handle_request(payload)
+
+    assert response["result"] == 42
+    assert response["error"] is None
+
+@pytest.mark.anyio
+async def test_handle_request_invalid_params():
+    @rpc
+    def double(n: int) -> int:
+        return n * 2
+
+    payload = {"id": 1, "method": "double", "params": {"n": "abc"}}
+    response = await handle_request(payload)
+
+    assert response["result"] is None
+    assert response["error"]["code"] == 400
+    assert "Invalid params" in response["error"]["message"]
+
+@pytest.mark.anyio
+async def test_handle_request_batch():
+    @rpc
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    @rpc
+    def fail():
+        raise ValueError("Boom")
+
+    payload = [
+        {"id": 1, "method": "add", "params": [1, 2]},
+        {"id": 2, "method": "fail"},
+        {"id": 3, "method": "ghost"},
+        "not a request",
+        {"id": 5, "method": "add", "params": {"a": 3, "b": 4}},
+    ]
+    response = await handle_request(payload)
+
+    assert [r["id"] for r in response] == [1, 2, 3, None, 5]
+    assert response[0]["result"] == 3
+    assert response[1]["error"]["code"] == 500
+    assert response[2]["error"]["code"] == 404
+    assert response[3]["error"]["code"] == 400
+    assert response[4]["result"] == 7
+
+@pytest.mark.anyio
+async def test_handle_request_batch_concurrency_cap():
+    import anyio
+
+    running = 0
+    peak = 0
+
+    @rpc
+    async def slow(n: int) -> int:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await anyio.sleep(0.01)
+        running -= 1
+        return n
+
+    payload = [{"id": i, "method": "slow", "params": [i]} for i in range(10)]
+    response = await handle_request(payload, max_concurrency=3)
+
+    assert [r["result"] for r in response] == list(range(10))
+    assert peak == 3
+
+@pytest.mark.anyio
+async def test_handle_request_empty_batch():
+    response = await handle_request([])
+
+    assert response["error"]["code"] == 400
+    assert "empty batch" in response["error"]["message"]
+
+def test_handle_request_sync_dispatch():
+    from prpc import handle_request_sync
+    from prpc.core.interpreter import requires_event_loop
+
+    @rpc
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    @rpc
+    async def async_add(a: int, b: int) -> int:
+        return a + b
+
+    assert requires_event_loop({"method": "add"}) is False
+    assert requires_event_loop([{"method": "add"}, {"method": "async_add"}]) is True
+
+    response = handle_request_sync({"id": 1, "method": "add", "params": [1, 2]})
+    assert response["result"] == 3
+
+    response = handle_request_sync([{"id": 1, "method": "add", "params": [1, 2]}, {"id": 2, "method": "ghost"}])
+    assert response[0]["result"] == 3
+    assert response[1]["error"]["code"] == 404
+
+    response = handle_request_sync({"id": 3, "method": "async_add", "params": [1, 2]})
+    assert response["error"]["code"] == 500
+
+@pytest.mark.anyio
+async def test_handle_request_generator_collects_items():
+    from typing import Iterator
+
+    @rpc
+    def count(n: int) -> Iterator[int]:
+        yield from range(n)
+
+    response = await handle_request({"id": 1, "method": "count", "params": [3]})
+
+    assert response["result"] == [0, 1, 2]
+
+@pytest.mark.anyio
+async def test_stream_request():
+    from typing import AsyncIterator
+    from prpc.core.interpreter import stream_request
+
+    @rpc
+    async def ticks(n: int) -> AsyncIterator[int]:
+        for i in range(n):
+            yield i
+        raise ValueError("Boom")
+
+    responses = [r async for r in stream_request({"id": 7, "method": "ticks", "params": [2]})]
+
+    assert responses[0] == {"id": 7, "result": 0, "error": None}
+    assert responses[1] == {"id": 7, "result": 1, "error": None}
+    assert responses[2]["error"] == {"code": 500, "message": "Boom"}
+
+@pytest.mark.anyio
+async def test_stream_request_sync_generator_closed_early():
+    from prpc.core.interpreter import stream_request
+
+    closed = []
+
+    @rpc
+    def numbers():
+        try:
+            yield from range(100)
+        finally:
+            closed.append(True)
+
+    stream = stream_request({"id": 1, "method": "numbers"})
+    assert (await stream.__anext__())["result"] == 0
+    await stream.aclose()
+
+    assert closed == [True]
+
+@pytest.mark.anyio
+async def test_handle_request_deadline_exceeded():
+    import anyio
+
+    cancelled = []
+
+    @rpc
+    async def slow() -> str:
+        try:
+            await anyio.sleep(10)
+        except BaseException:
+            cancelled.append(True)
+            raise
+        return "done"
+
+    response = await handle_request({"id": 1, "method": "slow", "timeout": 0.01})
+
+    assert response["id"] == 1
+    assert response["error"]["code"] == 504
+    assert cancelled == [True]
+
+@pytest.mark.anyio
+async def test_handle_request_within_deadline():
+    @rpc
+    async def fast() -> str:
+        return "done"
+
+    response = await handle_request({"id": 1, "method": "fast", "timeout": 5})
+    assert response == {"id": 1, "result": "done", "error": None}
+
+@pytest.mark.anyio
+async def test_handle_request_invalid_timeout():
+    @rpc
+    def ping() -> str:
+        return "pong"
+
+    response = await handle_request({"id": 1, "method": "ping", "timeout": -1})
+    assert response["error"]["code"] == 400
+
+@pytest.mark.anyio
+async def test_stream_request_deadline_exceeded():
+    import anyio
+    from prpc.core.interpreter import stream_request
+
+    @rpc
+    async def ticks():
+        yield 0
+        await anyio.sleep(10)
+        yield 1
+
+    responses = [
+        r async for r in stream_request({"id": 3, "method": "ticks", "timeout": 0.05})
+    ]
+
+    assert responses[0] == {"id": 3, "result": 0, "error": None}
+    assert responses[1]["error"]["code"] == 504
+    assert len(responses) == 2
+
+@pytest.mark.anyio
+async def test_handle_request_timings():
+    @rpc
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    timings = {}
+    response = await handle_request(
+        [{"id": 1, "method": "add", "params": [1, 2]}, {"id": 2, "method": "add", "params": [3, 4]}],
+        timings=timings,
+    )
+
+    assert [r["result"] for r in response] == [3, 7]
+    assert set(timings) == {"validate", "call", "serialize"}
+    assert all(isinstance(v, int) and v >= 0 for v in timings.values())
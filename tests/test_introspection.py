@@ -1,10 +1,12 @@
+import json
 import pytest
+import httpx
 from pydantic import BaseModel
-from prpc import rpc, default_registry, get_procedure_schema, get_registry_schema
+from prpc import rpc, asgi_app, default_registry, get_procedure_schema, get_registry_schema, RPCClient
 
 @pytest.fixture(autouse=True)
 def clear_registry():
-    default_registry._procedures.clear()
+    default_registry.clear()
 
 class User(BaseModel):
     id: int
@@ -62,3 +64,70 @@ def test_get_registry_schema():
     assert len(registry_schema) == 2
     assert registry_schema["ping"].name == "ping"
     assert registry_schema["greet"].parameters[0].name == "name"
+
+def test_get_registry_schema_of_plain_mappings():
+    def greet(name: str) -> str:
+        return f"Hello {name}"
+
+    class CustomRegistry:
+        _procedures = {"hello": greet}
+
+    for registry in ({"hello": greet}, CustomRegistry()):
+        schemas = get_registry_schema(registry)
+        assert list(schemas) == ["hello"]
+        assert schemas["hello"].name == "hello"
+        assert schemas["hello"].parameters[0].name == "name"
+
+def test_registry_schema_is_cached_per_procedure():
+    @rpc
+    def ping():
+        return "pong"
+
+    @rpc
+    def greet(name: str):
+        return f"Hello {name}"
+
+    first = get_registry_schema(default_registry)
+    body, etag = default_registry.schema_document()
+    assert default_registry.schema_document() == (body, etag)
+    assert json.loads(body)["procedures"]["greet"]["parameters"][0]["name"] == "name"
+
+    # Re-registering a procedure only rebuilds its own schema.
+    @rpc(name="greet")
+    def greet_again(name: str, title: str = ""):
+        return f"Hello {title} {name}"
+
+    second = get_registry_schema(default_registry)
+    assert second["ping"] is first["ping"]
+    assert len(second["greet"].parameters) == 2
+    new_body, new_etag = default_registry.schema_document()
+    assert new_etag != etag
+
+@pytest.mark.anyio
+async def test_schema_endpoint_revalidates_with_etag():
+    @rpc
+    def add(a: int, b: int = 0) -> int:
+        return a + b
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://test") as client:
+        response = await client.get("/rpc/schema")
+        assert response.status_code == 200
+        assert response.json()["procedures"]["add"]["return_type"] == "<class 'int'>"
+        etag = response.headers["etag"]
+
+        response = await client.get("/rpc/schema", headers={"if-none-match": f'W/{etag}, "other"'})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    async with RPCClient("http://test") as client:
+        client._async_client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=asgi_app), base_url="http://test"
+        )
+        document = await client.afetch_schema()
+        assert await client.afetch_schema() is document
+
+        @rpc
+        def sub(a: int, b: int) -> int:
+            return a - b
+
+        assert set((await client.afetch_schema())["procedures"]) == {"add", "sub"}
@@ -0,0 +1,171 @@
+import anyio
+import pytest
+from httpx import ASGITransport, AsyncClient
+from prpc import asgi_app, handle_request, handle_request_sync, rpc, default_registry
+from prpc.core.limiter import ConcurrencyLimiter, OverloadedError
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    default_registry.clear()
+
+@pytest.mark.anyio
+async def test_limiter_rejects_when_queue_full():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=1)
+    await limiter.acquire()
+
+    acquired = []
+
+    async def waiter():
+        await limiter.acquire()
+        acquired.append(True)
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(waiter)
+        await anyio.wait_all_tasks_blocked()
+        assert limiter.waiting == 1
+
+        with pytest.raises(OverloadedError):
+            await limiter.acquire()
+
+        limiter.release()
+
+    assert acquired == [True]
+    assert limiter.active == 1
+    limiter.release()
+    assert limiter.active == 0
+
+@pytest.mark.anyio
+async def test_limiter_queue_timeout():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=5, queue_timeout=0.01)
+    await limiter.acquire()
+    with pytest.raises(OverloadedError):
+        await limiter.acquire()
+    assert limiter.waiting == 0
+    limiter.release()
+    assert limiter.active == 0
+
+@pytest.mark.anyio
+async def test_limiter_mixes_sync_and_async_callers(monkeypatch):
+    import threading
+
+    # anyio events are not thread-safe: they must only be set on their loop.
+    event_type = type(anyio.Event())
+    set_event = event_type.set
+    setters = set()
+
+    def set_from(event):
+        setters.add(threading.get_ident())
+        set_event(event)
+
+    monkeypatch.setattr(event_type, "set", set_from)
+
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=5)
+    order = []
+
+    def sync_call():
+        limiter.acquire_sync()
+        order.append("sync")
+        # Hands the slot to the async caller from this worker thread.
+        limiter.release()
+
+    async def async_call():
+        await limiter.acquire()
+        order.append("async")
+        limiter.release()
+
+    async def wait_for(waiting):
+        while limiter.waiting < waiting:
+            await anyio.sleep(0.001)
+
+    with anyio.fail_after(5):
+        await limiter.acquire()
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(anyio.to_thread.run_sync, sync_call)
+            await wait_for(1)
+            tg.start_soon(async_call)
+            await wait_for(2)
+            limiter.release()
+
+    assert order == ["sync", "async"]
+    assert setters == {threading.get_ident()}
+    assert limiter.active == 0
+    assert limiter.waiting == 0
+
+@pytest.mark.anyio
+async def test_max_concurrency_sheds_excess_calls():
+    release = anyio.Event()
+    running = []
+
+    @rpc(max_concurrency=2)
+    async def slow(i: int) -> int:
+        running.append(i)
+        await release.wait()
+        return i
+
+    responses = {}
+
+    async def call(i):
+        responses[i] = await handle_request({"id": i, "method": "slow", "params": [i]})
+
+    async with anyio.create_task_group() as tg:
+        for i in range(2):
+            tg.start_soon(call, i)
+        await anyio.wait_all_tasks_blocked()
+
+        response = await handle_request({"id": 9, "method": "slow", "params": [9]})
+        assert response["error"]["code"] == 503
+
+        release.set()
+
+    assert sorted(running) == [0, 1]
+    assert responses[0]["result"] == 0
+    assert responses[1]["result"] == 1
+
+def test_max_concurrency_sync_path():
+    @rpc(max_concurrency=1)
+    def double(x: int) -> int:
+        return x * 2
+
+    assert handle_request_sync({"id": 1, "method": "double", "params": [2]})["result"] == 4
+    assert default_registry.get_plan("double").limiter.active == 0
+
+@pytest.mark.anyio
+async def test_asgi_overloaded_returns_503():
+    release = anyio.Event()
+
+    @rpc(max_concurrency=1)
+    async def slow() -> str:
+        await release.wait()
+        return "done"
+
+    async with AsyncClient(transport=ASGITransport(app=asgi_app), base_url="http://test") as client:
+        first = {}
+
+        async def call():
+            first["response"] = await client.post("/rpc", json={"id": 1, "method": "slow"})
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(call)
+            await anyio.wait_all_tasks_blocked()
+
+            response = await client.post("/rpc", json={"id": 2, "method": "slow"})
+            assert response.status_code == 503
+            assert response.headers["retry-after"] == "1"
+            assert response.json()["error"]["code"] == 503
+
+            release.set()
+
+        assert first["response"].status_code == 200
+        assert first["response"].json()["result"] == "done"
+
+@pytest.mark.anyio
+async def test_streaming_procedure_holds_slot():
+    @rpc(max_concurrency=1)
+    async def count(n: int):
+        for i in range(n):
+            yield i
+
+    plan = default_registry.get_plan("count")
+    response = await handle_request({"id": 1, "method": "count", "params": [3]})
+    assert response["result"] == [0, 1, 2]
+    assert plan.limiter.active == 0
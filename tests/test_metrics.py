@@ -0,0 +1,158 @@
+import threading
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from prpc import asgi_app, handle_request, handle_request_sync, rpc, default_registry
+from prpc.core.metrics import Metrics, default_metrics
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    default_registry.clear()
+
+@pytest.fixture
+def metrics():
+    enabled = default_metrics.enabled
+    default_metrics.reset()
+    default_metrics.enabled = True
+    yield default_metrics
+    default_metrics.enabled = enabled
+    default_metrics.reset()
+
+def test_metrics_histogram_and_errors():
+    metrics = Metrics(enabled=True, buckets=(0.1, 1.0))
+    metrics.finish(metrics.start("add"), 0.05)
+    metrics.finish(metrics.start("add"), 0.5, 500)
+    stats = metrics.start("add")
+
+    snapshot = metrics.snapshot()["add"]
+    assert snapshot["calls"] == 2
+    assert snapshot["errors"] == {500: 1}
+    assert snapshot["in_flight"] == 1
+    assert snapshot["buckets"] == [1, 2, 2]
+
+    metrics.finish(stats, 5.0)
+    assert metrics.snapshot()["add"]["buckets"] == [1, 2, 3]
+
+def test_metrics_merged_across_threads():
+    metrics = Metrics(enabled=True)
+
+    def work():
+        for _ in range(100):
+            metrics.finish(metrics.start("ping"), 0.001)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert metrics.snapshot()["ping"]["calls"] == 400
+
+def test_metrics_fold_exited_threads():
+    metrics = Metrics(enabled=True)
+
+    def work():
+        metrics.finish(metrics.start("ping"), 0.001, error_code=500)
+
+    for _ in range(50):
+        threads = [threading.Thread(target=work) for _ in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert len(metrics._shards) <= 10
+    snapshot = metrics.snapshot()["ping"]
+    assert snapshot["calls"] == 500
+    assert snapshot["errors"] == {500: 500}
+    assert snapshot["buckets"][-1] == 500
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+def test_metrics_prometheus_format():
+    metrics = Metrics(enabled=True, buckets=(0.1,))
+    metrics.finish(metrics.start('say"hi'), 0.05, 404)
+
+    text = metrics.render_prometheus()
+    assert '# TYPE prpc_call_duration_seconds histogram' in text
+    assert 'prpc_calls_total{method="say\\"hi"} 1' in text
+    assert 'prpc_errors_total{method="say\\"hi",code="404"} 1' in text
+    assert 'prpc_call_duration_seconds_bucket{method="say\\"hi",le="0.1"} 1' in text
+    assert 'prpc_call_duration_seconds_bucket{method="say\\"hi",le="+Inf"} 1' in text
+    assert 'prpc_call_duration_seconds_count{method="say\\"hi"} 1' in text
+
+@pytest.mark.anyio
+async def test_handle_request_records_metrics(metrics):
+    @rpc
+    def fail() -> None:
+        raise ValueError("Boom")
+
+    @rpc
+    async def ok() -> str:
+        return "ok"
+
+    await handle_request({"id": 1, "method": "ok"})
+    await handle_request({"id": 2, "method": "fail"})
+    handle_request_sync({"id": 3, "method": "fail"})
+
+    snapshot = metrics.snapshot()
+    assert snapshot["ok"]["calls"] == 1
+    assert snapshot["ok"]["errors"] == {}
+    assert snapshot["fail"]["calls"] == 2
+    assert snapshot["fail"]["errors"] == {500: 2}
+    assert snapshot["fail"]["in_flight"] == 0
+
+@pytest.mark.anyio
+async def test_handle_request_skips_disabled_metrics():
+    @rpc
+    def ping() -> str:
+        return "pong"
+
+    default_metrics.reset()
+    assert not default_metrics.enabled
+    await handle_request({"id": 1, "method": "ping"})
+    assert default_metrics.snapshot() == {}
+
+@pytest.mark.anyio
+async def test_asgi_metrics_endpoint(metrics):
+    @rpc
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    async with AsyncClient(transport=ASGITransport(app=asgi_app), base_url="http://test") as client:
+        await client.post("/rpc", json={"id": 1, "method": "add", "params": [1, 2]})
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'prpc_calls_total{method="add"} 1' in response.text
+
+@pytest.mark.anyio
+async def test_asgi_metrics_endpoint_disabled():
+    async with AsyncClient(transport=ASGITransport(app=asgi_app), base_url="http://test") as client:
+        response = await client.get("/metrics")
+    assert response.status_code == 404
+
+@pytest.mark.anyio
+async def test_asgi_app_metrics_are_its_own():
+    from prpc import PRPCAsgiApp
+
+    @rpc
+    def ping() -> str:
+        return "pong"
+
+    default_metrics.reset()
+    app = PRPCAsgiApp(metrics=True)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await client.post("/rpc", json={"id": 1, "method": "ping"})
+        response = await client.get("/metrics")
+
+    assert 'prpc_calls_total{method="ping"} 1' in response.text
+    assert app.metrics.snapshot()["ping"]["calls"] == 1
+    # Other apps and adapters are not affected.
+    assert not default_metrics.enabled
+    assert default_metrics.snapshot() == {}
+
+    shared = Metrics(enabled=True)
+    assert PRPCAsgiApp(metrics=shared).metrics is shared
@@ -4,7 +4,7 @@ import json
 def test_rpc_request_serialization():
     req = RpcRequest(id=1, method="add", params=[1, 2])
     data = req.model_dump()
-    assert data == {"id": 1, "method": "add", "params": [1, 2]}
+    assert data == {"id": 1, "method": "add", "params": [1, 2], "timeout": None}
     
     # Test JSON string conversion
     json_str = req.model_dump_json()
@@ -0,0 +1,93 @@
+import pytest
+from pydantic import BaseModel
+from prpc.core.plan import InvalidParamsError, ProcedurePlan
+
+class Point(BaseModel):
+    x: int
+    y: int
+
+def test_plan_coroutine_detection():
+    def sync_fn(): return 1
+    async def async_fn(): return 1
+
+    assert ProcedurePlan("sync_fn", sync_fn).is_coroutine is False
+    assert ProcedurePlan("async_fn", async_fn).is_coroutine is True
+
+def test_plan_bind_coerces_params():
+    def move(p: Point, dx: int = 0) -> Point:
+        return Point(x=p.x + dx, y=p.y)
+
+    plan = ProcedurePlan("move", move)
+
+    args, kwargs = plan.bind({"p": {"x": 1, "y": 2}, "dx": "3"})
+    assert args == ()
+    assert kwargs["p"] == Point(x=1, y=2)
+    assert kwargs["dx"] == 3
+
+    args, kwargs = plan.bind([{"x": 1, "y": 2}])
+    assert kwargs == {"p": Point(x=1, y=2)}
+
+def test_plan_bind_rejects_invalid_params():
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    plan = ProcedurePlan("add", add)
+
+    with pytest.raises(InvalidParamsError):
+        plan.bind({"a": "not a number", "b": 1})
+    with pytest.raises(InvalidParamsError):
+        plan.bind({"a": 1})
+    with pytest.raises(InvalidParamsError):
+        plan.bind({"a": 1, "b": 2, "c": 3})
+    with pytest.raises(InvalidParamsError):
+        plan.bind([1, 2, 3])
+
+def test_plan_bind_var_args():
+    def total(first: int, *rest: int, **options: str) -> int:
+        return first + sum(rest)
+
+    plan = ProcedurePlan("total", total)
+
+    args, kwargs = plan.bind([1, "2", 3])
+    assert args == (1, 2, 3)
+    assert kwargs == {}
+
+    args, kwargs = plan.bind({"first": 1, "mode": "fast"})
+    assert args == ()
+    assert kwargs == {"first": 1, "mode": "fast"}
+
+def test_plan_bind_positional_only():
+    def head(a: int, /, b: int = 0) -> int:
+        return a
+
+    args, kwargs = ProcedurePlan("head", head).bind({"a": 1, "b": 2})
+    assert args == (1,)
+    assert kwargs == {"b": 2}
+
+def test_plan_serialize_return_type():
+    def get_point() -> Point:
+        return Point(x=1, y=2)
+
+    plan = ProcedurePlan("get_point", get_point)
+    assert plan.serialize(get_point()) == {"x": 1, "y": 2}
+
+def test_plan_builtin_callable():
+    plan = ProcedurePlan("length", len)
+    assert plan.bind(["abc"]) == (("abc",), {})
+
+def test_plan_streaming_item_serializer():
+    from typing import AsyncIterator, Iterator
+
+    def points() -> Iterator[Point]:
+        yield Point(x=1, y=2)
+
+    async def async_points() -> AsyncIterator[Point]:
+        yield Point(x=1, y=2)
+
+    plan = ProcedurePlan("points", points)
+    assert plan.is_generator and plan.is_streaming and not plan.is_coroutine
+    assert plan.serialize(Point(x=1, y=2)) == {"x": 1, "y": 2}
+
+    plan = ProcedurePlan("async_points", async_points)
+    assert plan.is_async_generator and plan.is_streaming and not plan.is_coroutine
+    assert plan.serialize(Point(x=1, y=2)) == {"x": 1, "y": 2}
@@ -1,3 +1,4 @@
+import pytest
 from prpc.core.registry import ProcedureRegistry
 
 def test_registry_register_get():
@@ -24,3 +25,50 @@ def test_registry_overwrite():
     registry.register("test", lambda: 2)
     
     assert registry.get("test")() == 2
+
+def test_registry_unregister_and_clear():
+    registry = ProcedureRegistry()
+    registry.register("a", lambda: 1)
+    registry.register("b", lambda: 2)
+
+    registry.unregister("a")
+    registry.unregister("missing")
+    assert registry.list() == ["b"]
+
+    registry.clear()
+    assert registry.list() == []
+
+def test_registry_snapshot_is_immutable():
+    registry = ProcedureRegistry()
+    registry.register("a", lambda: 1)
+    snapshot = registry._procedures
+
+    registry.register("b", lambda: 2)
+
+    assert list(snapshot) == ["a"]
+    assert sorted(registry._procedures) == ["a", "b"]
+    with pytest.raises(TypeError):
+        snapshot["c"] = None
+
+def test_registry_concurrent_register_and_get():
+    import threading
+
+    registry = ProcedureRegistry()
+    names = [f"proc_{i}" for i in range(200)]
+
+    def writer():
+        for name in names:
+            registry.register(name, lambda: None)
+
+    def reader():
+        for _ in range(5):
+            for name in names:
+                registry.get(name)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(registry.list()) == sorted(names)
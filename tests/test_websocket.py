@@ -0,0 +1,157 @@
+import asyncio
+import json
+
+import anyio
+import pytest
+from prpc import rpc, asgi_app, default_registry, RPCClient, RPCError
+from prpc.client.websocket import WebSocketConnection
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    default_registry.clear()
+
+class InMemoryWebSocket:
+    """Client-side socket talking to an ASGI app in-process."""
+
+    def __init__(self, app, path="/rpc", headers=()):
+        self.app = app
+        self.path = path
+        self.headers = list(headers)
+        self.to_app = asyncio.Queue()
+        self.from_app = asyncio.Queue()
+        self.accepted = asyncio.Event()
+        self.task = None
+
+    async def open(self):
+        async def receive():
+            return await self.to_app.get()
+
+        async def send(message):
+            if message["type"] == "websocket.accept":
+                self.accepted.set()
+            elif message["type"] == "websocket.send":
+                await self.from_app.put(message.get("text") or message.get("bytes"))
+            elif message["type"] == "websocket.close":
+                await self.from_app.put(None)
+                self.accepted.set()
+
+        scope = {"type": "websocket", "path": self.path, "headers": self.headers}
+        await self.to_app.put({"type": "websocket.connect"})
+        self.task = asyncio.create_task(self.app(scope, receive, send))
+        await self.accepted.wait()
+        return self
+
+    async def send(self, text):
+        await self.to_app.put({"type": "websocket.receive", "text": text})
+
+    async def send_bytes(self, data):
+        await self.to_app.put({"type": "websocket.receive", "bytes": data})
+
+    async def recv(self):
+        return await self.from_app.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self.from_app.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def close(self):
+        await self.to_app.put({"type": "websocket.disconnect", "code": 1000})
+        await self.task
+        await self.from_app.put(None)
+
+@pytest.mark.parametrize("anyio_backend", ["asyncio"])
+@pytest.mark.anyio
+async def test_websocket_out_of_order_responses():
+    @rpc
+    async def slow(n: int) -> int:
+        await anyio.sleep(0.05)
+        return n
+
+    @rpc
+    def fast(n: int) -> int:
+        return n
+
+    socket = await InMemoryWebSocket(asgi_app).open()
+    await socket.send(json.dumps({"id": 1, "method": "slow", "params": [1]}))
+    await socket.send(json.dumps({"id": 2, "method": "fast", "params": [2]}))
+    await socket.send("invalid-json")
+
+    responses = [json.loads(await socket.recv()) for _ in range(3)]
+    await socket.close()
+
+    assert responses[-1]["id"] == 1
+    assert {r["id"] for r in responses} == {1, 2, None}
+    assert next(r for r in responses if r["id"] is None)["error"]["code"] == 400
+
+@pytest.mark.parametrize("anyio_backend", ["asyncio"])
+@pytest.mark.anyio
+async def test_websocket_rejects_other_paths():
+    socket = await InMemoryWebSocket(asgi_app, path="/other").open()
+    assert await socket.recv() is None
+    await socket.task
+
+@pytest.mark.parametrize("anyio_backend", ["asyncio"])
+@pytest.mark.anyio
+async def test_client_websocket_mode():
+    @rpc
+    async def echo(value: int) -> int:
+        await anyio.sleep(0.01 * (5 - value))
+        return value
+
+    @rpc
+    def fail():
+        raise ValueError("Boom")
+
+    async def connect(url):
+        assert url == "ws://test/rpc"
+        return await InMemoryWebSocket(asgi_app).open()
+
+    async with RPCClient("http://test", websocket=True) as client:
+        client._websocket = WebSocketConnection("ws://test/rpc", connect=connect)
+
+        results = await asyncio.gather(*(client.echo.aio(i) for i in range(5)))
+        assert results == [0, 1, 2, 3, 4]
+
+        with pytest.raises(RPCError) as exc:
+            await client.fail.aio()
+        assert exc.value.code == 500
+
+@pytest.mark.parametrize("anyio_backend", ["asyncio"])
+@pytest.mark.anyio
+async def test_websocket_frames_with_binary_default_codec():
+    msgpack = pytest.importorskip("msgpack")
+    from prpc import PRPCAsgiApp
+    from prpc.transport.codec import MSGPACK_CONTENT_TYPE, MsgpackCodec
+
+    @rpc
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    app = PRPCAsgiApp(codec=MsgpackCodec())
+    request = {"id": 1, "method": "add", "params": [1, 2]}
+
+    # Text frames are JSON, whatever the app's default codec.
+    socket = await InMemoryWebSocket(app).open()
+    await socket.send(json.dumps(request))
+    assert json.loads(await socket.recv())["result"] == 3
+    # Binary frames default to JSON too.
+    await socket.send_bytes(json.dumps(request).encode())
+    assert json.loads(await socket.recv())["result"] == 3
+    await socket.close()
+
+    # Or use the codec given by the handshake.
+    headers = [(b"content-type", MSGPACK_CONTENT_TYPE.encode())]
+    socket = await InMemoryWebSocket(app, headers=headers).open()
+    await socket.send_bytes(msgpack.packb(request))
+    assert msgpack.unpackb(await socket.recv())["result"] == 3
+    await socket.close()
+
+def test_client_websocket_url():
+    client = RPCClient("https://example.com/", websocket=True)
+    assert client._websocket.url == "wss://example.com/rpc"
+    client.close()